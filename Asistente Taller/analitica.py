@@ -0,0 +1,188 @@
+"""Analítica de asistencia: porcentajes, rachas de ausencias y tendencia semanal.
+
+La asistencia del período se baja con un COPY de enteros y se arma una matriz
+alumnos x días por curso; todos los cálculos son operaciones de numpy sobre
+esa matriz, sin recorrer las celdas una por una.
+"""
+import io
+from datetime import timedelta
+
+import numpy as np
+
+# Un alumno está en riesgo si cumple alguna de estas condiciones
+UMBRAL_ASISTENCIA = 75       # % de asistencia mínimo
+RACHA_RIESGO = 3             # días hábiles seguidos ausente
+TENDENCIA_RIESGO = -5        # puntos de asistencia perdidos por semana
+
+SIN_REGISTRO, AUSENTE, PRESENTE = -1, 0, 1
+
+
+def cargar(cur, desde, hasta, curso_id=None):
+    """Devuelve (alumnos, matriz).
+
+    alumnos es la lista (id, apellido, nombre, curso_id) ordenada por curso y
+    matriz un array int8 de len(alumnos) x días del rango con PRESENTE,
+    AUSENTE o SIN_REGISTRO. Si dos docentes cargaron el mismo día, cuenta
+    como presente si alguno lo marcó presente.
+    """
+    filtro_alumnos = filtro_asistencia = ""
+    params = []
+    if curso_id is not None:
+        filtro_alumnos, filtro_asistencia = " WHERE curso_id=%s", " AND s.curso_id=%s"
+        params = [curso_id]
+    cur.execute(f"""
+        SELECT id, apellido, nombre, curso_id FROM alumnos{filtro_alumnos}
+        ORDER BY curso_id, apellido, nombre, id
+    """, params)
+    alumnos = cur.fetchall()
+
+    sql = cur.mogrify(f"""
+        COPY (
+            SELECT s.alumno_id, s.fecha - %s::date, MAX(s.presente)
+            FROM asistencia s
+            JOIN alumnos a ON a.id = s.alumno_id AND a.curso_id = s.curso_id
+            WHERE s.fecha BETWEEN %s AND %s{filtro_asistencia}
+            GROUP BY s.alumno_id, s.fecha
+        ) TO STDOUT WITH CSV
+    """, [desde.isoformat(), desde.isoformat(), hasta.isoformat()] + params).decode()
+    buffer = io.BytesIO()
+    cur.copy_expert(sql, buffer)
+
+    matriz = np.full((len(alumnos), (hasta - desde).days + 1), SIN_REGISTRO, dtype=np.int8)
+    if buffer.tell():
+        buffer.seek(0)
+        registros = np.loadtxt(buffer, delimiter=",", dtype=np.int64, ndmin=2)
+        ids = np.array([a[0] for a in alumnos], dtype=np.int64)
+        orden = np.argsort(ids)
+        filas = orden[np.searchsorted(ids, registros[:, 0], sorter=orden)]
+        matriz[filas, registros[:, 1]] = registros[:, 2]
+    return alumnos, matriz
+
+
+def rachas_de_ausencia(ausente):
+    """(racha_maxima, racha_actual) por fila de una matriz booleana alumnos x días."""
+    filas, dias = ausente.shape
+    # Con una columna False a cada lado, cada racha empieza en un +1 y termina en un -1 de diff
+    borde = np.zeros((filas, 1), dtype=np.int8)
+    cambios = np.diff(np.hstack([borde, ausente.astype(np.int8), borde]), axis=1)
+    fila_inicio, inicio = np.nonzero(cambios == 1)
+    _, fin = np.nonzero(cambios == -1)
+    largos = fin - inicio
+
+    maxima = np.zeros(filas, dtype=np.int64)
+    np.maximum.at(maxima, fila_inicio, largos)
+    actual = np.zeros(filas, dtype=np.int64)
+    al_final = fin == dias
+    actual[fila_inicio[al_final]] = largos[al_final]
+    return maxima, actual
+
+
+def pendiente(y, valido):
+    """Pendiente de mínimos cuadrados de cada fila de y contra 0, 1, 2..., ignorando los no válidos."""
+    x = np.arange(y.shape[1], dtype=float)
+    n = valido.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        y = np.where(valido, y, 0.0)
+        x_media = (valido * x).sum(axis=1) / n
+        y_media = y.sum(axis=1) / n
+        dx = np.where(valido, x - x_media[:, None], 0.0)
+        dy = np.where(valido, y - y_media[:, None], 0.0)
+        return np.where(n >= 2, (dx * dy).sum(axis=1) / (dx * dx).sum(axis=1), np.nan)
+
+
+def analizar_curso(matriz, desde):
+    """Indicadores de un curso; matriz tiene una fila por alumno y una columna por día del rango.
+
+    Solo cuentan los días en que el curso tiene algún registro (los feriados y
+    fines de semana quedan afuera). Devuelve un dict de arrays por alumno y la
+    lista de lunes de las semanas consideradas.
+    """
+    dias = np.flatnonzero((matriz != SIN_REGISTRO).any(axis=0))
+    m = matriz[:, dias]
+    presente = (m == PRESENTE).astype(np.int64)
+    registrado = (m != SIN_REGISTRO).astype(np.int64)
+
+    presentes = presente.sum(axis=1)
+    registrados = registrado.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        porcentaje = np.where(registrados > 0, 100 * presentes / registrados, np.nan)
+
+    maxima, actual = rachas_de_ausencia(m == AUSENTE)
+
+    # Semanas de lunes a domingo: los días de cada semana quedan contiguos
+    semanas = (dias + desde.weekday()) // 7
+    if len(dias):
+        inicios = np.flatnonzero(np.r_[True, semanas[1:] != semanas[:-1]])
+        presentes_semana = np.add.reduceat(presente, inicios, axis=1)
+        registrados_semana = np.add.reduceat(registrado, inicios, axis=1)
+    else:
+        inicios = np.array([], dtype=np.int64)
+        presentes_semana = registrados_semana = np.zeros((len(m), 0), dtype=np.int64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        semanal = np.where(registrados_semana > 0, 100 * presentes_semana / registrados_semana, np.nan)
+    tendencia = pendiente(semanal, registrados_semana > 0)
+
+    lunes_inicial = desde - timedelta(days=desde.weekday())
+    lunes = [lunes_inicial + timedelta(weeks=int(s)) for s in semanas[inicios]]
+    return {
+        "presentes": presentes,
+        "registrados": registrados,
+        "porcentaje": porcentaje,
+        "racha_maxima": maxima,
+        "racha_actual": actual,
+        "semanal": semanal,
+        "tendencia": tendencia,
+    }, lunes
+
+
+def _redondear(valor, decimales=1):
+    return None if np.isnan(valor) else round(float(valor), decimales)
+
+
+def reporte_ausentismo(cur, desde, hasta, curso_id=None):
+    """Reporte por curso: [{curso_id, alumnos: [...], en_riesgo, porcentaje_medio, semanas}].
+
+    Cada alumno es un dict con porcentaje, rachas, asistencia semanal,
+    tendencia (puntos por semana) y los motivos por los que está en riesgo.
+    """
+    alumnos, matriz = cargar(cur, desde, hasta, curso_id)
+    cursos_ids = np.array([a[3] for a in alumnos], dtype=np.int64)
+    # Los alumnos vienen ordenados por curso: cada curso es un bloque de filas
+    cortes = np.flatnonzero(np.r_[True, cursos_ids[1:] != cursos_ids[:-1], True]) if len(alumnos) else [0]
+
+    reporte = []
+    for inicio, fin in zip(cortes[:-1], cortes[1:]):
+        datos, lunes = analizar_curso(matriz[inicio:fin], desde)
+        filas = []
+        for i, (alumno_id, apellido, nombre, _) in enumerate(alumnos[inicio:fin]):
+            motivos = []
+            if datos["porcentaje"][i] < UMBRAL_ASISTENCIA:
+                motivos.append(f"asistencia menor al {UMBRAL_ASISTENCIA}%")
+            if datos["racha_maxima"][i] >= RACHA_RIESGO:
+                motivos.append(f"{datos['racha_maxima'][i]} ausencias seguidas")
+            if datos["tendencia"][i] <= TENDENCIA_RIESGO:
+                motivos.append("asistencia en baja")
+            filas.append({
+                "alumno_id": alumno_id,
+                "apellido": apellido,
+                "nombre": nombre,
+                "presentes": int(datos["presentes"][i]),
+                "registrados": int(datos["registrados"][i]),
+                "porcentaje": _redondear(datos["porcentaje"][i]),
+                "racha_maxima": int(datos["racha_maxima"][i]),
+                "racha_actual": int(datos["racha_actual"][i]),
+                "semanal": [_redondear(v, 0) for v in datos["semanal"][i]],
+                "tendencia": _redondear(datos["tendencia"][i]),
+                "motivos": motivos,
+            })
+        # Primero los alumnos en riesgo, de menor a mayor asistencia
+        filas.sort(key=lambda f: (not f["motivos"], f["porcentaje"] if f["porcentaje"] is not None else 101))
+        reporte.append({
+            "curso_id": int(cursos_ids[inicio]),
+            "alumnos": filas,
+            "en_riesgo": sum(1 for f in filas if f["motivos"]),
+            "porcentaje_medio": _redondear(np.nanmean(datos["porcentaje"]))
+            if np.isfinite(datos["porcentaje"]).any() else None,
+            "semanas": lunes,
+        })
+    return reporte
@@ -1,98 +1,214 @@
 import os
+import sys
+import threading
+import time
 import psycopg2
-from flask import Flask, render_template, request, redirect, session, send_file, g
-from docx import Document
-from io import BytesIO
-from datetime import date, timedelta
+import psycopg2.extensions
+import hmac
+import unicodedata
+from flask import (Flask, render_template, request, redirect, session, send_file, g,
+                   Response, stream_with_context, jsonify)
+from werkzeug.middleware.proxy_fix import ProxyFix
+from tempfile import SpooledTemporaryFile
+from urllib.parse import quote
+from datetime import date, datetime, timedelta, timezone
+
+# Módulos compartidos con Asistente.py (comun/, en la raíz del repositorio)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analitica
+import cache
+import libreta
+import trabajos
+from cache import CacheLRU
+from comun import auth
+from comun.instrumentacion import Instrumentacion
+from conexiones import PoolConexiones, PoolAgotado
+from consultas import (guardar_asistencia, iterar_asistencia_por_alumno, estadisticas_cursos,
+                       guardar_notas, importar_notas, importar_alumnos, incrementar_version,
+                       iterar_asistencia_escuela, reconstruir_resumen_semanal, sincronizar_asistencia,
+                       actualizar_resumen_semanal, asistencia_cargada_por, cursos_asignados,
+                       incrementar_version_cursos, version_cursos,
+                       version_curso, version_grilla, bloquear_grilla, bloquear_grillas, grilla_semana)
+from planillas import (PlanillaInvalida, leer_planilla, convertir_nota, convertir_peso, filas_de_notas,
+                       filas_de_alumnos)
+from migraciones import aplicar_migraciones
+from exportaciones import (MAX_DIAS_RANGO, MIMETYPES, TIPOS, dias_habiles, csv_asistencia, generar,
+                           nombre_descarga, documentos_del_curso, zip_en_streaming)
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("SECRET_KEY", "clave_secreta_por_defecto")
+# Detrás de un proxy la IP real del cliente (límite de intentos de login) llega en X-Forwarded-For
+app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(os.environ.get("PROXY_SALTOS", 1)))
+
+# Tiempos por ruta, llamadas a la base y log de peticiones lentas (/metrics)
+instrumentacion = Instrumentacion(app)
+
+# Estadísticas del panel de administración, por semana consultada
+cache_estadisticas = CacheLRU("estadisticas", capacidad=16, ttl=int(os.environ.get("ADMIN_CACHE_TTL", 60)))
+# Cursos, asignaciones docente-curso y encabezados de curso de los formularios y exportaciones,
+# por versión de cursos (version_cursos en la base): un alta o baja de cursos o docentes en
+# cualquier worker cambia la versión y las entradas viejas de los demás dejan de usarse.
+cache_cursos = CacheLRU("cursos", capacidad=int(os.environ.get("CURSOS_CACHE_CAPACIDAD", 1024)),
+                        ttl=int(os.environ.get("CURSOS_CACHE_TTL", 300)))
+# Libreta de calificaciones por (curso, versión de datos): una carga de notas
+# cambia la versión, así que la libreta vieja deja de usarse sin invalidar a mano.
+cache_libretas = CacheLRU("libretas", capacidad=int(os.environ.get("LIBRETAS_CACHE_CAPACIDAD", 128)),
+                          ttl=int(os.environ.get("LIBRETAS_CACHE_TTL", 600)))
 
 # ================== Base de datos ==================
 
-# Nueva función para obtener la conexión a la base de datos de PostgreSQL
+# Cursor que le pasa a la instrumentación cada sentencia y su tiempo; la
+# instrumentación cuenta las de cada petición y las expone en X-Consultas-DB
+class CursorContador(psycopg2.extensions.cursor):
+    def execute(self, query, vars=None):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            instrumentacion.registrar_consulta(query, time.perf_counter() - inicio)
+
+    def executemany(self, query, vars_list):
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            instrumentacion.registrar_consulta(query, time.perf_counter() - inicio)
+
+    def copy_expert(self, sql, file, size=8192):
+        inicio = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            instrumentacion.registrar_consulta(sql, time.perf_counter() - inicio)
+
+
+# Pool de conexiones del proceso (se crea con la primera petición)
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                db_url = os.environ.get('DATABASE_URL')
+                if not db_url:
+                    raise RuntimeError("DATABASE_URL no está configurada en el entorno.")
+                _pool = PoolConexiones(
+                    db_url,
+                    minimo=int(os.environ.get("DB_POOL_MIN", 1)),
+                    maximo=int(os.environ.get("DB_POOL_MAX", 10)),
+                    vida_maxima=int(os.environ.get("DB_POOL_VIDA_MAXIMA", 1800)),
+                    verificar_tras=int(os.environ.get("DB_POOL_VERIFICAR_TRAS", 30)),
+                    espera_maxima=int(os.environ.get("DB_POOL_ESPERA", 10)),
+                    cursor_factory=CursorContador
+                )
+    return _pool
+
+
+# Toma una conexión del pool para la petición actual
 def get_db():
     db = getattr(g, '_database', None)
     if db is None:
-        db_url = os.environ.get('DATABASE_URL')
-        if not db_url:
-            raise RuntimeError("DATABASE_URL no está configurada en el entorno.")
-        db = g._database = psycopg2.connect(db_url)
+        db = g._database = get_pool().obtener()
     return db
 
-# Nueva función para cerrar la conexión de PostgreSQL
+# Devuelve la conexión al pool al terminar la petición
 @app.teardown_appcontext
 def close_connection(exception):
-    db = getattr(g, '_database', None)
+    db = g.pop('_database', None)
     if db is not None:
-        db.close()
+        # Una conexión que falló a nivel de red no se reutiliza
+        get_pool().devolver(db, descartar=isinstance(exception, (psycopg2.OperationalError,
+                                                                 psycopg2.InterfaceError)))
 
-# Función para inicializar la base de datos (con sintaxis de PostgreSQL)
-def init_db():
-    with app.app_context():
-        con = get_db()
-        cur = con.cursor()
 
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS usuarios (
-                id SERIAL PRIMARY KEY,
-                usuario TEXT UNIQUE,
-                nombre TEXT,
-                apellido TEXT,
-                rol TEXT,
-                clave TEXT,
-                perfil TEXT
-            )
-        """)
+# Flask corre teardown_appcontext apenas retorna la vista, aunque el cuerpo de
+# una respuesta en streaming se siga generando: la conexión de la petición se
+# saca de g y vuelve al pool recién al terminar el envío (si no, los cursores
+# con nombre quedan inválidos a mitad de la descarga).
+def en_streaming(generador):
+    con = g.pop('_database', None)
 
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS cursos (
-                id SERIAL PRIMARY KEY,
-                nombre TEXT,
-                año INTEGER
-            )
-        """)
+    def cuerpo():
+        error = None
+        try:
+            yield from generador
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if con is not None:
+                get_pool().devolver(con, descartar=isinstance(error, (psycopg2.OperationalError,
+                                                                      psycopg2.InterfaceError)))
 
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS alumnos (
-                id SERIAL PRIMARY KEY,
-                nombre TEXT,
-                apellido TEXT,
-                curso_id INTEGER REFERENCES cursos(id) ON DELETE CASCADE
-            )
-        """)
+    return stream_with_context(cuerpo())
 
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS docente_cursos (
-                id SERIAL PRIMARY KEY,
-                docente_id INTEGER REFERENCES usuarios(id) ON DELETE CASCADE,
-                curso_id INTEGER REFERENCES cursos(id) ON DELETE CASCADE
-            )
-        """)
 
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS notas (
-                id SERIAL PRIMARY KEY,
-                alumno_id INTEGER REFERENCES alumnos(id) ON DELETE CASCADE,
-                docente_id INTEGER REFERENCES usuarios(id) ON DELETE CASCADE,
-                curso_id INTEGER REFERENCES cursos(id) ON DELETE CASCADE,
-                nota REAL,
-                fecha TEXT
-            )
-        """)
+@app.errorhandler(PoolAgotado)
+def pool_agotado(e):
+    return "El servidor está ocupado, intente nuevamente en unos segundos.", 503
 
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS asistencia (
-                id SERIAL PRIMARY KEY,
-                alumno_id INTEGER REFERENCES alumnos(id) ON DELETE CASCADE,
-                docente_id INTEGER REFERENCES usuarios(id) ON DELETE CASCADE,
-                curso_id INTEGER REFERENCES cursos(id) ON DELETE CASCADE,
-                fecha TEXT,
-                presente INTEGER
-            )
-        """)
 
-        con.commit()
+# ================== Lecturas cacheadas ==================
+
+def _leer(sql, params=()):
+    cur = get_db().cursor()
+    cur.execute(sql, params)
+    return cur.fetchall()
+
+
+def _version_cursos():
+    # Una lectura por petición
+    if "_version_cursos" not in g:
+        g._version_cursos = version_cursos(get_db().cursor())
+    return g._version_cursos
+
+
+def listar_cursos():
+    return cache_cursos.obtener(("cursos", _version_cursos()), lambda: _leer("SELECT * FROM cursos"))
+
+
+def cursos_del_docente(docente_id):
+    # (curso_id, nombre, año) de cada curso asignado, para mostrar. Para decidir
+    # si el docente puede ver un curso se usa cursos_asignados(), sin cache.
+    return cache_cursos.obtener(("asignaciones", docente_id, _version_cursos()),
+                                lambda: cursos_asignados(get_db().cursor(), docente_id))
+
+
+def encabezado_curso(curso_id):
+    # (nombre, año) o None si el curso no existe
+    filas = cache_cursos.obtener(("curso", curso_id, _version_cursos()),
+                                 lambda: _leer("SELECT nombre, año FROM cursos WHERE id=%s", (curso_id,)))
+    return filas[0] if filas else None
+
+
+def libreta_del_curso(curso_id):
+    cur = get_db().cursor()
+    return cache_libretas.obtener(
+        (curso_id, version_curso(cur, curso_id)),
+        lambda: libreta.cargar(cur, curso_id).get(curso_id) or libreta.vacia()
+    )
+
+
+def invalidar_cursos(cur):
+    # Antes del commit, en la misma transacción que el cambio
+    incrementar_version_cursos(cur)
+    cache_cursos.invalidar()
+    cache_estadisticas.invalidar()
+
+
+# Función para inicializar la base de datos (con sintaxis de PostgreSQL)
+def init_db():
+    with app.app_context():
+        con = get_db()
+        cur = con.cursor()
+
+        # Tablas, índices y restricciones: solo se aplican las migraciones pendientes
+        for version in aplicar_migraciones(con):
+            print(f"Migración {version} aplicada")
 
         # Verificar si el usuario 'admin' existe, si no, lo crea.
         cur.execute("SELECT * FROM usuarios WHERE rol=%s", ('admin',))
@@ -100,25 +216,67 @@ def init_db():
             cur.execute("""
                 INSERT INTO usuarios (usuario, nombre, apellido, rol, clave, perfil)
                 VALUES (%s, %s, %s, %s, %s, %s)
-            """, ("admin", "Admin", "Taller", "admin", "1234", ""))
+            """, ("admin", "Admin", "Taller", "admin", auth.hashear("1234"), ""))
             con.commit()
             print("Usuario admin creado: usuario=admin, clave=1234")
 
 
+@app.cli.command("init-db")
+def init_db_comando():
+    """Aplica las migraciones pendientes y crea el usuario admin."""
+    init_db()
+
+
+@app.cli.command("reconstruir-resumen")
+def reconstruir_resumen_comando():
+    """Regenera asistencia_semanal a partir de la tabla asistencia."""
+    with app.app_context():
+        con = get_db()
+        filas = reconstruir_resumen_semanal(con.cursor())
+        con.commit()
+        print(f"Resumen semanal regenerado: {filas} filas")
+
+
 # ================== Login ==================
+# Hash de claves, límite de intentos y revalidación de la sesión: comun/auth.py
+@app.before_request
+def revalidar_sesion():
+    # Revalidación periódica: entre medio las rutas confían en la sesión firmada.
+    # Si el usuario ya no existe se vacía la sesión y cada ruta responde como sin login.
+    if request.endpoint == "static" or "usuario_id" not in session or not auth.sesion_vencida(session):
+        return
+    cur = get_db().cursor()
+    cur.execute("SELECT rol FROM usuarios WHERE id=%s", (session["usuario_id"],))
+    usuario = cur.fetchone()
+    if usuario is None:
+        session.clear()
+        return
+    session["rol"] = usuario[0]
+    auth.marcar_sesion_validada(session)
+
+
 @app.route("/", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
         usuario_form = request.form["usuario"]
         clave = request.form["clave"]
+        # El límite se controla antes de consultar la base o calcular el hash
+        if not auth.intento_permitido(usuario_form, request.remote_addr or "-"):
+            return "Demasiados intentos. Esperá unos minutos.", 429
         con = get_db()
         cur = con.cursor()
-        cur.execute("SELECT * FROM usuarios WHERE usuario=%s AND clave=%s", (usuario_form, clave))
+        cur.execute("SELECT id, rol, clave FROM usuarios WHERE usuario=%s", (usuario_form,))
         usuario = cur.fetchone()
-        if usuario:
+        valida, nuevo_hash = auth.verificar_clave(usuario[2], clave) if usuario else (False, None)
+        if valida:
+            if nuevo_hash:
+                cur.execute("UPDATE usuarios SET clave=%s WHERE id=%s", (nuevo_hash, usuario[0]))
+                con.commit()
+            auth.login_exitoso(usuario_form)
             session["usuario_id"] = usuario[0]
-            session["rol"] = usuario[4]
-            if usuario[4] == "admin":
+            session["rol"] = usuario[1]
+            auth.marcar_sesion_validada(session)
+            if usuario[1] == "admin":
                 return redirect("/admin")
             else:
                 return redirect("/docente")
@@ -134,8 +292,7 @@ def admin():
         con = get_db()
         cur = con.cursor()
 
-        cur.execute("SELECT * FROM cursos")
-        cursos = cur.fetchall()
+        cursos = listar_cursos()
 
         cur.execute("""
             SELECT u.id, u.nombre, u.apellido, u.usuario, c.nombre, c.año
@@ -173,11 +330,45 @@ def admin():
         lunes_actual = hoy - timedelta(days=hoy.weekday())
         fecha_inicio_default = lunes_actual.isoformat()
 
+        estadisticas = cache_estadisticas.obtener(
+            lunes_actual,
+            lambda: estadisticas_cursos(cur, lunes_actual, lunes_actual + timedelta(days=4))
+        )
+
         return render_template("admin.html",
                                cursos=cursos,
                                docentes=docentes,
                                alumnos_curso=alumnos_curso,
-                               fecha_inicio_default=fecha_inicio_default)
+                               estadisticas=estadisticas,
+                               fecha_inicio_default=fecha_inicio_default,
+                               fecha_fin_default=(lunes_actual + timedelta(days=4)).isoformat())
+    return redirect("/")
+
+
+# Estado del pool de conexiones de este worker
+@app.route("/admin/pool")
+def estado_pool():
+    if "rol" in session and session["rol"] == "admin":
+        return jsonify(get_pool().estadisticas())
+    return redirect("/")
+
+
+# Aciertos, fallos y desalojos de los caches de este worker
+# Formato de texto de Prometheus. Con METRICAS_TOKEN se exige ?token= o "Authorization: Bearer".
+@app.route("/metrics")
+def metricas():
+    token = os.environ.get("METRICAS_TOKEN")
+    if token:
+        recibido = request.args.get("token") or request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(recibido.encode(), token.encode()):
+            return "No autorizado", 401
+    return Response(instrumentacion.texto_metricas(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/admin/cache")
+def estado_cache():
+    if "rol" in session and session["rol"] == "admin":
+        return jsonify(cache.estadisticas())
     return redirect("/")
 
 
@@ -191,6 +382,7 @@ def agregar_curso():
             con = get_db()
             cur = con.cursor()
             cur.execute("INSERT INTO cursos (nombre, año) VALUES (%s,%s)", (nombre, año))
+            invalidar_cursos(cur)
             con.commit()
             return redirect("/admin")
         return render_template("agregar_curso.html")
@@ -203,8 +395,7 @@ def agregar_docente():
     if "rol" in session and session["rol"] == "admin":
         con = get_db()
         cur = con.cursor()
-        cur.execute("SELECT * FROM cursos")
-        cursos = cur.fetchall()
+        cursos = listar_cursos()
 
         if request.method == "POST":
             usuario = request.form["usuario"].strip()
@@ -222,7 +413,7 @@ def agregar_docente():
             else:
                 cur.execute(
                     "INSERT INTO usuarios (usuario, nombre, apellido, rol, clave, perfil) VALUES (%s,%s,%s,%s,%s,%s) RETURNING id",
-                    (usuario, nombre, apellido, "docente", clave, perfil)
+                    (usuario, nombre, apellido, "docente", auth.hashear(clave), perfil)
                 )
                 docente_id = cur.fetchone()[0]
 
@@ -230,6 +421,7 @@ def agregar_docente():
             if not cur.fetchone():
                 cur.execute("INSERT INTO docente_cursos (docente_id, curso_id) VALUES (%s,%s)", (docente_id, curso_id))
 
+            invalidar_cursos(cur)
             con.commit()
             return redirect("/admin")
 
@@ -243,17 +435,55 @@ def agregar_alumno():
     if "rol" in session and session["rol"] == "admin":
         con = get_db()
         cur = con.cursor()
-        cur.execute("SELECT * FROM cursos")
-        cursos = cur.fetchall()
         if request.method == "POST":
             nombre = request.form["nombre"]
             apellido = request.form["apellido"]
             curso_id = request.form["curso"]
+            bloquear_grilla(cur, curso_id)
             cur.execute("INSERT INTO alumnos (nombre, apellido, curso_id) VALUES (%s,%s,%s)",
                         (nombre, apellido, curso_id))
+            incrementar_version(cur, curso_id)
             con.commit()
+            cache_estadisticas.invalidar()
             return redirect("/admin")
-        return render_template("agregar_alumno.html", cursos=cursos)
+        return render_template("agregar_alumno.html", cursos=listar_cursos())
+    return redirect("/")
+
+
+# ================== Importar alumnos ==================
+# Planilla CSV/XLSX con columnas apellido, nombre y curso
+@app.route("/importar_alumnos", methods=["GET", "POST"])
+def importar_alumnos_planilla():
+    if "rol" in session and session["rol"] == "admin":
+        if request.method == "POST":
+            inicio = time.perf_counter()
+            archivo = request.files.get("planilla")
+            if not archivo or not archivo.filename:
+                return render_template("importar_alumnos.html", errores=[("-", "No se seleccionó ningún archivo")])
+
+            con = get_db()
+            cur = con.cursor()
+            cur.execute("SELECT id, nombre, año FROM cursos")
+            try:
+                filas, errores = filas_de_alumnos(leer_planilla(archivo), cur.fetchall())
+            except PlanillaInvalida as e:
+                return render_template("importar_alumnos.html", errores=[("-", str(e))])
+
+            bloquear_grillas(cur, {curso_id for _, _, curso_id in filas})
+            insertados = importar_alumnos(cur, filas)
+            if insertados:
+                incrementar_version(cur, *{curso_id for _, _, curso_id in filas})
+            con.commit()
+            if insertados:
+                cache_estadisticas.invalidar()
+            return render_template(
+                "importar_alumnos.html",
+                insertados=insertados,
+                omitidos=len(filas) - insertados,
+                errores=errores,
+                segundos=round(time.perf_counter() - inicio, 2)
+            )
+        return render_template("importar_alumnos.html")
     return redirect("/")
 
 
@@ -262,17 +492,7 @@ def agregar_alumno():
 def docente():
     if "rol" in session and session["rol"] == "docente":
         docente_id = session["usuario_id"]
-        con = get_db()
-        cur = con.cursor()
-        cur.execute("""
-            SELECT dc.id, c.nombre, c.año, c.id
-            FROM docente_cursos dc
-            JOIN cursos c ON c.id = dc.curso_id
-            WHERE dc.docente_id=%s
-        """, (docente_id,))
-        asignaciones_raw = cur.fetchall()
-
-        asignaciones = [(row[3], row[1], row[2]) for row in asignaciones_raw]
+        asignaciones = cursos_del_docente(docente_id)
 
         hoy = date.today().isoformat()
 
@@ -287,25 +507,69 @@ def notas(curso_id):
         docente_id = session["usuario_id"]
         con = get_db()
         cur = con.cursor()
-        cur.execute("SELECT * FROM alumnos WHERE curso_id=%s", (curso_id,))
+        cur.execute("SELECT id, nombre, apellido FROM alumnos WHERE curso_id=%s", (curso_id,))
         alumnos = cur.fetchall()
 
         if request.method == "POST":
-            fecha = date.today().isoformat()
+            fecha = date.today()
+            evaluacion = request.form.get("evaluacion", "").strip() or None
+            peso, error = convertir_peso(request.form.get("peso"))
+            if error:
+                return render_template("notas.html", alumnos=alumnos, curso_id=curso_id,
+                                       errores=[("Peso", error)])
+            filas, errores = [], []
             for alumno in alumnos:
-                nota = request.form.get(f"nota_{alumno[0]}")
-                if nota:
-                    cur.execute(
-                        "INSERT INTO notas (alumno_id, docente_id, curso_id, nota, fecha) VALUES (%s,%s,%s,%s,%s)",
-                        (alumno[0], docente_id, curso_id, float(nota), fecha)
-                    )
+                texto = request.form.get(f"nota_{alumno[0]}")
+                if texto:
+                    nota, error = convertir_nota(texto)
+                    if error:
+                        errores.append((f"{alumno[2]}, {alumno[1]}", error))
+                    else:
+                        filas.append((alumno[0], nota, fecha, evaluacion, peso))
+            insertadas = guardar_notas(cur, docente_id, curso_id, filas)
+            if insertadas:
+                incrementar_version(cur, curso_id)
             con.commit()
-            return "Notas registradas correctamente"
+            if insertadas:
+                cache_estadisticas.invalidar()
+            return render_template("notas.html", alumnos=alumnos, curso_id=curso_id,
+                                   insertadas=insertadas, errores=errores)
 
         return render_template("notas.html", alumnos=alumnos, curso_id=curso_id)
     return redirect("/")
 
 
+# Carga masiva de notas desde una planilla CSV o XLSX
+@app.route("/notas/<int:curso_id>/importar", methods=["POST"])
+def importar_notas_planilla(curso_id):
+    if "rol" in session and session["rol"] == "docente":
+        docente_id = session["usuario_id"]
+        con = get_db()
+        cur = con.cursor()
+        cur.execute("SELECT id, nombre, apellido FROM alumnos WHERE curso_id=%s", (curso_id,))
+        alumnos = cur.fetchall()
+
+        archivo = request.files.get("planilla")
+        if not archivo or not archivo.filename:
+            return render_template("notas.html", alumnos=alumnos, curso_id=curso_id,
+                                   errores=[("-", "No se seleccionó ningún archivo")])
+        try:
+            filas, errores = filas_de_notas(leer_planilla(archivo), alumnos, date.today())
+        except PlanillaInvalida as e:
+            return render_template("notas.html", alumnos=alumnos, curso_id=curso_id,
+                                   errores=[("-", str(e))])
+
+        insertadas = importar_notas(cur, docente_id, curso_id, filas)
+        if insertadas:
+            incrementar_version(cur, curso_id)
+        con.commit()
+        if insertadas:
+            cache_estadisticas.invalidar()
+        return render_template("notas.html", alumnos=alumnos, curso_id=curso_id,
+                               insertadas=insertadas, omitidas=len(filas) - insertadas, errores=errores)
+    return redirect("/")
+
+
 # ================== Asistencia ==================
 @app.route("/asistencia/<int:curso_id>", methods=["GET", "POST"])
 def asistencia(curso_id):
@@ -325,39 +589,42 @@ def asistencia(curso_id):
 
     con = get_db()
     cur = con.cursor()
+    if request.method == "POST":
+        # Antes de leer los alumnos: un alta o baja del curso espera a que termine el guardado
+        bloquear_grilla(cur, curso_id)
 
     cur.execute("SELECT id, nombre, apellido FROM alumnos WHERE curso_id=%s", (curso_id,))
     alumnos = cur.fetchall()
 
-    if request.method == "POST":
-        for alumno in alumnos:
-            for f in fechas_semana:
-                presente = request.form.get(f"asistencia_{alumno[0]}_{f}")
-                cur.execute("""
-                    SELECT id FROM asistencia
-                    WHERE alumno_id=%s AND docente_id=%s AND curso_id=%s AND fecha=%s
-                """, (alumno[0], docente_id, curso_id, f.isoformat()))
-                existing = cur.fetchone()
-                if existing:
-                    cur.execute("UPDATE asistencia SET presente=%s WHERE id=%s", (1 if presente else 0, existing[0]))
-                else:
-                    cur.execute("""
-                        INSERT INTO asistencia (alumno_id, docente_id, curso_id, fecha, presente)
-                        VALUES (%s, %s, %s, %s, %s)
-                    """, (alumno[0], docente_id, curso_id, f.isoformat(), 1 if presente else 0))
-        con.commit()
-        return redirect(f"/asistencia/{curso_id}?inicio={inicio_semana.isoformat()}")
+    def grilla_actual():
+        return grilla_semana(cur, curso_id, docente_id, inicio_semana, [alumno[0] for alumno in alumnos])
 
-    asistencia = {}
-    for alumno in alumnos:
-        asistencia[alumno[0]] = {}
-        for f in fechas_semana:
-            cur.execute("""
-                SELECT presente FROM asistencia
-                WHERE alumno_id=%s AND docente_id=%s AND curso_id=%s AND fecha=%s
-            """, (alumno[0], docente_id, curso_id, f.isoformat()))
-            res = cur.fetchone()
-            asistencia[alumno[0]][f] = res[0] if res else 0
+    conflicto = False
+    if request.method == "POST":
+        # Formulario sin JavaScript: llega la grilla entera y las casillas sin marcar no
+        # vienen. Con JavaScript la página guarda por /asistencia/sincronizar.
+        celdas = [
+            (alumno[0], f, request.form.get(f"asistencia_{alumno[0]}_{f}"))
+            for alumno in alumnos
+            for f in fechas_semana
+        ]
+
+        grilla = grilla_actual()
+        version = request.form.get("version")
+        if version and version != version_grilla(grilla):
+            # Otro (otra pestaña, otro dispositivo) guardó esta semana después de abrir la grilla
+            con.rollback()
+            conflicto = True
+        else:
+            cambios = guardar_asistencia(cur, docente_id, curso_id, celdas)
+            if cambios:
+                incrementar_version(cur, curso_id)
+            con.commit()
+            if cambios:
+                cache_estadisticas.invalidar()
+            return redirect(f"/asistencia/{curso_id}?inicio={inicio_semana.isoformat()}&cambios={cambios}")
+    else:
+        grilla = grilla_actual()
 
     dias_semana = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes"]
     fechas_semana_nombres = [(f, dias_semana[f.weekday()]) for f in fechas_semana]
@@ -369,160 +636,358 @@ def asistencia(curso_id):
         "asistencia.html",
         alumnos=alumnos,
         fechas=fechas_semana_nombres,
-        asistencia=asistencia,
+        asistencia=grilla,
+        version=version_grilla(grilla),
+        conflicto=conflicto,
         curso_id=curso_id,
         semana_anterior=semana_anterior,
-        semana_siguiente=semana_siguiente
-    )
+        semana_siguiente=semana_siguiente,
+        cambios=request.args.get("cambios", type=int)
+    ), 409 if conflicto else 200
+
+
+def _celdas_json(grilla):
+    # {"<alumno_id>_<fecha>": presente}, como los nombres de las casillas de la grilla
+    return {f"{a}_{f.isoformat()}": p for a, fila in grilla.items() for f, p in fila.items()}
+
+
+# ================== Sincronización de asistencia ==================
+# La grilla guarda las marcas en el navegador (static/js/asistencia.js) y las
+# manda por lotes: una petición por sesión de carga en lugar de un POST y una
+# recarga de la grilla por cada guardado. Sirve también sin conexión: la cola
+# queda en el navegador hasta que vuelve la red. Cada lote lleva la versión de
+# las grillas en las que se hicieron las marcas; si otro guardó esa semana
+# mientras tanto, esas marcas no se aplican y se devuelve la grilla actual.
+MAX_MARCAS_POR_LOTE = int(os.environ.get("MAX_MARCAS_POR_LOTE", 2000))
+
+
+def _leer_marca(item):
+    # (alumno_id, curso_id, fecha, presente, marca); ValueError/TypeError/KeyError si está mal formada
+    marca = datetime.fromisoformat(str(item["marca"]).replace("Z", "+00:00"))
+    if marca.tzinfo is None:
+        marca = marca.replace(tzinfo=timezone.utc)
+    curso_id = int(item["curso_id"]) if item.get("curso_id") is not None else None
+    return int(item["alumno_id"]), curso_id, date.fromisoformat(item["fecha"]), bool(item["presente"]), marca
+
+
+def _leer_versiones(versiones):
+    # {"<curso_id>|<inicio>": version} -> {(curso_id, inicio): version}; las claves mal formadas se ignoran
+    leidas = {}
+    for clave, version in (versiones if isinstance(versiones, dict) else {}).items():
+        curso_id, _, inicio = clave.partition("|")
+        try:
+            leidas[(int(curso_id), date.fromisoformat(inicio))] = str(version)
+        except ValueError:
+            continue
+    return leidas
+
+
+def _clave_grilla(clave):
+    curso_id, inicio = clave
+    return f"{curso_id}|{inicio.isoformat()}"
+
+
+@app.route("/asistencia/sincronizar", methods=["POST"])
+def sincronizar():
+    if session.get("rol") != "docente":
+        return jsonify(error="Sesión vencida"), 401
+    datos = request.get_json(silent=True)
+    if not isinstance(datos, dict) or not isinstance(datos.get("marcas"), list):
+        return jsonify(error="Se esperaba {\"marcas\": [...]}"), 400
+    if len(datos["marcas"]) > MAX_MARCAS_POR_LOTE:
+        return jsonify(error=f"Como máximo {MAX_MARCAS_POR_LOTE} marcas por lote"), 413
+
+    # Una marca mal formada no traba la cola: se informa y el cliente la descarta
+    # validas[j] es el índice en el lote de la j-ésima marca bien formada
+    marcas, validas, invalidas = [], [], []
+    for i, item in enumerate(datos["marcas"]):
+        try:
+            marcas.append(_leer_marca(item))
+            validas.append(i)
+        except (ValueError, TypeError, KeyError, AttributeError):
+            invalidas.append(i)
 
-
-# ================== Exportar Notas ==================
-@app.route("/exportar_notas/<int:curso_id>")
-def exportar_notas(curso_id):
     con = get_db()
     cur = con.cursor()
+    # Las marcas de alumnos que no son de los cursos del docente no se aplican
+    resultado = sincronizar_asistencia(cur, session["usuario_id"], marcas, _leer_versiones(datos.get("versiones")))
+    celdas = resultado["celdas"]
+    cursos = {curso_id for _, curso_id, _, _, aplicada in celdas if aplicada}
+    if cursos:
+        incrementar_version(cur, *cursos)
+    con.commit()
+    if cursos:
+        cache_estadisticas.invalidar()
+
+    return jsonify(
+        cambios=sum(1 for celda in celdas if celda[4]),
+        invalidas=invalidas,
+        rechazadas=[validas[i] for i in resultado["rechazadas"]],
+        en_conflicto=[validas[i] for i in resultado["en_conflicto"]],
+        conflictos={_clave_grilla(clave): {"version": version_grilla(grilla), "celdas": _celdas_json(grilla)}
+                    for clave, grilla in resultado["conflictos"].items()},
+        versiones={_clave_grilla(clave): version for clave, version in resultado["versiones"].items()},
+        celdas=[{"alumno_id": alumno_id, "curso_id": curso_id, "fecha": fecha.isoformat(),
+                 "presente": presente, "aplicada": aplicada}
+                for alumno_id, curso_id, fecha, presente, aplicada in celdas],
+    )
 
-    cur.execute("SELECT nombre, año FROM cursos WHERE id=%s", (curso_id,))
-    curso = cur.fetchone()
-    curso_nombre = f"{curso[0]} - Año {curso[1]}" if curso else "Curso Desconocido"
-
-    doc = Document()
-    doc.add_heading(f"Notas del Curso: {curso_nombre}", 0)
 
-    cur.execute("""
-        SELECT a.apellido || ', ' || a.nombre, n.nota
-        FROM alumnos a
-        LEFT JOIN notas n ON a.id = n.alumno_id
-        WHERE a.curso_id=%s
-        ORDER BY a.apellido, a.nombre
-    """, (curso_id,))
-    resultados = cur.fetchall()
+# El service worker tiene que servirse desde la raíz para controlar /asistencia/...
+@app.route("/sw.js")
+def service_worker():
+    respuesta = app.send_static_file("js/sw.js")
+    respuesta.headers["Cache-Control"] = "no-cache"
+    return respuesta
 
-    table = doc.add_table(rows=1, cols=2)
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = 'Alumno'
-    hdr_cells[1].text = 'Nota'
 
-    for alumno, nota in resultados:
-        row_cells = table.add_row().cells
-        row_cells[0].text = alumno
-        row_cells[1].text = str(nota if nota is not None else "")
+# ================== Exportar Notas ==================
+@app.route("/exportar_notas/<int:curso_id>")
+def exportar_notas(curso_id):
+    curso = encabezado_curso(curso_id)
+    return _enviar_exportacion("notas", curso_id, curso, datos=libreta_del_curso(curso_id))
 
-    buffer = BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
 
-    return send_file(buffer, as_attachment=True, download_name=f"Notas_{curso_nombre}.docx",
-                     mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+# ================== Libreta ==================
+@app.route("/libreta/<int:curso_id>")
+def ver_libreta(curso_id):
+    if "rol" not in session:
+        return redirect("/")
+    if session["rol"] != "admin" and curso_id not in {c[0] for c in cursos_asignados(get_db().cursor(),
+                                                                                      session["usuario_id"])}:
+        return "Curso no encontrado", 404
+    curso = encabezado_curso(curso_id)
+    if not curso:
+        return "Curso no encontrado", 404
+    return render_template("libreta.html", libreta=libreta_del_curso(curso_id), curso=curso, curso_id=curso_id)
 
 
 # ================== Exportar Asistencia ==================
+# Una semana (?inicio=) o un rango de hasta un ciclo lectivo (?desde=&hasta=),
+# en formato docx (por defecto), csv o xlsx (?formato=).
+def rango_exportacion(args):
+    """Devuelve (desde, hasta, formato) o lanza ValueError con el mensaje para el usuario."""
+    try:
+        if args.get("desde") and args.get("hasta"):
+            desde = date.fromisoformat(args["desde"])
+            hasta = date.fromisoformat(args["hasta"])
+        else:
+            inicio_semana_str = args.get("inicio")
+            if inicio_semana_str:
+                desde = date.fromisoformat(inicio_semana_str)
+            else:
+                hoy = date.today()
+                desde = hoy - timedelta(days=hoy.weekday())
+            hasta = desde + timedelta(days=4)
+    except ValueError:
+        raise ValueError("Fecha inválida")
+
+    if hasta < desde or (hasta - desde).days > MAX_DIAS_RANGO:
+        raise ValueError(f"Rango inválido: debe ser de 1 a {MAX_DIAS_RANGO} días")
+
+    formato = args.get("formato", "docx")
+    if formato not in MIMETYPES:
+        raise ValueError("Formato no soportado")
+    return desde, hasta, formato
+
+
+def como_adjunto(respuesta, nombre):
+    # Como send_file(download_name=...): el nombre va entre comillas y, si no es
+    # ASCII (p. ej. "1°A, tarde"), también codificado en filename* (RFC 5987)
+    try:
+        nombre.encode("ascii")
+        nombres = {"filename": nombre}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", nombre).encode("ascii", "ignore").decode("ascii")
+        nombres = {"filename": simple, "filename*": "UTF-8''" + quote(nombre, safe="!#$&+-.^_`|~")}
+    respuesta.headers.set("Content-Disposition", "attachment", **nombres)
+    return respuesta
+
+
 @app.route("/exportar_asistencia/<int:curso_id>")
 def exportar_asistencia(curso_id):
-    inicio_semana_str = request.args.get("inicio")
-    if inicio_semana_str:
-        inicio_semana = date.fromisoformat(inicio_semana_str)
-    else:
-        hoy = date.today()
-        inicio_semana = hoy - timedelta(days=hoy.weekday())
+    try:
+        desde, hasta, formato = rango_exportacion(request.args)
+    except ValueError as e:
+        return str(e), 400
 
-    fechas_semana = [inicio_semana + timedelta(days=i) for i in range(5)]
-    dias_semana = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes"]
-    fechas_semana_nombres = [(f, dias_semana[f.weekday()]) for f in fechas_semana]
+    curso = encabezado_curso(curso_id)
+    if not curso:
+        return "Curso no encontrado"
+
+    if formato == "csv":
+        # Cursor server-side: las filas se leen y se envían por lotes
+        cursor = get_db().cursor(name="exportar_asistencia")
+        filas = iterar_asistencia_por_alumno(cursor, curso_id, desde, hasta)
+        return como_adjunto(
+            Response(en_streaming(csv_asistencia(filas, dias_habiles(desde, hasta))), mimetype=MIMETYPES["csv"]),
+            nombre_descarga("asistencia", curso, desde, hasta, formato)
+        )
+
+    return _enviar_exportacion("asistencia", curso_id, curso, desde, hasta, formato)
 
-    con = get_db()
-    cur = con.cursor()
 
-    cur.execute("SELECT nombre, año FROM cursos WHERE id=%s", (curso_id,))
-    curso = cur.fetchone()
+# ================== Exportar Alumnos ==================
+@app.route("/exportar_alumnos/<int:curso_id>")
+def exportar_alumnos(curso_id):
+    curso = encabezado_curso(curso_id)
     if not curso:
         return "Curso no encontrado"
-    curso_nombre, curso_año = curso
+    return _enviar_exportacion("alumnos", curso_id, curso)
 
-    cur.execute(
-        "SELECT id, apellido, nombre FROM alumnos WHERE curso_id=%s ORDER BY apellido, nombre",
-        (curso_id,)
-    )
-    alumnos = cur.fetchall()
 
-    doc = Document()
-    doc.add_heading(f"Asistencia del Curso: {curso_nombre} - Año {curso_año}", 0)
-    doc.add_paragraph(
-        f"Semana: {inicio_semana.strftime('%d/%m/%Y')} - "
-        f"{(inicio_semana + timedelta(days=4)).strftime('%d/%m/%Y')}"
-    )
-    doc.add_paragraph("")
+# ================== Exportar Todo ==================
+# Un ZIP con la asistencia y las notas de cada curso del rango pedido
+# (?desde=&hasta=, por defecto la semana actual). Los datos salen de dos
+# consultas para toda la escuela, los documentos se arman en el pool de
+# procesos y el ZIP se envía a medida que se completa cada curso.
+@app.route("/exportar_todo")
+def exportar_todo():
+    if "rol" not in session or session["rol"] != "admin":
+        return redirect("/")
+    try:
+        desde, hasta, _ = rango_exportacion(request.args)
+    except ValueError as e:
+        return str(e), 400
 
-    table = doc.add_table(rows=1, cols=1 + len(fechas_semana))
-    table.style = 'Table Grid'
+    con = get_db()
+    libretas = libreta.cargar(con.cursor(), desde=desde, hasta=hasta)
+    cursos = iterar_asistencia_escuela(con.cursor(name="exportar_todo"), desde, hasta)
+    tareas = ((curso, filas, libretas.get(curso[0]) or libreta.vacia(), desde, hasta) for curso, filas in cursos)
 
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = "Alumno"
-    for i, (fecha, nombre_dia) in enumerate(fechas_semana_nombres):
-        hdr_cells[i + 1].text = f"{nombre_dia}\n{fecha.strftime('%d/%m')}"
+    def archivos():
+        for documentos in trabajos.en_paralelo(documentos_del_curso, tareas):
+            yield from documentos
 
-    for alumno_id, apellido, nombre in alumnos:
-        row_cells = table.add_row().cells
-        row_cells[0].text = f"{apellido}, {nombre}"
-        for j, (fecha, nombre_dia) in enumerate(fechas_semana_nombres):
-            cur.execute("""
-                SELECT presente FROM asistencia
-                WHERE alumno_id=%s AND curso_id=%s AND fecha=%s
-            """, (alumno_id, curso_id, fecha.isoformat()))
-            res = cur.fetchone()
-            if res is None:
-                estado = "SR"
-            else:
-                estado = "P" if res[0] == 1 else "A"
-            row_cells[j + 1].text = estado
+    nombre_archivo = f"Escuela_{desde.strftime('%d-%m-%Y')}_{hasta.strftime('%d-%m-%Y')}.zip"
+    return como_adjunto(Response(en_streaming(zip_en_streaming(archivos())), mimetype="application/zip"),
+                        nombre_archivo)
 
-    buffer = BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
+
+def _enviar_exportacion(tipo, curso_id, curso, desde=None, hasta=None, formato="docx", datos=None):
+    # Hasta 8 MB en memoria; los documentos más grandes pasan a un archivo temporal
+    destino = SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    try:
+        generar(get_db().cursor(), tipo, curso_id, curso, destino, desde, hasta, formato, datos=datos)
+    except RuntimeError as e:
+        return str(e), 501
+    destino.seek(0)
 
     return send_file(
-        buffer,
+        destino,
         as_attachment=True,
-        download_name=f"Asistencia_{curso_nombre}_{inicio_semana.strftime('%d-%m-%Y')}.docx",
-        mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        download_name=nombre_descarga(tipo, curso, desde, hasta, formato),
+        mimetype=MIMETYPES[formato]
     )
 
 
-# ================== Exportar Alumnos ==================
-@app.route("/exportar_alumnos/<int:curso_id>")
-def exportar_alumnos(curso_id):
-    doc = Document()
-
-    con = get_db()
-    cur = con.cursor()
-    cur.execute("SELECT nombre, año FROM cursos WHERE id=%s", (curso_id,))
-    curso = cur.fetchone()
+# ================== Exportaciones en segundo plano ==================
+# POST crea el trabajo y responde 202 con su id; el navegador consulta el
+# estado hasta que está listo y descarga el archivo desde el cache en disco.
+@app.route("/exportar/<tipo>/<int:curso_id>", methods=["POST"])
+def crear_exportacion(tipo, curso_id):
+    if "usuario_id" not in session:
+        return jsonify(error="Sesión vencida"), 401
+    if tipo not in TIPOS:
+        return jsonify(error="Tipo de exportación desconocido"), 404
+
+    parametros = {"formato": "docx"}
+    if tipo == "asistencia":
+        try:
+            desde, hasta, formato = rango_exportacion(request.values)
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        parametros = {"desde": desde.isoformat(), "hasta": hasta.isoformat(), "formato": formato}
+
+    curso = encabezado_curso(curso_id)
     if not curso:
-        return "Curso no encontrado"
-    curso_nombre, curso_año = curso
+        return jsonify(error="Curso no encontrado"), 404
 
-    doc.add_heading(f"Alumnos del Curso: {curso_nombre} - Año {curso_año}", 0)
+    trabajo_id = trabajos.encolar(get_db(), os.environ["DATABASE_URL"], tipo, curso_id, curso, parametros,
+                                  session["usuario_id"])
+    return jsonify(id=trabajo_id, estado=f"/trabajos/{trabajo_id}",
+                   descargar=f"/trabajos/{trabajo_id}/descargar"), 202
 
-    cur.execute("""
-        SELECT apellido, nombre
-        FROM alumnos
-        WHERE curso_id=%s
-        ORDER BY apellido, nombre
-    """, (curso_id,))
-    alumnos = cur.fetchall()
 
-    for apellido, nombre in alumnos:
-        doc.add_paragraph(f"{apellido}, {nombre}")
+def _trabajo_del_usuario(trabajo_id):
+    trabajo = trabajos.estado(get_db(), trabajo_id)
+    if trabajo is None or (trabajo["creado_por"] != session.get("usuario_id") and session.get("rol") != "admin"):
+        return None
+    return trabajo
 
-    buffer = BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
 
-    return send_file(
-        buffer,
-        as_attachment=True,
-        download_name=f"Alumnos_Curso_{curso_nombre}.docx",
-        mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+@app.route("/trabajos/<int:trabajo_id>")
+def estado_trabajo(trabajo_id):
+    if "usuario_id" not in session:
+        return jsonify(error="Sesión vencida"), 401
+    trabajo = _trabajo_del_usuario(trabajo_id)
+    if trabajo is None:
+        return jsonify(error="Trabajo no encontrado"), 404
+    return jsonify({clave: trabajo[clave] for clave in ("id", "tipo", "curso_id", "estado", "progreso", "error")})
+
+
+@app.route("/trabajos/<int:trabajo_id>/descargar")
+def descargar_trabajo(trabajo_id):
+    if "usuario_id" not in session:
+        return redirect("/")
+    trabajo = _trabajo_del_usuario(trabajo_id)
+    if trabajo is None:
+        return "Trabajo no encontrado", 404
+    if trabajo["estado"] != "listo":
+        return "La exportación todavía no está lista", 409
+    if not os.path.exists(trabajo["archivo"]):
+        return "El archivo ya no está disponible: volvé a exportar", 410
+    formato = trabajo["archivo"].rsplit(".", 1)[-1]
+    return send_file(trabajo["archivo"], as_attachment=True, download_name=trabajo["nombre_archivo"],
+                     mimetype=MIMETYPES[formato])
+
+
+# ================== Reportes ==================
+# Porcentaje de asistencia, rachas de ausencias y tendencia por alumno. El
+# admin ve toda la escuela o un curso; el docente, uno de sus cursos.
+@app.route("/reportes/ausentismo")
+def reporte_ausentismo():
+    if "rol" not in session:
+        return redirect("/")
+
+    if session["rol"] == "admin":
+        cursos = [(c[0], c[1], c[2]) for c in listar_cursos()]
+    else:
+        # También decide a qué cursos tiene acceso: se lee de la base, sin cache
+        cursos = cursos_asignados(get_db().cursor(), session["usuario_id"])
+    curso_id = request.args.get("curso", type=int)
+    if curso_id is None and session["rol"] != "admin":
+        curso_id = cursos[0][0] if cursos else None
+    if curso_id is not None and curso_id not in {c[0] for c in cursos}:
+        return "Curso no encontrado", 404
+
+    hoy = date.today()
+    # Por defecto, desde el inicio del ciclo lectivo (1 de marzo)
+    inicio_ciclo = date(hoy.year if hoy.month >= 3 else hoy.year - 1, 3, 1)
+    try:
+        desde = date.fromisoformat(request.args.get("desde") or inicio_ciclo.isoformat())
+        hasta = date.fromisoformat(request.args.get("hasta") or hoy.isoformat())
+    except ValueError:
+        return "Fecha inválida", 400
+    if hasta < desde or (hasta - desde).days > MAX_DIAS_RANGO:
+        return f"Rango inválido: debe ser de 1 a {MAX_DIAS_RANGO} días", 400
+
+    inicio = time.perf_counter()
+    reporte = []
+    if cursos:
+        reporte = analitica.reporte_ausentismo(get_db().cursor(), desde, hasta, curso_id)
+    return render_template(
+        "ausentismo.html",
+        reporte=reporte,
+        cursos=cursos,
+        nombres={c[0]: f"{c[1]} - Año {c[2]}" for c in cursos},
+        curso_elegido=curso_id,
+        desde=desde.isoformat(),
+        hasta=hasta.isoformat(),
+        umbral=analitica.UMBRAL_ASISTENCIA,
+        racha=analitica.RACHA_RIESGO,
+        tendencia=analitica.TENDENCIA_RIESGO,
+        segundos=round(time.perf_counter() - inicio, 2)
     )
 
 
@@ -531,9 +996,14 @@ def exportar_alumnos(curso_id):
 def eliminar_curso(curso_id):
     con = get_db()
     cur = con.cursor()
+    bloquear_grilla(cur, curso_id)
     cur.execute("DELETE FROM asistencia WHERE curso_id=%s", (curso_id,))
     cur.execute("DELETE FROM alumnos WHERE curso_id=%s", (curso_id,))
+    # Como en toda baja que cambia la grilla, aunque la fila de versiones_curso
+    # se borre después con el curso (ON DELETE CASCADE)
+    incrementar_version(cur, curso_id)
     cur.execute("DELETE FROM cursos WHERE id=%s", (curso_id,))
+    invalidar_cursos(cur)
     con.commit()
     return redirect("/admin")
 
@@ -543,8 +1013,24 @@ def eliminar_curso(curso_id):
 def eliminar_docente(docente_id):
     con = get_db()
     cur = con.cursor()
+    # Su asistencia y sus notas se borran con el usuario (ON DELETE CASCADE):
+    # cambian las grillas y las libretas de todos los cursos en los que cargó algo
+    cur.execute("""
+        SELECT curso_id FROM docente_cursos WHERE docente_id=%s
+        UNION SELECT curso_id FROM asistencia WHERE docente_id=%s
+        UNION SELECT curso_id FROM notas WHERE docente_id=%s
+    """, (docente_id, docente_id, docente_id))
+    cursos = {fila[0] for fila in cur.fetchall()}
+    bloquear_grillas(cur, cursos)
+    cargada = asistencia_cargada_por(cur, docente_id)
     cur.execute("DELETE FROM docente_cursos WHERE docente_id=%s", (docente_id,))
-    cur.execute("DELETE FROM usuarios WHERE id=%s AND rol=%s", (docente_id, 'docente'))
+    cur.execute("DELETE FROM usuarios WHERE id=%s AND rol=%s RETURNING id", (docente_id, 'docente'))
+    if cur.fetchone():
+        # El resumen semanal no se entera del borrado en cascada
+        for curso_id, alumno_ids, desde, hasta in cargada:
+            actualizar_resumen_semanal(cur, curso_id, alumno_ids, desde, hasta)
+        incrementar_version(cur, *cursos)
+    invalidar_cursos(cur)
     con.commit()
     return redirect("/admin")
 
@@ -554,9 +1040,17 @@ def eliminar_docente(docente_id):
 def eliminar_alumno(alumno_id):
     con = get_db()
     cur = con.cursor()
+    cur.execute("SELECT curso_id FROM alumnos WHERE id=%s", (alumno_id,))
+    fila = cur.fetchone()
+    if fila:
+        bloquear_grilla(cur, fila[0])
     cur.execute("DELETE FROM asistencia WHERE alumno_id=%s", (alumno_id,))
-    cur.execute("DELETE FROM alumnos WHERE id=%s", (alumno_id,))
+    cur.execute("DELETE FROM alumnos WHERE id=%s RETURNING curso_id", (alumno_id,))
+    fila = cur.fetchone()
+    if fila:
+        incrementar_version(cur, fila[0])
     con.commit()
+    cache_estadisticas.invalidar()
     return redirect("/admin")
 
 
@@ -567,6 +1061,7 @@ def logout():
     return redirect("/")
 
 
+# Servidor de desarrollo; en producción: gunicorn app:app
 if __name__ == "__main__":
     init_db()
-    app.run(debug=True)
+    app.run(debug=os.environ.get("FLASK_DEBUG") == "1")
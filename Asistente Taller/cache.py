@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Caches creados en el proceso, para exponer sus contadores
+_caches = {}
+
+
+class CacheLRU:
+    """Cache en memoria del proceso con vencimiento por tiempo y tope de entradas.
+
+    obtener() es read-through: si la clave no está o venció, llama a calcular()
+    y guarda el resultado; al superar `capacidad` se desaloja la entrada usada
+    menos recientemente. Las rutas que escriben llaman a invalidar().
+    """
+
+    def __init__(self, nombre, capacidad=256, ttl=60):
+        self.nombre = nombre
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self._inicio = time.monotonic()
+        self.contadores = {"aciertos": 0, "fallos": 0, "desalojos": 0, "vencidos": 0, "invalidaciones": 0}
+        _caches[nombre] = self
+
+    def obtener(self, clave, calcular):
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None:
+                if entrada[0] > ahora:
+                    self._datos.move_to_end(clave)
+                    self.contadores["aciertos"] += 1
+                    return entrada[1]
+                del self._datos[clave]
+                self.contadores["vencidos"] += 1
+            self.contadores["fallos"] += 1
+        valor = calcular()
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + self.ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+                self.contadores["desalojos"] += 1
+        return valor
+
+    def invalidar(self, clave=None):
+        with self._lock:
+            self.contadores["invalidaciones"] += 1
+            if clave is None:
+                self._datos.clear()
+            else:
+                self._datos.pop(clave, None)
+
+    def estadisticas(self):
+        with self._lock:
+            datos = dict(self.contadores, entradas=len(self._datos), capacidad=self.capacidad, ttl=self.ttl)
+        minutos = max((time.monotonic() - self._inicio) / 60, 1 / 60)
+        # Cada acierto es una lectura a la base que no se hizo
+        datos["lecturas_ahorradas_por_minuto"] = round(datos["aciertos"] / minutos, 2)
+        consultas = datos["aciertos"] + datos["fallos"]
+        datos["tasa_aciertos"] = round(datos["aciertos"] / consultas, 3) if consultas else None
+        return datos
+
+
+def estadisticas():
+    """Contadores de todos los caches del proceso, por nombre."""
+    return {nombre: cache.estadisticas() for nombre, cache in _caches.items()}
@@ -0,0 +1,199 @@
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+import psycopg2.extensions
+
+
+class PoolAgotado(Exception):
+    """No se liberó ninguna conexión dentro del tiempo de espera."""
+
+
+class PoolConexiones:
+    """Pool de conexiones PostgreSQL compartido por todos los hilos del proceso.
+
+    - minimo/maximo: conexiones que se mantienen abiertas / tope total.
+    - vida_maxima: segundos tras los cuales una conexión se descarta al devolverla
+      o al pedirla, para no acumular sesiones viejas en el servidor.
+    - verificar_tras: una conexión inactiva más de estos segundos se verifica con
+      SELECT 1 antes de entregarla.
+    - espera_maxima: segundos que se espera una conexión libre antes de PoolAgotado.
+
+    Tras un fork (workers de gunicorn con preload) el hijo deja de usar las
+    conexiones heredadas pero las conserva mientras vive: cerrarlas, o que el GC
+    las libere, ejecuta PQfinish y manda Terminate por un socket que sigue
+    siendo del proceso padre.
+    """
+
+    def __init__(self, dsn, minimo=1, maximo=10, vida_maxima=1800, verificar_tras=30,
+                 espera_maxima=10, **kwargs_conexion):
+        self.dsn = dsn
+        self.minimo = minimo
+        self.maximo = maximo
+        self.vida_maxima = vida_maxima
+        self.verificar_tras = verificar_tras
+        self.espera_maxima = espera_maxima
+        self.kwargs_conexion = kwargs_conexion
+        self._heredadas = []
+        self._reiniciar()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._tras_fork)
+
+    def _tras_fork(self):
+        # Referencias para toda la vida del hijo: nunca se cierran ni se recolectan
+        self._heredadas.extend(self._creadas_en)
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self._cond = threading.Condition()
+        self._libres = deque()  # (conexion, creada_en, usada_en)
+        self._creadas_en = {}
+        self._en_uso = 0
+        self._precargado = False
+        self.contadores = {
+            "checkouts": 0,
+            "esperas": 0,
+            "segundos_esperando": 0.0,
+            "agotado": 0,
+            "creadas": 0,
+            "descartadas": 0,
+            "verificaciones_fallidas": 0,
+        }
+
+    # ---------- ciclo de vida de cada conexión ----------
+
+    def _crear(self):
+        con = psycopg2.connect(self.dsn, **self.kwargs_conexion)
+        with self._cond:
+            self._creadas_en[con] = time.monotonic()
+            self.contadores["creadas"] += 1
+        return con
+
+    def _descartar(self, con):
+        # Se llama con el lock tomado
+        self._creadas_en.pop(con, None)
+        self.contadores["descartadas"] += 1
+        try:
+            con.close()
+        except psycopg2.Error:
+            pass
+
+    def _vencida(self, con, ahora):
+        creada = self._creadas_en.get(con, ahora)
+        return self.vida_maxima and ahora - creada > self.vida_maxima
+
+    def _sana(self, con):
+        try:
+            # Cursor común: la verificación no cuenta como consulta de la petición
+            with con.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+                cur.execute("SELECT 1")
+            con.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    # ---------- API ----------
+
+    def obtener(self):
+        if not self._precargado:
+            self._precargar()
+
+        inicio = time.monotonic()
+        con = None
+        crear = False
+        with self._cond:
+            self.contadores["checkouts"] += 1
+            esperando = False
+            while True:
+                ahora = time.monotonic()
+                while self._libres:
+                    candidata, _, usada_en = self._libres.pop()
+                    if candidata.closed or self._vencida(candidata, ahora):
+                        self._descartar(candidata)
+                        continue
+                    con = candidata
+                    break
+                if con is not None:
+                    break
+                if self._en_uso + len(self._libres) < self.maximo:
+                    crear = True
+                    break
+                if not esperando:
+                    esperando = True
+                    self.contadores["esperas"] += 1
+                restante = self.espera_maxima - (ahora - inicio)
+                if restante <= 0:
+                    self.contadores["agotado"] += 1
+                    self.contadores["segundos_esperando"] += ahora - inicio
+                    raise PoolAgotado(f"Sin conexiones libres tras {self.espera_maxima} s")
+                self._cond.wait(restante)
+            self._en_uso += 1
+            if esperando:
+                self.contadores["segundos_esperando"] += time.monotonic() - inicio
+
+        try:
+            if crear:
+                return self._crear()
+            if time.monotonic() - usada_en > self.verificar_tras and not self._sana(con):
+                with self._cond:
+                    self.contadores["verificaciones_fallidas"] += 1
+                    self._descartar(con)
+                return self._crear()
+            return con
+        except Exception:
+            with self._cond:
+                self._en_uso -= 1
+                self._cond.notify()
+            raise
+
+    def devolver(self, con, descartar=False):
+        if not descartar and not con.closed:
+            try:
+                # Deja la conexión limpia para el próximo uso
+                if con.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    con.rollback()
+            except psycopg2.Error:
+                descartar = True
+
+        with self._cond:
+            if con not in self._creadas_en:
+                # Conexión heredada de otro proceso o de un pool ya reiniciado
+                return
+            self._en_uso -= 1
+            ahora = time.monotonic()
+            if descartar or con.closed or self._vencida(con, ahora) or len(self._libres) >= self.maximo:
+                self._descartar(con)
+            else:
+                self._libres.append((con, self._creadas_en[con], ahora))
+            self._cond.notify()
+
+    def _precargar(self):
+        with self._cond:
+            if self._precargado:
+                return
+            self._precargado = True
+            faltan = self.minimo - len(self._libres) - self._en_uso
+        for _ in range(max(faltan, 0)):
+            con = self._crear()
+            with self._cond:
+                self._libres.append((con, self._creadas_en[con], time.monotonic()))
+                self._cond.notify()
+
+    def cerrar(self):
+        with self._cond:
+            while self._libres:
+                self._descartar(self._libres.pop()[0])
+
+    def estadisticas(self):
+        with self._cond:
+            datos = dict(self.contadores)
+            datos.update({
+                "pid": os.getpid(),
+                "en_uso": self._en_uso,
+                "libres": len(self._libres),
+                "minimo": self.minimo,
+                "maximo": self.maximo,
+            })
+        return datos
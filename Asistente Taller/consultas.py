@@ -0,0 +1,572 @@
+import csv
+import hashlib
+import io
+from datetime import date, timedelta
+
+from psycopg2.extras import execute_values
+
+
+# ================== Asistencia ==================
+
+# Clave (junto con el curso) del advisory lock de bloquear_grilla
+_LOCK_GRILLA = 727010
+
+def _fecha_iso(fecha):
+    return fecha.isoformat() if isinstance(fecha, date) else fecha
+
+
+def _a_fecha(valor):
+    return valor if isinstance(valor, date) else date.fromisoformat(valor)
+
+
+def cargar_asistencia(cur, curso_id, desde, hasta, docente_id=None):
+    """Carga la asistencia del curso entre dos fechas (inclusive) en una consulta.
+
+    Devuelve {alumno_id: {fecha: presente}}; las celdas sin registro no aparecen.
+    Sirve para una semana, un mes o un cuatrimestre completo.
+    """
+    sql = """
+        SELECT alumno_id, fecha, presente FROM asistencia
+        WHERE curso_id=%s AND fecha BETWEEN %s AND %s
+    """
+    params = [curso_id, _fecha_iso(desde), _fecha_iso(hasta)]
+    if docente_id is not None:
+        sql += " AND docente_id=%s"
+        params.append(docente_id)
+    cur.execute(sql, params)
+
+    grilla = {}
+    for alumno_id, fecha, presente in cur:
+        grilla.setdefault(alumno_id, {})[_a_fecha(fecha)] = presente
+    return grilla
+
+
+def version_grilla(grilla):
+    """Sello de una grilla {alumno_id: {fecha: presente}}: cambia si cambia cualquier celda.
+
+    Se calcula sobre lo que ve el docente, así que no hace falta ninguna
+    consulta extra: el formulario lo manda de vuelta y si no coincide con el
+    de la base es que otro guardó esa semana mientras tanto.
+    """
+    sello = hashlib.sha1()
+    for alumno_id in sorted(grilla):
+        for fecha, presente in sorted(grilla[alumno_id].items()):
+            sello.update(f"{alumno_id}:{_fecha_iso(fecha)}:{presente};".encode())
+    return sello.hexdigest()[:16]
+
+
+def bloquear_grilla(cur, curso_id):
+    # Dos guardados de la grilla del mismo curso se hacen de a uno hasta el commit:
+    # entre comparar la versión y escribir no se puede colar otro
+    cur.execute("SELECT pg_advisory_xact_lock(%s, %s)", (_LOCK_GRILLA, curso_id))
+
+
+def bloquear_grillas(cur, curso_ids):
+    # Varios cursos siempre en el mismo orden, para que dos transacciones no se esperen en cruz
+    for curso_id in sorted({int(c) for c in curso_ids}):
+        bloquear_grilla(cur, curso_id)
+
+
+def iterar_asistencia_por_alumno(cur, curso_id, desde, hasta):
+    """Recorre la asistencia del curso agrupada por alumno, con una sola consulta.
+
+    Genera tuplas (alumno_id, apellido, nombre, {fecha: presente}) en orden
+    alfabético. Con un cursor con nombre (server-side) las filas llegan por
+    lotes y nunca se carga el rango completo en memoria.
+    """
+    cur.execute("""
+        SELECT a.id, a.apellido, a.nombre, s.fecha, s.presente
+        FROM alumnos a
+        LEFT JOIN asistencia s
+          ON s.alumno_id = a.id AND s.curso_id = a.curso_id
+         AND s.fecha BETWEEN %s AND %s
+        WHERE a.curso_id=%s
+        ORDER BY a.apellido, a.nombre, a.id
+    """, (_fecha_iso(desde), _fecha_iso(hasta), curso_id))
+
+    actual = None
+    for alumno_id, apellido, nombre, fecha, presente in cur:
+        if actual is None or actual[0] != alumno_id:
+            if actual is not None:
+                yield actual
+            actual = (alumno_id, apellido, nombre, {})
+        if fecha is not None:
+            actual[3][_a_fecha(fecha)] = presente
+    if actual is not None:
+        yield actual
+
+
+def guardar_asistencia(cur, docente_id, curso_id, celdas):
+    """Guarda las celdas (alumno_id, fecha, presente) con un único upsert.
+
+    Devuelve la cantidad de filas insertadas o modificadas; las celdas que
+    ya tenían el mismo valor no se reescriben.
+    """
+    filas = [
+        (alumno_id, docente_id, curso_id, _fecha_iso(fecha), 1 if presente else 0)
+        for alumno_id, fecha, presente in celdas
+    ]
+    if not filas:
+        return 0
+
+    # page_size=len(filas) fuerza una sola sentencia para toda la semana
+    escritas = execute_values(cur, """
+        INSERT INTO asistencia (alumno_id, docente_id, curso_id, fecha, presente, actualizado)
+        VALUES %s
+        ON CONFLICT (alumno_id, docente_id, curso_id, fecha)
+        DO UPDATE SET presente = EXCLUDED.presente, actualizado = EXCLUDED.actualizado
+        WHERE asistencia.presente IS DISTINCT FROM EXCLUDED.presente
+        RETURNING alumno_id, fecha
+    """, filas, template="(%s, %s, %s, %s, %s, now())", page_size=len(filas), fetch=True)
+    if escritas:
+        # El resumen se recalcula solo para los alumnos con alguna celda escrita
+        fechas = [_a_fecha(f) for _, f in escritas]
+        actualizar_resumen_semanal(cur, curso_id, {a for a, _ in escritas}, min(fechas), max(fechas))
+    return len(escritas)
+
+
+def grilla_semana(cur, curso_id, docente_id, inicio, alumno_ids=None):
+    """Grilla {alumno_id: {fecha: presente}} de los cinco días desde inicio, con 0 si no hay registro.
+
+    Es la que ve el docente en /asistencia y sobre la que se calcula version_grilla().
+    """
+    fechas = [inicio + timedelta(days=i) for i in range(5)]
+    if alumno_ids is None:
+        cur.execute("SELECT id FROM alumnos WHERE curso_id=%s", (curso_id,))
+        alumno_ids = [fila[0] for fila in cur.fetchall()]
+    registros = cargar_asistencia(cur, curso_id, fechas[0], fechas[-1], docente_id)
+    return {a: {f: registros.get(a, {}).get(f, 0) for f in fechas} for a in alumno_ids}
+
+
+def sincronizar_asistencia(cur, docente_id, marcas, versiones=None):
+    """Aplica un lote de marcas (alumno_id, curso_id, fecha, presente, marca) con un único upsert.
+
+    Gana la última escritura: una celda solo se pisa si la marca del cliente es
+    posterior a su última modificación. Una marca en el futuro cuenta como
+    ahora, para que un reloj adelantado no gane siempre. Si una celda viene
+    repetida vale la marca más reciente. Un lote puede mezclar cursos.
+
+    Solo se aceptan alumnos de cursos asignados al docente; curso_id puede ser
+    None (se toma el del alumno) y, si viene, tiene que ser el curso del alumno.
+
+    versiones ({(curso_id, inicio): version}) trae el sello de las grillas
+    semanales en las que se hicieron las marcas. Si una grilla cambió desde
+    entonces (otro guardó esa semana), ninguna de sus marcas se aplica. Las
+    marcas fuera de esas grillas se resuelven solo por la hora.
+
+    Devuelve un dict con:
+    - celdas: solo las celdas cuyo valor en la base difiere del anterior o del
+      enviado, como tuplas (alumno_id, curso_id, fecha, presente, aplicada).
+      aplicada=True si la marca se guardó, False si perdió contra una escritura
+      posterior (presente es entonces el valor que quedó);
+    - rechazadas: índices en marcas de las que no corresponden al docente o a
+      un alumno existente;
+    - en_conflicto: índices de las marcas de grillas que cambiaron;
+    - conflictos: {(curso_id, inicio): grilla actual} de esas grillas;
+    - versiones: {(curso_id, inicio): version} de las demás grillas tras escribir.
+    """
+    # Las altas y bajas de alumnos toman el mismo lock: una vez tomado se vuelve
+    # a leer a qué curso va cada alumno, por si alguno se borró mientras tanto
+    alumno_ids = {m[0] for m in marcas}
+    bloquear_grillas(cur, cursos_de_alumnos(cur, docente_id, alumno_ids).values())
+    cursos = cursos_de_alumnos(cur, docente_id, alumno_ids)
+    aceptadas, rechazadas = [], []
+    for i, (alumno_id, curso_id, fecha, presente, marca) in enumerate(marcas):
+        if alumno_id not in cursos or curso_id not in (None, cursos[alumno_id]):
+            rechazadas.append(i)
+        else:
+            aceptadas.append((i, alumno_id, cursos[alumno_id], _a_fecha(fecha), presente, marca))
+
+    # Solo se comparan las grillas de cursos del docente en las que cae alguna marca
+    por_grilla = {}
+    for curso_id, inicio in (versiones or {}):
+        indices = [i for i, _, c, fecha, _, _ in aceptadas
+                   if c == curso_id and inicio <= fecha < inicio + timedelta(days=5)]
+        if indices:
+            por_grilla[(curso_id, inicio)] = indices
+    grillas, conflictos, en_conflicto = {}, {}, set()
+    for (curso_id, inicio), indices in por_grilla.items():
+        grilla = grillas[(curso_id, inicio)] = grilla_semana(cur, curso_id, docente_id, inicio)
+        if version_grilla(grilla) != versiones[(curso_id, inicio)]:
+            conflictos[(curso_id, inicio)] = grilla
+            en_conflicto.update(indices)
+
+    resultado = {"celdas": [], "rechazadas": rechazadas, "en_conflicto": sorted(en_conflicto),
+                 "conflictos": conflictos, "versiones": {}}
+    filas = [
+        (alumno_id, docente_id, curso_id, _fecha_iso(fecha), 1 if presente else 0, marca)
+        for i, alumno_id, curso_id, fecha, presente, marca in aceptadas
+        if i not in en_conflicto
+    ]
+    if filas:
+        resultado["celdas"] = _escribir_marcas(cur, filas)
+
+    # La versión nueva sale de la grilla leída antes más las celdas escritas, sin releerla
+    for clave, grilla in grillas.items():
+        if clave in conflictos:
+            continue
+        for alumno_id, curso_id, fecha, presente, aplicada in resultado["celdas"]:
+            if aplicada and curso_id == clave[0] and fecha in grilla.get(alumno_id, {}):
+                grilla[alumno_id][fecha] = presente
+        resultado["versiones"][clave] = version_grilla(grilla)
+    return resultado
+
+
+def _escribir_marcas(cur, filas):
+    # filas: (alumno_id, docente_id, curso_id, fecha, presente, marca), ya autorizadas.
+    # Las CTE leen la tabla antes del upsert: "previas" tiene los valores anteriores
+    celdas = execute_values(cur, """
+        WITH lote (alumno_id, docente_id, curso_id, fecha, presente, marca) AS (VALUES %s),
+        entrada AS (
+            SELECT DISTINCT ON (alumno_id, fecha)
+                   alumno_id, docente_id, curso_id, fecha::date AS fecha, presente,
+                   LEAST(marca::timestamptz, now()) AS marca
+            FROM lote
+            ORDER BY alumno_id, fecha, marca DESC
+        ),
+        previas AS (
+            SELECT s.alumno_id, s.fecha, s.presente
+            FROM asistencia s
+            JOIN entrada e ON s.alumno_id = e.alumno_id AND s.docente_id = e.docente_id
+                          AND s.curso_id = e.curso_id AND s.fecha = e.fecha
+        ),
+        escritas AS (
+            INSERT INTO asistencia (alumno_id, docente_id, curso_id, fecha, presente, actualizado)
+            SELECT alumno_id, docente_id, curso_id, fecha, presente, marca FROM entrada
+            ON CONFLICT (alumno_id, docente_id, curso_id, fecha)
+            DO UPDATE SET presente = EXCLUDED.presente, actualizado = EXCLUDED.actualizado
+            WHERE asistencia.actualizado IS NULL OR asistencia.actualizado < EXCLUDED.actualizado
+            RETURNING alumno_id, fecha, presente
+        )
+        SELECT e.alumno_id, e.curso_id, e.fecha, COALESCE(w.presente, p.presente),
+               w.alumno_id IS NOT NULL
+        FROM entrada e
+        LEFT JOIN escritas w ON w.alumno_id = e.alumno_id AND w.fecha = e.fecha
+        LEFT JOIN previas p ON p.alumno_id = e.alumno_id AND p.fecha = e.fecha
+        WHERE (w.alumno_id IS NOT NULL AND w.presente IS DISTINCT FROM p.presente)
+           OR (w.alumno_id IS NULL AND p.presente IS DISTINCT FROM e.presente)
+        ORDER BY e.curso_id, e.alumno_id, e.fecha
+    """, filas, page_size=len(filas), fetch=True)
+
+    # Resumen semanal de lo que cambió, por curso
+    por_curso = {}
+    for alumno_id, curso_id, fecha, _, aplicada in celdas:
+        if aplicada:
+            por_curso.setdefault(curso_id, []).append((alumno_id, _a_fecha(fecha)))
+    for curso_id, cambiadas in por_curso.items():
+        fechas = [f for _, f in cambiadas]
+        actualizar_resumen_semanal(cur, curso_id, {a for a, _ in cambiadas}, min(fechas), max(fechas))
+    return [(a, c, _a_fecha(f), p, aplicada) for a, c, f, p, aplicada in celdas]
+
+
+def cursos_de_alumnos(cur, docente_id, alumno_ids):
+    """{alumno_id: curso_id} de esos alumnos, solo los de cursos asignados al docente."""
+    if not alumno_ids:
+        return {}
+    cur.execute("""
+        SELECT a.id, a.curso_id
+        FROM alumnos a
+        JOIN docente_cursos dc ON dc.curso_id = a.curso_id AND dc.docente_id = %s
+        WHERE a.id = ANY(%s)
+    """, (docente_id, sorted(alumno_ids)))
+    return dict(cur.fetchall())
+
+
+# ================== Resumen semanal ==================
+# asistencia_semanal guarda presentes y registros por (curso, alumno, semana);
+# semana es el lunes. Se mantiene al guardar asistencia y se puede regenerar
+# completo con reconstruir_resumen_semanal().
+
+_RESUMEN_SEMANAL = """
+    INSERT INTO asistencia_semanal (curso_id, alumno_id, semana, presentes, registrados)
+    SELECT curso_id, alumno_id, date_trunc('week', fecha)::date, SUM(presente), COUNT(*)
+    FROM asistencia
+    {filtro}
+    GROUP BY 1, 2, 3
+    ON CONFLICT (curso_id, semana, alumno_id)
+    DO UPDATE SET presentes = EXCLUDED.presentes, registrados = EXCLUDED.registrados
+    WHERE (asistencia_semanal.presentes, asistencia_semanal.registrados)
+          IS DISTINCT FROM (EXCLUDED.presentes, EXCLUDED.registrados)
+"""
+
+
+def actualizar_resumen_semanal(cur, curso_id, alumno_ids, desde, hasta):
+    """Recalcula las semanas de esos alumnos que tocan el rango desde-hasta.
+
+    Solo relee las celdas de esas semanas (a lo sumo unas decenas por alumno),
+    así que el costo no crece con los días de clase transcurridos. Las semanas
+    que se quedaron sin ningún registro (p. ej. al borrar un docente) se quitan.
+    """
+    lunes = desde - timedelta(days=desde.weekday())
+    domingo = hasta + timedelta(days=6 - hasta.weekday())
+    parametros = (curso_id, sorted(alumno_ids), lunes.isoformat(), domingo.isoformat())
+    cur.execute("""
+        DELETE FROM asistencia_semanal s
+        WHERE s.curso_id=%s AND s.alumno_id = ANY(%s) AND s.semana BETWEEN %s AND %s
+          AND NOT EXISTS (
+              SELECT 1 FROM asistencia a
+              WHERE a.curso_id = s.curso_id AND a.alumno_id = s.alumno_id
+                AND a.fecha BETWEEN s.semana AND s.semana + 6
+          )
+    """, parametros)
+    cur.execute(_RESUMEN_SEMANAL.format(filtro="""
+        WHERE curso_id=%s AND alumno_id = ANY(%s) AND fecha BETWEEN %s AND %s
+    """), parametros)
+
+
+def asistencia_cargada_por(cur, docente_id):
+    """[(curso_id, alumno_ids, desde, hasta)] de la asistencia que cargó el docente, por curso.
+
+    Es lo que hay que pasarle a actualizar_resumen_semanal() si esa asistencia se borra.
+    """
+    cur.execute("""
+        SELECT curso_id, array_agg(DISTINCT alumno_id), MIN(fecha), MAX(fecha)
+        FROM asistencia
+        WHERE docente_id=%s AND fecha IS NOT NULL
+        GROUP BY curso_id
+    """, (docente_id,))
+    return cur.fetchall()
+
+
+def reconstruir_resumen_semanal(cur):
+    """Regenera el resumen entero desde asistencia; devuelve la cantidad de filas."""
+    cur.execute("TRUNCATE asistencia_semanal")
+    cur.execute(_RESUMEN_SEMANAL.format(filtro="WHERE fecha IS NOT NULL"))
+    return cur.rowcount
+
+
+# ================== Notas ==================
+
+def guardar_notas(cur, docente_id, curso_id, filas):
+    """Inserta todas las notas (alumno_id, nota, fecha, evaluacion, peso) de una carga en una sentencia."""
+    valores = [
+        (alumno_id, docente_id, curso_id, nota, _fecha_iso(fecha), evaluacion, peso)
+        for alumno_id, nota, fecha, evaluacion, peso in filas
+    ]
+    if not valores:
+        return 0
+    execute_values(cur, """
+        INSERT INTO notas (alumno_id, docente_id, curso_id, nota, fecha, evaluacion, peso) VALUES %s
+    """, valores, page_size=len(valores))
+    return cur.rowcount
+
+
+def importar_notas(cur, docente_id, curso_id, filas):
+    """Carga las notas con COPY en una tabla temporal y las incorpora a notas.
+
+    Las filas idénticas a notas ya cargadas (mismo alumno, fecha, evaluación y
+    nota) se omiten, así que volver a subir la misma planilla no duplica nada.
+    Devuelve la cantidad de notas insertadas.
+    """
+    if not filas:
+        return 0
+    cur.execute("""
+        CREATE TEMP TABLE notas_importadas (
+            alumno_id INTEGER,
+            nota REAL,
+            fecha DATE,
+            evaluacion TEXT,
+            peso REAL
+        ) ON COMMIT DROP
+    """)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for alumno_id, nota, fecha, evaluacion, peso in filas:
+        writer.writerow([alumno_id, nota, _fecha_iso(fecha), evaluacion, peso])
+    buffer.seek(0)
+    cur.copy_expert("COPY notas_importadas (alumno_id, nota, fecha, evaluacion, peso) "
+                    "FROM STDIN WITH (FORMAT csv)", buffer)
+
+    cur.execute("""
+        INSERT INTO notas (alumno_id, docente_id, curso_id, nota, fecha, evaluacion, peso)
+        SELECT DISTINCT i.alumno_id, %s, a.curso_id, i.nota, i.fecha, NULLIF(i.evaluacion, ''), i.peso
+        FROM notas_importadas i
+        JOIN alumnos a ON a.id = i.alumno_id AND a.curso_id = %s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM notas n
+            WHERE n.alumno_id = i.alumno_id AND n.curso_id = a.curso_id
+              AND n.fecha = i.fecha AND n.nota = i.nota
+              AND n.evaluacion IS NOT DISTINCT FROM NULLIF(i.evaluacion, '')
+        )
+    """, (docente_id, curso_id))
+    return cur.rowcount
+
+
+# ================== Alumnos ==================
+
+def importar_alumnos(cur, filas):
+    """Carga alumnos (apellido, nombre, curso_id) con COPY en una sola transacción.
+
+    No se insertan los alumnos que ya existen en el curso con el mismo
+    apellido y nombre (sin distinguir mayúsculas), ni los repetidos dentro de
+    la misma planilla. Devuelve la cantidad de alumnos insertados.
+    """
+    if not filas:
+        return 0
+    cur.execute("""
+        CREATE TEMP TABLE alumnos_importados (
+            apellido TEXT,
+            nombre TEXT,
+            curso_id INTEGER
+        ) ON COMMIT DROP
+    """)
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(filas)
+    buffer.seek(0)
+    cur.copy_expert("COPY alumnos_importados (apellido, nombre, curso_id) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    cur.execute("""
+        INSERT INTO alumnos (nombre, apellido, curso_id)
+        SELECT DISTINCT ON (lower(i.apellido), lower(i.nombre), i.curso_id) i.nombre, i.apellido, i.curso_id
+        FROM alumnos_importados i
+        WHERE NOT EXISTS (
+            SELECT 1 FROM alumnos a
+            WHERE a.curso_id = i.curso_id
+              AND lower(a.apellido) = lower(i.apellido)
+              AND lower(a.nombre) = lower(i.nombre)
+        )
+        ORDER BY lower(i.apellido), lower(i.nombre), i.curso_id
+    """)
+    return cur.rowcount
+
+
+# ================== Exportaciones ==================
+
+def alumnos_del_curso(cur, curso_id):
+    cur.execute("""
+        SELECT apellido, nombre
+        FROM alumnos
+        WHERE curso_id=%s
+        ORDER BY apellido, nombre
+    """, (curso_id,))
+    return cur.fetchall()
+
+
+def iterar_asistencia_escuela(cur, desde, hasta):
+    """Asistencia de todos los cursos en una sola consulta, agrupada por curso.
+
+    Genera ((curso_id, nombre, año), filas) con filas como las de
+    iterar_asistencia_por_alumno; los cursos sin alumnos tienen filas vacías.
+    Pensado para un cursor con nombre: se tiene en memoria un curso a la vez.
+    """
+    cur.execute("""
+        SELECT c.id, c.nombre, c.año, a.id, a.apellido, a.nombre, s.fecha, s.presente
+        FROM cursos c
+        LEFT JOIN alumnos a ON a.curso_id = c.id
+        LEFT JOIN asistencia s
+          ON s.alumno_id = a.id AND s.curso_id = a.curso_id
+         AND s.fecha BETWEEN %s AND %s
+        ORDER BY c.id, a.apellido, a.nombre, a.id
+    """, (_fecha_iso(desde), _fecha_iso(hasta)))
+
+    curso, filas, actual = None, [], None
+    for curso_id, curso_nombre, curso_año, alumno_id, apellido, nombre, fecha, presente in cur:
+        if curso is None or curso[0] != curso_id:
+            if curso is not None:
+                yield curso, filas
+            curso, filas, actual = (curso_id, curso_nombre, curso_año), [], None
+        if alumno_id is None:
+            continue
+        if actual is None or actual[0] != alumno_id:
+            actual = (alumno_id, apellido, nombre, {})
+            filas.append(actual)
+        if fecha is not None:
+            actual[3][_a_fecha(fecha)] = presente
+    if curso is not None:
+        yield curso, filas
+
+
+# ================== Versión de datos ==================
+# Un contador por curso que sube con cada escritura de asistencia, notas o
+# alumnos: las exportaciones en cache quedan identificadas por esa versión.
+
+def incrementar_version(cur, *curso_ids):
+    # Orden fijo: dos transacciones que tocan los mismos cursos no se bloquean entre sí
+    ids = sorted({int(c) for c in curso_ids if c is not None})
+    if not ids:
+        return
+    cur.execute("""
+        INSERT INTO versiones_curso (curso_id, version)
+        SELECT unnest(%s::int[]), 1
+        ON CONFLICT (curso_id) DO UPDATE SET version = versiones_curso.version + 1
+    """, (ids,))
+
+
+def version_curso(cur, curso_id):
+    cur.execute("SELECT version FROM versiones_curso WHERE curso_id=%s", (curso_id,))
+    fila = cur.fetchone()
+    return fila[0] if fila else 0
+
+
+# Otra versión, única para toda la escuela, que sube al agregar o borrar cursos,
+# docentes o asignaciones: los caches de cursos de cada proceso van por ella.
+
+def incrementar_version_cursos(cur):
+    cur.execute("UPDATE version_cursos SET version = version + 1")
+
+
+def version_cursos(cur):
+    cur.execute("SELECT version FROM version_cursos")
+    fila = cur.fetchone()
+    return fila[0] if fila else 0
+
+
+def cursos_asignados(cur, docente_id):
+    """(curso_id, nombre, año) de cada curso asignado al docente, leído de la base."""
+    cur.execute("""
+        SELECT c.id, c.nombre, c.año
+        FROM docente_cursos dc
+        JOIN cursos c ON c.id = dc.curso_id
+        WHERE dc.docente_id=%s
+        ORDER BY c.id
+    """, (docente_id,))
+    return cur.fetchall()
+
+
+# ================== Estadísticas ==================
+
+def estadisticas_cursos(cur, desde, hasta):
+    """Inscriptos, asistencia del período, ausentes y promedio de notas por curso.
+
+    Se resuelve con tres agregaciones en SQL, sin importar la cantidad de cursos.
+    Devuelve {curso_id: {...}} solo para los cursos con algún dato.
+    """
+    stats = {}
+
+    def curso(curso_id):
+        return stats.setdefault(curso_id, {
+            "inscriptos": 0,
+            "registros": 0,
+            "porcentaje_asistencia": None,
+            "ausentes": 0,
+            "promedio_notas": None,
+            "cantidad_notas": 0,
+        })
+
+    cur.execute("SELECT curso_id, COUNT(*) FROM alumnos GROUP BY curso_id")
+    for curso_id, inscriptos in cur.fetchall():
+        curso(curso_id)["inscriptos"] = inscriptos
+
+    # Desde el resumen semanal: se cuentan las semanas cuyo lunes cae en el período
+    cur.execute("""
+        SELECT curso_id,
+               SUM(registrados),
+               SUM(presentes),
+               COUNT(DISTINCT alumno_id) FILTER (WHERE presentes < registrados)
+        FROM asistencia_semanal
+        WHERE semana BETWEEN date_trunc('week', %s::date) AND %s
+        GROUP BY curso_id
+    """, (_fecha_iso(desde), _fecha_iso(hasta)))
+    for curso_id, registros, presentes, ausentes in cur.fetchall():
+        c = curso(curso_id)
+        c["registros"] = registros
+        c["porcentaje_asistencia"] = round(100.0 * (presentes or 0) / registros, 1) if registros else None
+        c["ausentes"] = ausentes
+
+    cur.execute("SELECT curso_id, AVG(nota), COUNT(nota) FROM notas GROUP BY curso_id")
+    for curso_id, promedio, cantidad in cur.fetchall():
+        c = curso(curso_id)
+        c["promedio_notas"] = round(float(promedio), 2) if promedio is not None else None
+        c["cantidad_notas"] = cantidad
+
+    return stats
@@ -0,0 +1,137 @@
+"""Compara los planes de las consultas frecuentes antes y después de las migraciones.
+
+    python explain_indices.py --salida antes.json
+    python migraciones.py
+    python explain_indices.py --salida despues.json
+    python explain_indices.py --comparar antes.json despues.json
+
+o, en una sola corrida, python explain_indices.py --migrar: mide, aplica las
+migraciones pendientes y vuelve a medir. Cada consulta se ejecuta con
+EXPLAIN (ANALYZE, BUFFERS) dentro de una transacción que se descarta.
+"""
+import argparse
+import json
+import os
+from datetime import date, timedelta
+
+import psycopg2
+
+from migraciones import aplicar_migraciones
+
+REPETICIONES = 5
+
+# (nombre, sql); los parámetros salen de datos reales de la base
+CONSULTAS = [
+    ("grilla_semanal", """
+        SELECT alumno_id, fecha, presente FROM asistencia
+        WHERE curso_id=%(curso_id)s AND fecha BETWEEN %(desde)s AND %(hasta)s
+    """),
+    ("celda_asistencia", """
+        SELECT presente FROM asistencia
+        WHERE alumno_id=%(alumno_id)s AND curso_id=%(curso_id)s AND fecha=%(desde)s
+    """),
+    ("notas_alumno", "SELECT nota FROM notas WHERE alumno_id=%(alumno_id)s"),
+    ("alumnos_curso", """
+        SELECT id, apellido, nombre FROM alumnos WHERE curso_id=%(curso_id)s ORDER BY apellido, nombre
+    """),
+    ("cursos_docente", """
+        SELECT c.id, c.nombre, c.año FROM docente_cursos dc
+        JOIN cursos c ON c.id = dc.curso_id
+        WHERE dc.docente_id=%(docente_id)s
+    """),
+]
+
+
+def parametros(cur):
+    cur.execute("""
+        SELECT alumno_id, curso_id, docente_id, fecha FROM asistencia
+        ORDER BY id DESC LIMIT 1
+    """)
+    fila = cur.fetchone()
+    if fila is None:
+        raise SystemExit("La tabla asistencia está vacía: cargá datos antes de medir.")
+    alumno_id, curso_id, docente_id, fecha = fila
+    desde = fecha if isinstance(fecha, date) else date.fromisoformat(fecha)
+    desde -= timedelta(days=desde.weekday())
+    return {
+        "alumno_id": alumno_id,
+        "curso_id": curso_id,
+        "docente_id": docente_id,
+        "desde": desde.isoformat(),
+        "hasta": (desde + timedelta(days=4)).isoformat(),
+    }
+
+
+def _nodos(plan):
+    # Recorre el árbol del plan: "Sort > Index Scan(asistencia_curso_fecha)"
+    nodo = plan["Node Type"]
+    if plan.get("Index Name"):
+        nodo += f"({plan['Index Name']})"
+    hijos = [_nodos(h) for h in plan.get("Plans", [])]
+    return nodo + (" > " + ", ".join(hijos) if hijos else "")
+
+
+def medir(con):
+    cur = con.cursor()
+    params = parametros(cur)
+    resultados = {}
+    for nombre, sql in CONSULTAS:
+        tiempos = []
+        plan = None
+        for _ in range(REPETICIONES):
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+            plan = cur.fetchone()[0][0]
+            tiempos.append(plan["Execution Time"])
+            con.rollback()
+        tiempos.sort()
+        resultados[nombre] = {
+            "ms_mediana": tiempos[len(tiempos) // 2],
+            "plan": _nodos(plan["Plan"]),
+            "buffers": plan["Plan"].get("Shared Hit Blocks", 0) + plan["Plan"].get("Shared Read Blocks", 0),
+        }
+    return resultados
+
+
+def imprimir_comparacion(antes, despues):
+    print(f"{'consulta':<20} {'antes ms':>10} {'después ms':>11}")
+    for nombre in antes:
+        a, d = antes[nombre], despues.get(nombre, {})
+        print(f"{nombre:<20} {a['ms_mediana']:>10.3f} {d.get('ms_mediana', float('nan')):>11.3f}")
+        print(f"    antes:   {a['plan']}")
+        print(f"    después: {d.get('plan', '?')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--salida", help="Archivo JSON donde guardar las mediciones")
+    parser.add_argument("--migrar", action="store_true", help="Medir, migrar y volver a medir")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DESPUES"))
+    args = parser.parse_args()
+
+    if args.comparar:
+        with open(args.comparar[0]) as a, open(args.comparar[1]) as d:
+            imprimir_comparacion(json.load(a), json.load(d))
+        return
+
+    con = psycopg2.connect(os.environ["DATABASE_URL"])
+    try:
+        resultado = medir(con)
+        if args.migrar:
+            print("Migraciones aplicadas:", aplicar_migraciones(con) or "ninguna")
+            con.cursor().execute("ANALYZE")
+            con.commit()
+            resultado = {"antes": resultado, "despues": medir(con)}
+            imprimir_comparacion(resultado["antes"], resultado["despues"])
+        else:
+            for nombre, datos in resultado.items():
+                print(f"{nombre:<20} {datos['ms_mediana']:>10.3f} ms  {datos['plan']}")
+    finally:
+        con.close()
+
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump(resultado, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import zipfile
+from datetime import timedelta
+from io import BytesIO
+
+from docx import Document
+
+import libreta
+from comun.csv_streaming import escritor_csv
+from consultas import iterar_asistencia_por_alumno, alumnos_del_curso
+
+# Un ciclo lectivo completo como máximo por exportación
+MAX_DIAS_RANGO = 366
+# Columnas de fechas por tabla del documento (una semana hábil)
+DIAS_POR_TABLA = 5
+
+DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes"]
+
+MIMETYPES = {
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+}
+
+
+def dias_habiles(desde, hasta):
+    """Fechas de lunes a viernes entre desde y hasta (inclusive)."""
+    dias = []
+    f = desde
+    while f <= hasta:
+        if f.weekday() < 5:
+            dias.append(f)
+        f += timedelta(days=1)
+    return dias
+
+
+def estado_asistencia(presente):
+    if presente is None:
+        return "SR"
+    return "P" if presente == 1 else "A"
+
+
+# ================== DOCX ==================
+
+def docx_asistencia(destino, titulo, subtitulo, filas, fechas, al_avanzar=None):
+    """Escribe el documento de asistencia en destino.
+
+    filas son tuplas (alumno_id, apellido, nombre, {fecha: presente}). Las
+    fechas se reparten en tablas de DIAS_POR_TABLA columnas y cada tabla se
+    completa columna por columna. al_avanzar(fraccion) se llama tras cada tabla.
+    """
+    filas = list(filas)
+    doc = Document()
+    doc.add_heading(titulo, 0)
+    doc.add_paragraph(subtitulo)
+    doc.add_paragraph("")
+
+    for inicio in range(0, len(fechas), DIAS_POR_TABLA):
+        lote = fechas[inicio:inicio + DIAS_POR_TABLA]
+        if len(fechas) > DIAS_POR_TABLA:
+            doc.add_heading(f"Semana del {lote[0].strftime('%d/%m/%Y')}", level=2)
+
+        # Crear la tabla con todas sus filas de una vez es mucho más barato que add_row()
+        table = doc.add_table(rows=1 + len(filas), cols=1 + len(lote))
+        table.style = 'Table Grid'
+
+        columna = table.columns[0].cells
+        columna[0].text = "Alumno"
+        for i, (_, apellido, nombre, _) in enumerate(filas, start=1):
+            columna[i].text = f"{apellido}, {nombre}"
+
+        for j, fecha in enumerate(lote, start=1):
+            columna = table.columns[j].cells
+            columna[0].text = f"{DIAS_SEMANA[fecha.weekday()]}\n{fecha.strftime('%d/%m')}"
+            for i, (_, _, _, registros) in enumerate(filas, start=1):
+                columna[i].text = estado_asistencia(registros.get(fecha))
+
+        doc.add_paragraph("")
+        if al_avanzar:
+            al_avanzar((inicio + len(lote)) / len(fechas))
+
+    doc.save(destino)
+
+
+def docx_notas(destino, curso_nombre, datos):
+    """Planilla de la libreta: una columna por evaluación, promedios y condición."""
+    doc = Document()
+    doc.add_heading(f"Notas del Curso: {curso_nombre}", 0)
+
+    evaluaciones = [e["nombre"] for e in datos["evaluaciones"]]
+    encabezados = ["Alumno"] + evaluaciones + ["Promedio", "Ponderado", "Mediana", "Condición"]
+    table = doc.add_table(rows=1 + len(datos["alumnos"]), cols=len(encabezados))
+    table.style = 'Table Grid'
+    for celda, texto in zip(table.rows[0].cells, encabezados):
+        celda.text = texto
+
+    for fila, alumno in zip(table.rows[1:], datos["alumnos"]):
+        valores = ([f"{alumno['apellido']}, {alumno['nombre']}"] + alumno["notas"]
+                   + [alumno["promedio"], alumno["ponderado"], alumno["mediana"], condicion(alumno)])
+        for celda, valor in zip(fila.cells, valores):
+            celda.text = "" if valor is None else f"{valor:g}" if isinstance(valor, float) else str(valor)
+
+    doc.add_paragraph("")
+    doc.add_paragraph(
+        f"Aprobados: {datos['aprobados']} - Desaprobados: {datos['desaprobados']} - "
+        f"Sin notas: {datos['sin_notas']} (aprobación con {datos['nota_aprobacion']:g})"
+    )
+    doc.save(destino)
+
+
+def condicion(alumno):
+    if alumno["aprobado"] is None:
+        return "Sin notas"
+    return "Aprobado" if alumno["aprobado"] else "Desaprobado"
+
+
+def docx_alumnos(destino, curso_nombre, curso_año, alumnos):
+    doc = Document()
+    doc.add_heading(f"Alumnos del Curso: {curso_nombre} - Año {curso_año}", 0)
+    for apellido, nombre in alumnos:
+        doc.add_paragraph(f"{apellido}, {nombre}")
+    doc.save(destino)
+
+
+# ================== CSV / XLSX ==================
+
+def csv_asistencia(filas, fechas):
+    """Generador de líneas CSV, una por alumno, sin acumular el archivo en memoria."""
+    writer = escritor_csv()
+    # BOM para que Excel reconozca los acentos
+    yield "\ufeff" + writer.writerow(["Apellido", "Nombre"] + [f.isoformat() for f in fechas])
+    for _, apellido, nombre, registros in filas:
+        yield writer.writerow(
+            [apellido, nombre] + [estado_asistencia(registros.get(f)) for f in fechas]
+        )
+
+
+def xlsx_asistencia(destino, titulo, filas, fechas):
+    """Escribe la planilla en modo write_only: las filas se vuelcan a medida que se agregan."""
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise RuntimeError("La exportación a XLSX requiere el paquete openpyxl.")
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(title=titulo[:31])
+    hoja.append(["Apellido", "Nombre"] + [f.isoformat() for f in fechas])
+    for _, apellido, nombre, registros in filas:
+        hoja.append([apellido, nombre] + [estado_asistencia(registros.get(f)) for f in fechas])
+    libro.save(destino)
+
+
+# ================== Generación completa ==================
+
+TIPOS = ("notas", "asistencia", "alumnos")
+
+
+def _nombre_con_año(curso):
+    return f"{curso[0]} - Año {curso[1]}" if curso else "Curso Desconocido"
+
+
+def nombre_descarga(tipo, curso, desde=None, hasta=None, formato="docx"):
+    """Nombre del archivo que recibe el usuario; curso es (nombre, año) o None."""
+    if tipo == "notas":
+        return f"Notas_{_nombre_con_año(curso)}.docx"
+    if tipo == "alumnos":
+        return f"Alumnos_Curso_{curso[0]}.docx"
+    nombre = f"Asistencia_{curso[0]}_{desde.strftime('%d-%m-%Y')}"
+    if hasta - desde > timedelta(days=4):
+        nombre += f"_{hasta.strftime('%d-%m-%Y')}"
+    return f"{nombre}.{formato}"
+
+
+def generar(cur, tipo, curso_id, curso, destino, desde=None, hasta=None, formato="docx", al_avanzar=None,
+            datos=None):
+    """Lee los datos y escribe la exportación completa en destino (archivo binario).
+
+    Es lo que hacen las rutas de exportación y los trabajos en segundo plano.
+    datos permite pasar la libreta ya calculada (p. ej. desde el cache).
+    """
+    if tipo == "notas":
+        if datos is None:
+            datos = libreta.cargar(cur, curso_id).get(curso_id) or libreta.vacia()
+        docx_notas(destino, _nombre_con_año(curso), datos)
+    elif tipo == "alumnos":
+        docx_alumnos(destino, curso[0], curso[1], alumnos_del_curso(cur, curso_id))
+    else:
+        fechas = dias_habiles(desde, hasta)
+        filas = iterar_asistencia_por_alumno(cur, curso_id, desde, hasta)
+        if formato == "csv":
+            for linea in csv_asistencia(filas, fechas):
+                destino.write(linea.encode("utf-8"))
+        elif formato == "xlsx":
+            xlsx_asistencia(destino, curso[0], filas, fechas)
+        else:
+            docx_asistencia(
+                destino,
+                f"Asistencia del Curso: {curso[0]} - Año {curso[1]}",
+                f"{'Semana' if len(fechas) <= 5 else 'Período'}: {desde.strftime('%d/%m/%Y')} - "
+                f"{hasta.strftime('%d/%m/%Y')}",
+                filas,
+                fechas,
+                al_avanzar
+            )
+    if al_avanzar:
+        al_avanzar(1)
+
+
+# ================== ZIP de toda la escuela ==================
+
+def documentos_del_curso(curso, filas, libreta_curso, desde, hasta):
+    """Arma los DOCX de asistencia y notas de un curso y devuelve [(ruta_en_zip, bytes)].
+
+    Recibe solo datos (no cursores) para poder correr en otro proceso.
+    """
+    curso_id, nombre, año = curso
+    # Una "/" en el nombre del curso crearía subcarpetas dentro del ZIP
+    en_ruta = (nombre.replace("/", "-"), año)
+    carpeta = f"{curso_id} - {en_ruta[0]} - Año {año}"
+    fechas = dias_habiles(desde, hasta)
+
+    asistencia = BytesIO()
+    docx_asistencia(
+        asistencia,
+        f"Asistencia del Curso: {nombre} - Año {año}",
+        f"Período: {desde.strftime('%d/%m/%Y')} - {hasta.strftime('%d/%m/%Y')}",
+        filas,
+        fechas
+    )
+    calificaciones = BytesIO()
+    docx_notas(calificaciones, f"{nombre} - Año {año}", libreta_curso)
+
+    return [
+        (f"{carpeta}/{nombre_descarga('asistencia', en_ruta, desde, hasta)}", asistencia.getvalue()),
+        (f"{carpeta}/{nombre_descarga('notas', en_ruta)}", calificaciones.getvalue()),
+    ]
+
+
+class _SalidaZip:
+    # Destino solo-escritura (sin seek): ZipFile escribe acá y zip_en_streaming lo va vaciando
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def zip_en_streaming(archivos):
+    """Generador de trozos de un ZIP armado con los (nombre, bytes) de archivos.
+
+    Cada archivo se envía apenas se agrega: en memoria queda como mucho uno a la vez.
+    """
+    salida = _SalidaZip()
+    # Los DOCX ya vienen comprimidos: volver a comprimirlos gasta CPU sin achicarlos
+    with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_STORED) as archivo_zip:
+        for nombre, contenido in archivos:
+            archivo_zip.writestr(nombre, contenido)
+            yield salida.vaciar()
+    yield salida.vaciar()
@@ -0,0 +1,57 @@
+"""Configuración de gunicorn para Asistente Taller.
+
+    gunicorn app:app        (desde este directorio toma este archivo solo)
+
+Workers e hilos salen de los CPUs disponibles y del pool de conexiones:
+
+- hilos por worker = DB_POOL_MAX, porque cada hilo usa a lo sumo una conexión
+  y un hilo de más solo espera una libre;
+- workers = 2 x CPUs + 1, sin pasar de DB_CONEXIONES_MAX / DB_POOL_MAX para no
+  superar las conexiones que admite el servidor de Postgres.
+
+WEB_CONCURRENCY y GUNICORN_THREADS los fijan a mano. La app se importa una vez
+en el master (preload) y los workers la heredan con el fork; las migraciones y
+el usuario admin se aplican en on_starting, antes de crear los workers.
+
+Recarga sin cortar peticiones: kill -HUP <master> reemplaza los workers de a
+uno. Con preload el código no se vuelve a importar: para desplegar código nuevo
+kill -USR2 <master> arranca un master nuevo y, cuando atiende, kill -TERM al
+viejo.
+"""
+import os
+import sys
+
+# comun/ está en la raíz del repositorio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from comun.servidor import cpus_disponibles
+
+
+_pool = int(os.environ.get("DB_POOL_MAX", 10))
+_conexiones_servidor = int(os.environ.get("DB_CONEXIONES_MAX", 90))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", _pool))
+workers = int(os.environ.get("WEB_CONCURRENCY", 0)) or max(
+    min(2 * cpus_disponibles() + 1, _conexiones_servidor // _pool), 1)
+
+preload_app = True
+# Las exportaciones pesadas corren en el pool de procesos de trabajos.py, no en el worker
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+# Reciclar los workers de a poco acota la memoria que acumulan numpy y los caches
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
+errorlog = "-"
+
+
+def on_starting(server):
+    # Una sola vez, en el master: los workers arrancan con el esquema al día
+    from app import get_pool, init_db
+
+    init_db()
+    # El master no atiende peticiones: no se queda con conexiones abiertas
+    get_pool().cerrar()
+    server.log.info("Workers: %s, hilos por worker: %s, pool por worker: %s", workers, threads, _pool)
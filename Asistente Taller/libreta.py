@@ -0,0 +1,146 @@
+"""Libreta de calificaciones: las notas de un curso como matriz alumnos x evaluaciones.
+
+Las notas se leen con una sola consulta y se pivotean en arrays de numpy;
+promedios, promedio ponderado, mediana y condición se calculan para todos los
+alumnos (y todas las evaluaciones) a la vez. El resultado son listas y dicts
+simples, listos para cachear, mostrar o exportar.
+"""
+import os
+import warnings
+
+import numpy as np
+
+NOTA_APROBACION = float(os.environ.get("NOTA_APROBACION", 6))
+
+
+def cargar(cur, curso_id=None, desde=None, hasta=None):
+    """{curso_id: libreta} de un curso o de toda la escuela, con una consulta.
+
+    Cada evaluación es el texto de notas.evaluacion o, si está vacío, la fecha
+    de la nota. Con desde/hasta solo se cuentan las notas de ese período.
+    Cuando un alumno tiene dos notas en la misma evaluación vale la última.
+    """
+    union, donde, params = "", "", []
+    if desde and hasta:
+        union = " AND n.fecha BETWEEN %s AND %s"
+        params += [desde.isoformat(), hasta.isoformat()]
+    if curso_id is not None:
+        donde = "WHERE a.curso_id=%s"
+        params.append(curso_id)
+    cur.execute(f"""
+        SELECT a.curso_id, a.id, a.apellido, a.nombre,
+               COALESCE(NULLIF(n.evaluacion, ''), to_char(n.fecha, 'DD/MM/YYYY')),
+               n.nota, n.peso, n.fecha
+        FROM alumnos a
+        LEFT JOIN notas n ON n.alumno_id = a.id{union}
+        {donde}
+        ORDER BY a.curso_id, a.apellido, a.nombre, a.id, n.fecha, n.id
+    """, params)
+
+    libretas, actual, filas = {}, None, []
+    for fila in cur:
+        if fila[0] != actual:
+            if filas:
+                libretas[actual] = _armar(filas)
+            actual, filas = fila[0], []
+        filas.append(fila[1:])
+    if filas:
+        libretas[actual] = _armar(filas)
+    return libretas
+
+
+def vacia():
+    return calcular([], [], np.zeros((0, 0)), np.zeros((0, 0)))
+
+
+def _armar(filas):
+    # filas: (alumno_id, apellido, nombre, evaluacion, nota, peso, fecha) de un curso
+    alumnos, indice = [], {}
+    primera_fecha = {}
+    celdas = []
+    for alumno_id, apellido, nombre, evaluacion, nota, peso, fecha in filas:
+        if alumno_id not in indice:
+            indice[alumno_id] = len(alumnos)
+            alumnos.append((alumno_id, apellido, nombre))
+        if nota is None:
+            continue
+        evaluacion = evaluacion or "Sin fecha"
+        if evaluacion not in primera_fecha:
+            primera_fecha[evaluacion] = fecha
+        elif fecha is not None and (primera_fecha[evaluacion] is None or fecha < primera_fecha[evaluacion]):
+            primera_fecha[evaluacion] = fecha
+        celdas.append((indice[alumno_id], evaluacion, nota, 1.0 if peso is None else peso))
+
+    # Columnas en orden cronológico
+    evaluaciones = sorted(primera_fecha, key=lambda e: (primera_fecha[e] is None, primera_fecha[e], e))
+    columna = {e: j for j, e in enumerate(evaluaciones)}
+
+    notas = np.full((len(alumnos), len(evaluaciones)), np.nan)
+    pesos = np.zeros_like(notas)
+    if celdas:
+        filas_idx = np.array([c[0] for c in celdas])
+        columnas_idx = np.array([columna[c[1]] for c in celdas])
+        # Con índices repetidos numpy se queda con la última asignación: la nota más reciente
+        notas[filas_idx, columnas_idx] = [c[2] for c in celdas]
+        pesos[filas_idx, columnas_idx] = [c[3] for c in celdas]
+    return calcular(alumnos, evaluaciones, notas, pesos)
+
+
+def _redondear(valor):
+    return None if np.isnan(valor) else round(float(valor), 2)
+
+
+def calcular(alumnos, evaluaciones, notas, pesos):
+    """Estadísticas de la matriz notas (alumnos x evaluaciones, NaN = sin nota)."""
+    tiene = ~np.isnan(notas)
+    valores = np.where(tiene, notas, 0.0)
+    pesos = np.where(tiene, pesos, 0.0)
+    aprobada = tiene & (valores >= NOTA_APROBACION)
+
+    cantidad = tiene.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        # nanmedian avisa por las filas sin ninguna nota: quedan en NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        promedio = valores.sum(axis=1) / cantidad
+        ponderado = (valores * pesos).sum(axis=1) / pesos.sum(axis=1)
+        mediana = np.nanmedian(notas, axis=1) if notas.size else np.full(len(alumnos), np.nan)
+        cantidad_eval = tiene.sum(axis=0)
+        promedio_eval = valores.sum(axis=0) / cantidad_eval
+
+    # Sin pesos válidos (p. ej. todos 0) el ponderado cae al promedio simple
+    ponderado = np.where(np.isnan(ponderado), promedio, ponderado)
+    aprobado = ponderado >= NOTA_APROBACION
+
+    filas = []
+    for i, (alumno_id, apellido, nombre) in enumerate(alumnos):
+        filas.append({
+            "id": alumno_id,
+            "apellido": apellido,
+            "nombre": nombre,
+            "notas": [_redondear(v) for v in notas[i]],
+            "cantidad": int(cantidad[i]),
+            "promedio": _redondear(promedio[i]),
+            "ponderado": _redondear(ponderado[i]),
+            "mediana": _redondear(mediana[i]),
+            "aprobado": bool(aprobado[i]) if cantidad[i] else None,
+        })
+
+    columnas = []
+    for j, nombre in enumerate(evaluaciones):
+        columnas.append({
+            "nombre": nombre,
+            "cantidad": int(cantidad_eval[j]),
+            "promedio": _redondear(promedio_eval[j]),
+            "aprobados": int(aprobada[:, j].sum()),
+        })
+
+    con_notas = cantidad > 0
+    return {
+        "evaluaciones": columnas,
+        "alumnos": filas,
+        "nota_aprobacion": NOTA_APROBACION,
+        "aprobados": int((aprobado & con_notas).sum()),
+        "desaprobados": int((~aprobado & con_notas).sum()),
+        "sin_notas": int((~con_notas).sum()),
+        "promedio_curso": _redondear(ponderado[con_notas].mean()) if con_notas.any() else None,
+    }
@@ -0,0 +1,187 @@
+"""Migraciones versionadas del esquema.
+
+Cada migración es (versión, descripción, [sentencias]) y se aplica en su propia
+transacción con comun/migraciones.py, igual que las de Asistente.py.
+
+Uso: python migraciones.py  (con DATABASE_URL en el entorno)
+"""
+import os
+import sys
+
+# Módulos compartidos con Asistente.py (comun/, en la raíz del repositorio)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from comun import migraciones  # noqa: E402
+
+# Clave del advisory lock que serializa las migraciones entre procesos
+_LOCK_MIGRACIONES = 727001
+
+MIGRACIONES = [
+    (1, "Esquema inicial", [
+        """
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id SERIAL PRIMARY KEY,
+            usuario TEXT UNIQUE,
+            nombre TEXT,
+            apellido TEXT,
+            rol TEXT,
+            clave TEXT,
+            perfil TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS cursos (
+            id SERIAL PRIMARY KEY,
+            nombre TEXT,
+            año INTEGER
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS alumnos (
+            id SERIAL PRIMARY KEY,
+            nombre TEXT,
+            apellido TEXT,
+            curso_id INTEGER REFERENCES cursos(id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS docente_cursos (
+            id SERIAL PRIMARY KEY,
+            docente_id INTEGER REFERENCES usuarios(id) ON DELETE CASCADE,
+            curso_id INTEGER REFERENCES cursos(id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS notas (
+            id SERIAL PRIMARY KEY,
+            alumno_id INTEGER REFERENCES alumnos(id) ON DELETE CASCADE,
+            docente_id INTEGER REFERENCES usuarios(id) ON DELETE CASCADE,
+            curso_id INTEGER REFERENCES cursos(id) ON DELETE CASCADE,
+            nota REAL,
+            fecha TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS asistencia (
+            id SERIAL PRIMARY KEY,
+            alumno_id INTEGER REFERENCES alumnos(id) ON DELETE CASCADE,
+            docente_id INTEGER REFERENCES usuarios(id) ON DELETE CASCADE,
+            curso_id INTEGER REFERENCES cursos(id) ON DELETE CASCADE,
+            fecha TEXT,
+            presente INTEGER
+        )
+        """,
+    ]),
+    (2, "Asistencia: una fila por celda de la grilla", [
+        # Se conservan los registros más nuevos de cada celda duplicada
+        """
+        DELETE FROM asistencia a
+        USING asistencia b
+        WHERE a.alumno_id = b.alumno_id AND a.docente_id = b.docente_id
+          AND a.curso_id = b.curso_id AND a.fecha = b.fecha AND a.id < b.id
+        """,
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS asistencia_celda_unica
+        ON asistencia (alumno_id, docente_id, curso_id, fecha)
+        """,
+    ]),
+    (3, "Índices de las consultas frecuentes y asignaciones únicas", [
+        "CREATE INDEX IF NOT EXISTS asistencia_alumno_curso_fecha ON asistencia (alumno_id, curso_id, fecha)",
+        "CREATE INDEX IF NOT EXISTS asistencia_curso_fecha ON asistencia (curso_id, fecha)",
+        "CREATE INDEX IF NOT EXISTS notas_alumno ON notas (alumno_id)",
+        "CREATE INDEX IF NOT EXISTS notas_curso ON notas (curso_id)",
+        "CREATE INDEX IF NOT EXISTS alumnos_curso ON alumnos (curso_id, apellido, nombre)",
+        """
+        DELETE FROM docente_cursos a
+        USING docente_cursos b
+        WHERE a.docente_id = b.docente_id AND a.curso_id = b.curso_id AND a.id > b.id
+        """,
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS docente_cursos_unica
+        ON docente_cursos (docente_id, curso_id)
+        """,
+    ]),
+    (4, "fecha como DATE en asistencia y notas", [
+        "ALTER TABLE asistencia ALTER COLUMN fecha TYPE DATE USING NULLIF(fecha, '')::date",
+        "ALTER TABLE notas ALTER COLUMN fecha TYPE DATE USING NULLIF(fecha, '')::date",
+    ]),
+    (5, "Trabajos de exportación y versión de datos por curso", [
+        """
+        CREATE TABLE IF NOT EXISTS versiones_curso (
+            curso_id INTEGER PRIMARY KEY REFERENCES cursos(id) ON DELETE CASCADE,
+            version BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS trabajos_exportacion (
+            id SERIAL PRIMARY KEY,
+            tipo TEXT NOT NULL,
+            curso_id INTEGER REFERENCES cursos(id) ON DELETE CASCADE,
+            parametros TEXT NOT NULL,
+            clave_cache TEXT NOT NULL,
+            estado TEXT NOT NULL DEFAULT 'pendiente',
+            progreso INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            archivo TEXT,
+            nombre_archivo TEXT,
+            creado_por INTEGER REFERENCES usuarios(id) ON DELETE CASCADE,
+            creado_en TIMESTAMPTZ DEFAULT now(),
+            actualizado_en TIMESTAMPTZ DEFAULT now(),
+            terminado_en TIMESTAMPTZ
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS trabajos_exportacion_pendientes
+        ON trabajos_exportacion (clave_cache) WHERE estado IN ('pendiente', 'en_proceso')
+        """,
+    ]),
+    (6, "Resumen semanal de asistencia por alumno", [
+        """
+        CREATE TABLE IF NOT EXISTS asistencia_semanal (
+            curso_id INTEGER REFERENCES cursos(id) ON DELETE CASCADE,
+            alumno_id INTEGER REFERENCES alumnos(id) ON DELETE CASCADE,
+            semana DATE NOT NULL,
+            presentes INTEGER NOT NULL,
+            registrados INTEGER NOT NULL,
+            PRIMARY KEY (curso_id, semana, alumno_id)
+        )
+        """,
+        """
+        INSERT INTO asistencia_semanal (curso_id, alumno_id, semana, presentes, registrados)
+        SELECT curso_id, alumno_id, date_trunc('week', fecha)::date, SUM(presente), COUNT(*)
+        FROM asistencia
+        WHERE fecha IS NOT NULL
+        GROUP BY 1, 2, 3
+        ON CONFLICT DO NOTHING
+        """,
+    ]),
+    (7, "Notas: evaluación y peso", [
+        "ALTER TABLE notas ADD COLUMN IF NOT EXISTS evaluacion TEXT",
+        "ALTER TABLE notas ADD COLUMN IF NOT EXISTS peso REAL NOT NULL DEFAULT 1",
+    ]),
+    # Sin DEFAULT: no reescribe la tabla; las filas viejas quedan en NULL (más antiguas que cualquier marca)
+    (8, "Asistencia: momento de la última modificación de cada celda", [
+        "ALTER TABLE asistencia ADD COLUMN IF NOT EXISTS actualizado TIMESTAMPTZ",
+    ]),
+    # Una sola fila: los caches de cursos de cada worker van por esta versión
+    (9, "Versión de cursos y asignaciones docente-curso", [
+        """
+        CREATE TABLE IF NOT EXISTS version_cursos (
+            id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+            version BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        "INSERT INTO version_cursos DEFAULT VALUES ON CONFLICT DO NOTHING",
+    ]),
+]
+
+VERSION_ACTUAL = MIGRACIONES[-1][0]
+
+
+def aplicar_migraciones(con):
+    """Aplica las migraciones pendientes y devuelve la lista de versiones aplicadas."""
+    return migraciones.aplicar_migraciones(con, MIGRACIONES, _LOCK_MIGRACIONES)
+
+
+if __name__ == "__main__":
+    migraciones.ejecutar(MIGRACIONES, _LOCK_MIGRACIONES)
@@ -0,0 +1,196 @@
+import csv
+import io
+import unicodedata
+from datetime import date
+
+# Las planillas se procesan en memoria: se limita el tamaño del archivo subido
+MAX_BYTES_PLANILLA = 5 * 1024 * 1024
+
+
+class PlanillaInvalida(Exception):
+    """El archivo no se puede leer como CSV o XLSX."""
+
+
+def normalizar(texto):
+    # "Apellido " -> "apellido", "Año" -> "ano": encabezados y nombres comparables
+    texto = unicodedata.normalize("NFKD", str(texto or "").strip().lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def leer_planilla(archivo):
+    """Lee un CSV o XLSX subido y genera (numero_de_fila, {encabezado: valor}).
+
+    Los encabezados se normalizan con normalizar(); los valores se devuelven
+    como texto sin espacios alrededor. Las filas vacías se omiten.
+    """
+    contenido = archivo.read(MAX_BYTES_PLANILLA + 1)
+    if len(contenido) > MAX_BYTES_PLANILLA:
+        raise PlanillaInvalida("El archivo supera el tamaño máximo de 5 MB.")
+
+    nombre = (archivo.filename or "").lower()
+    if nombre.endswith(".xlsx"):
+        filas = _filas_xlsx(contenido)
+    else:
+        filas = _filas_csv(contenido)
+
+    try:
+        encabezados = [normalizar(c) for c in next(filas)]
+    except StopIteration:
+        raise PlanillaInvalida("La planilla está vacía.")
+
+    for numero, fila in enumerate(filas, start=2):
+        valores = ["" if v is None else str(v).strip() for v in fila]
+        if not any(valores):
+            continue
+        yield numero, dict(zip(encabezados, valores))
+
+
+def _filas_csv(contenido):
+    try:
+        texto = contenido.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        texto = contenido.decode("latin-1")
+    try:
+        # Excel en castellano exporta con ';'
+        dialecto = csv.Sniffer().sniff(texto[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialecto = csv.excel
+    return csv.reader(io.StringIO(texto), dialecto)
+
+
+def _filas_xlsx(contenido):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise PlanillaInvalida("La importación de XLSX requiere el paquete openpyxl.")
+    try:
+        libro = load_workbook(io.BytesIO(contenido), read_only=True, data_only=True)
+    except Exception:
+        raise PlanillaInvalida("El archivo no es un XLSX válido.")
+    return libro.active.iter_rows(values_only=True)
+
+
+# ================== Notas ==================
+
+NOTA_MINIMA = 0
+NOTA_MAXIMA = 10
+
+
+def convertir_nota(texto):
+    """Devuelve (nota, None) si el texto es una nota válida o (None, error)."""
+    try:
+        # Se acepta coma decimal: "7,5"
+        nota = float(str(texto).replace(",", "."))
+    except ValueError:
+        return None, f"'{texto}' no es un número"
+    if not NOTA_MINIMA <= nota <= NOTA_MAXIMA:
+        return None, f"La nota {nota:g} está fuera del rango {NOTA_MINIMA}-{NOTA_MAXIMA}"
+    return nota, None
+
+
+def convertir_peso(texto):
+    """Devuelve (peso, None) o (None, error); sin texto el peso es 1."""
+    if not str(texto or "").strip():
+        return 1.0, None
+    try:
+        peso = float(str(texto).replace(",", "."))
+    except ValueError:
+        return None, f"El peso '{texto}' no es un número"
+    if peso <= 0:
+        return None, "El peso debe ser mayor que 0"
+    return peso, None
+
+
+def filas_de_notas(planilla, alumnos, fecha_por_defecto):
+    """Valida las filas de una planilla de notas contra los alumnos del curso.
+
+    Cada fila identifica al alumno por la columna alumno_id o por apellido y
+    nombre; la columna nota es obligatoria y fecha (AAAA-MM-DD), evaluacion y
+    peso opcionales. Devuelve (filas_validas, errores) con filas
+    (alumno_id, nota, fecha, evaluacion, peso) y errores
+    (numero_de_fila, mensaje); una fila inválida no descarta las demás.
+    """
+    por_id = {alumno_id for alumno_id, _, _ in alumnos}
+    por_nombre = {(normalizar(apellido), normalizar(nombre)): alumno_id
+                  for alumno_id, nombre, apellido in alumnos}
+
+    validas, errores = [], []
+    for numero, fila in planilla:
+        if fila.get("alumno_id"):
+            try:
+                alumno_id = int(float(fila["alumno_id"]))
+            except ValueError:
+                errores.append((numero, f"alumno_id '{fila['alumno_id']}' no es un número"))
+                continue
+            if alumno_id not in por_id:
+                errores.append((numero, f"El alumno {alumno_id} no pertenece al curso"))
+                continue
+        else:
+            clave = (normalizar(fila.get("apellido")), normalizar(fila.get("nombre")))
+            alumno_id = por_nombre.get(clave)
+            if alumno_id is None:
+                errores.append((numero, f"No se encontró al alumno '{fila.get('apellido', '')}, "
+                                        f"{fila.get('nombre', '')}' en el curso"))
+                continue
+
+        if not fila.get("nota"):
+            errores.append((numero, "Falta la nota"))
+            continue
+        nota, error = convertir_nota(fila["nota"])
+        if error:
+            errores.append((numero, error))
+            continue
+
+        fecha = fecha_por_defecto
+        if fila.get("fecha"):
+            try:
+                fecha = date.fromisoformat(fila["fecha"][:10])
+            except ValueError:
+                errores.append((numero, f"Fecha inválida '{fila['fecha']}' (usar AAAA-MM-DD)"))
+                continue
+
+        peso, error = convertir_peso(fila.get("peso"))
+        if error:
+            errores.append((numero, error))
+            continue
+
+        validas.append((alumno_id, nota, fecha, fila.get("evaluacion") or None, peso))
+    return validas, errores
+
+
+# ================== Alumnos ==================
+
+def filas_de_alumnos(planilla, cursos):
+    """Valida una planilla de alumnos con columnas apellido, nombre y curso.
+
+    El curso puede indicarse por id, por nombre o como "Nombre - Año N" (como
+    se muestra en el panel) cuando hay varios cursos con el mismo nombre.
+    Devuelve (filas_validas, errores) con filas (apellido, nombre, curso_id).
+    """
+    por_id = {curso_id for curso_id, _, _ in cursos}
+    por_nombre = {}
+    for curso_id, nombre, año in cursos:
+        por_nombre.setdefault(normalizar(nombre), set()).add(curso_id)
+        por_nombre.setdefault(normalizar(f"{nombre} - Año {año}"), set()).add(curso_id)
+
+    validas, errores = [], []
+    for numero, fila in planilla:
+        apellido, nombre, curso = fila.get("apellido", ""), fila.get("nombre", ""), fila.get("curso", "")
+        if not apellido or not nombre:
+            errores.append((numero, "Faltan el apellido o el nombre"))
+            continue
+
+        if curso.isdigit() and int(curso) in por_id:
+            curso_id = int(curso)
+        else:
+            candidatos = por_nombre.get(normalizar(curso), set())
+            if not candidatos:
+                errores.append((numero, f"No existe el curso '{curso}'"))
+                continue
+            if len(candidatos) > 1:
+                errores.append((numero, f"Hay varios cursos '{curso}': indicar 'Nombre - Año N'"))
+                continue
+            curso_id = next(iter(candidatos))
+
+        validas.append((apellido, nombre, curso_id))
+    return validas, errores
@@ -0,0 +1,286 @@
+// Guardado de la grilla de asistencia sin recargar la página.
+//
+// Cada casilla que se cambia va a una cola en el navegador (localStorage) y la
+// cola se manda por lotes a /asistencia/sincronizar: al tocar "Guardar", al
+// volver la conexión, al salir de la página y al abrirla. Con y sin red el
+// camino es el mismo; sin conexión las marcas esperan en la cola.
+//
+// Cada lote lleva la versión de la grilla semanal sobre la que se hicieron las
+// marcas. Si otro guardó esa semana mientras tanto, el servidor no aplica esas
+// marcas y devuelve la grilla actual, que se muestra con los cambios propios
+// sin guardar para revisarlos y volver a guardar; si la semana no es la de esta
+// página, las marcas quedan apartadas hasta que se abra. Las marcas sin versión
+// (de una cola anterior) se resuelven por la hora: gana la última.
+// Sin JavaScript el formulario funciona como siempre.
+const MARCAS_POR_LOTE = 500;
+// fetch con keepalive (al cerrar la página) no admite cuerpos de más de 64 KB
+const MAX_BYTES_KEEPALIVE = 60000;
+const TEXTO_CONFLICTO = 'Otro guardó esta semana mientras la editabas: se actualizó la grilla y tus cambios quedaron sin guardar, revisalos y volvé a guardar.';
+
+const form = document.getElementById('grilla-asistencia');
+const estado = form.querySelector('.sincronizacion-estado');
+const version = form.querySelector('input[name="version"]');
+const casillas = Array.from(form.querySelectorAll('input[data-alumno]'));
+const claveCola = `asistencia-pendientes-${form.dataset.usuario}`;
+// Grilla de esta página: curso y primer día de la semana que muestra
+const estaGrilla = `${form.dataset.curso}|${form.dataset.semana}`;
+let enviando = false;
+
+// {marcas: {celda: marca}, versiones: {grilla: versión}, conflictos: {celda: marca}}
+function leerCola() {
+    let cola;
+    try {
+        cola = JSON.parse(localStorage.getItem(claveCola)) || {};
+    } catch (error) {
+        cola = {};
+    }
+    if (!cola.marcas) {
+        // Cola guardada por una versión anterior de la página: solo marcas, sin versión
+        cola = {marcas: cola};
+    }
+    cola.versiones = cola.versiones || {};
+    cola.conflictos = cola.conflictos || {};
+    return cola;
+}
+
+function guardarCola(cola) {
+    // La versión de una grilla se guarda mientras queden marcas suyas en la cola
+    Object.keys(cola.versiones).forEach(grilla => {
+        if (!tieneMarcas(cola, grilla)) {
+            delete cola.versiones[grilla];
+        }
+    });
+    localStorage.setItem(claveCola, JSON.stringify(cola));
+}
+
+function grillaDe(marca) {
+    return `${marca.curso_id}|${marca.semana}`;
+}
+
+function tieneMarcas(cola, grilla) {
+    return Object.values(cola.marcas).some(marca => grillaDe(marca) === grilla);
+}
+
+function casilla(alumnoId, fecha) {
+    return form.querySelector(`input[data-alumno="${alumnoId}"][data-fecha="${fecha}"]`);
+}
+
+function plural(cantidad, texto) {
+    return cantidad === 1 ? texto : texto.replace(/(\w+)/g, '$1s');
+}
+
+function mostrarPendientes(cola, texto) {
+    const pendientes = Object.keys(cola.marcas).length;
+    const apartadas = Object.keys(cola.conflictos).length;
+    const partes = [texto || (pendientes ? `${pendientes} ${plural(pendientes, 'marca')} sin enviar.` : '')];
+    if (apartadas) {
+        partes.push(`${apartadas} ${plural(apartadas, 'marca')} de otra semana sin guardar porque alguien más la cambió: abrí esa semana para revisarlas.`);
+    }
+    estado.textContent = partes.filter(Boolean).join(' ');
+}
+
+function textoGuardada(cambios) {
+    return `Asistencia guardada: ${cambios} ${plural(cambios, 'registro modificado')}.`;
+}
+
+// defaultChecked es el estado con el que se abrió (o se guardó por última vez) la grilla
+function modificadas() {
+    return casillas.filter(input => input.checked !== input.defaultChecked);
+}
+
+// Una marca por celda: si se vuelve a encolar, reemplaza a la anterior
+function encolar(inputs) {
+    if (!inputs.length) {
+        return;
+    }
+    const cola = leerCola();
+    if (!tieneMarcas(cola, estaGrilla)) {
+        // Las marcas de esta semana se hacen sobre la versión que muestra la página
+        cola.versiones[estaGrilla] = version.value;
+    }
+    const marca = new Date().toISOString();
+    inputs.forEach(input => {
+        cola.marcas[`${input.dataset.alumno}|${input.dataset.fecha}`] = {
+            alumno_id: Number(input.dataset.alumno),
+            curso_id: Number(form.dataset.curso),
+            semana: form.dataset.semana,
+            fecha: input.dataset.fecha,
+            presente: input.checked,
+            marca: marca
+        };
+        input.defaultChecked = input.checked;
+    });
+    guardarCola(cola);
+    mostrarPendientes(cola);
+}
+
+// Marcas de esta semana que no se aplicaron: quedan como cambios sin guardar
+// sobre la grilla actual. Devuelve cuántas difieren de lo que hay en la base.
+function dejarSinGuardar(marcas) {
+    let distintas = 0;
+    marcas.forEach(marca => {
+        const input = casilla(marca.alumno_id, marca.fecha);
+        if (input) {
+            input.checked = marca.presente;
+            distintas += input.checked !== input.defaultChecked ? 1 : 0;
+        }
+    });
+    return distintas;
+}
+
+function mostrarGrilla(actual) {
+    casillas.forEach(input => {
+        input.checked = input.defaultChecked = Boolean(actual.celdas[`${input.dataset.alumno}_${input.dataset.fecha}`]);
+    });
+    version.value = actual.version;
+}
+
+function guardar() {
+    encolar(modificadas());
+    const cola = leerCola();
+    if (!Object.keys(cola.marcas).length) {
+        mostrarPendientes(cola, 'No hay cambios para guardar.');
+    } else if (!navigator.onLine) {
+        mostrarPendientes(cola, 'Sin conexión: las marcas se enviarán al volver la red.');
+    } else {
+        enviarCola();
+    }
+}
+
+async function enviarCola(alSalir = false) {
+    const claves = Object.keys(leerCola().marcas);
+    if (!claves.length || enviando || !navigator.onLine) {
+        return;
+    }
+
+    enviando = true;
+    let cambios = 0;
+    let descartadas = 0;
+    let enConflicto = 0;
+    try {
+        for (let i = 0; i < claves.length; i += MARCAS_POR_LOTE) {
+            const cola = leerCola();
+            const lote = claves.slice(i, i + MARCAS_POR_LOTE).filter(clave => cola.marcas[clave]);
+            if (!lote.length) {
+                continue;
+            }
+            const enviadas = lote.map(clave => cola.marcas[clave]);
+            const versiones = {};
+            enviadas.forEach(marca => {
+                const grilla = grillaDe(marca);
+                if (grilla in cola.versiones) {
+                    versiones[grilla] = cola.versiones[grilla];
+                }
+            });
+            const cuerpo = JSON.stringify({marcas: enviadas, versiones: versiones});
+            const respuesta = await fetch('/asistencia/sincronizar', {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: cuerpo,
+                credentials: 'same-origin',
+                keepalive: alSalir && cuerpo.length < MAX_BYTES_KEEPALIVE
+            });
+            if (respuesta.status === 401) {
+                throw new Error('Sesión vencida: ingresá de nuevo, las marcas quedan guardadas.');
+            }
+            const resultado = await respuesta.json();
+            if (!respuesta.ok) {
+                throw new Error(resultado.error || 'No se pudo guardar la asistencia');
+            }
+            cambios += resultado.cambios;
+            // Marcas mal formadas o de alumnos que no son de los cursos del docente: salen de la cola
+            descartadas += resultado.invalidas.length + resultado.rechazadas.length;
+
+            // Las marcas enviadas salen de la cola, salvo las que se volvieron a encolar mientras tanto
+            const actual = leerCola();
+            lote.forEach((clave, j) => {
+                if (actual.marcas[clave] && actual.marcas[clave].marca === enviadas[j].marca) {
+                    delete actual.marcas[clave];
+                }
+            });
+
+            // Semanas que otro cambió: sus marcas no aplicadas, y las encoladas después, se apartan
+            const apartadas = {};
+            resultado.en_conflicto.forEach(j => {
+                apartadas[`${enviadas[j].alumno_id}|${enviadas[j].fecha}`] = enviadas[j];
+            });
+            Object.entries(actual.marcas).forEach(([clave, marca]) => {
+                if (grillaDe(marca) in resultado.conflictos) {
+                    apartadas[clave] = marca;
+                    delete actual.marcas[clave];
+                }
+            });
+            const aqui = resultado.conflictos[estaGrilla];
+            Object.entries(apartadas).forEach(([clave, marca]) => {
+                if (!aqui || grillaDe(marca) !== estaGrilla) {
+                    actual.conflictos[clave] = marca;
+                }
+            });
+            if (aqui) {
+                mostrarGrilla(aqui);
+                enConflicto += dejarSinGuardar(Object.values(apartadas).filter(marca => grillaDe(marca) === estaGrilla));
+            }
+
+            // Versión nueva de las semanas guardadas, para las marcas que siguen en la cola
+            Object.entries(resultado.versiones).forEach(([grilla, nueva]) => {
+                actual.versiones[grilla] = nueva;
+                if (grilla === estaGrilla) {
+                    version.value = nueva;
+                }
+            });
+
+            // Donde ganó una escritura posterior (otro dispositivo) se muestra lo que quedó,
+            // salvo que la celda tenga un cambio propio sin guardar
+            resultado.celdas.filter(celda => !celda.aplicada).forEach(celda => {
+                const input = casilla(celda.alumno_id, celda.fecha);
+                if (input && input.checked === input.defaultChecked && !actual.marcas[`${celda.alumno_id}|${celda.fecha}`]) {
+                    input.checked = input.defaultChecked = Boolean(celda.presente);
+                }
+            });
+            guardarCola(actual);
+        }
+        let texto = enConflicto ? TEXTO_CONFLICTO : textoGuardada(cambios);
+        if (descartadas) {
+            texto += ` ${descartadas} ${plural(descartadas, 'marca descartada')}: no corresponden a tus cursos.`;
+        }
+        mostrarPendientes(leerCola(), texto);
+    } catch (error) {
+        // Error de red: la cola queda intacta y se reintenta al volver la conexión
+        mostrarPendientes(leerCola(), error instanceof TypeError ? 'Sin conexión: las marcas se enviarán más tarde.' : error.message);
+    } finally {
+        enviando = false;
+    }
+}
+
+// Al abrir la página las marcas encoladas (también de otra semana o curso) se
+// reflejan en la grilla, y las apartadas de esta semana quedan sin guardar
+const inicial = leerCola();
+Object.values(inicial.marcas).forEach(marca => {
+    const input = casilla(marca.alumno_id, marca.fecha);
+    if (input) {
+        input.checked = input.defaultChecked = marca.presente;
+    }
+});
+const apartadasAqui = Object.entries(inicial.conflictos).filter(([, marca]) => grillaDe(marca) === estaGrilla);
+apartadasAqui.forEach(([clave]) => delete inicial.conflictos[clave]);
+if (apartadasAqui.length) {
+    guardarCola(inicial);
+}
+mostrarPendientes(inicial, dejarSinGuardar(apartadasAqui.map(([, marca]) => marca)) ? TEXTO_CONFLICTO : '');
+
+casillas.forEach(input => input.addEventListener('change', () => encolar([input])));
+form.addEventListener('submit', evento => {
+    evento.preventDefault();
+    guardar();
+});
+window.addEventListener('online', () => enviarCola());
+document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState === 'hidden') {
+        enviarCola(true);
+    }
+});
+enviarCola();
+
+if ('serviceWorker' in navigator) {
+    navigator.serviceWorker.register('/sw.js');
+}
@@ -0,0 +1,49 @@
+// Exportaciones en segundo plano: los formularios con data-exportar crean un
+// trabajo en el servidor, muestran el progreso y descargan el archivo al
+// terminar. Sin JavaScript el formulario sigue funcionando con su action normal.
+document.querySelectorAll('form[data-exportar]').forEach(form => {
+    const estado = form.querySelector('.exportar-estado');
+    const boton = form.querySelector('button[type="submit"]');
+
+    form.addEventListener('submit', async evento => {
+        evento.preventDefault();
+        boton.disabled = true;
+        estado.textContent = 'Preparando...';
+        try {
+            const respuesta = await fetch(form.dataset.exportar, {
+                method: 'POST',
+                body: new FormData(form),
+                credentials: 'same-origin'
+            });
+            const trabajo = await respuesta.json();
+            if (!respuesta.ok) {
+                throw new Error(trabajo.error || 'No se pudo crear la exportación');
+            }
+            await esperar(trabajo, estado);
+            window.location = trabajo.descargar;
+            estado.textContent = '';
+        } catch (error) {
+            estado.textContent = error.message;
+        } finally {
+            boton.disabled = false;
+        }
+    });
+});
+
+async function esperar(trabajo, estado) {
+    let pausa = 500;
+    while (true) {
+        const respuesta = await fetch(trabajo.estado, {credentials: 'same-origin'});
+        const datos = await respuesta.json();
+        if (!respuesta.ok || datos.estado === 'error') {
+            throw new Error(datos.error || 'La exportación falló');
+        }
+        if (datos.estado === 'listo') {
+            return;
+        }
+        estado.textContent = `Generando... ${datos.progreso}%`;
+        await new Promise(resolver => setTimeout(resolver, pausa));
+        // Se espacian las consultas en las exportaciones largas
+        pausa = Math.min(pausa * 1.5, 3000);
+    }
+}
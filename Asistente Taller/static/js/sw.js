@@ -0,0 +1,60 @@
+// Service worker de la grilla de asistencia (se sirve en /sw.js para abarcar
+// todo el sitio). Guarda la última versión de cada página de asistencia y de
+// los archivos estáticos, para que la grilla abra sin conexión; las marcas se
+// encolan en el navegador (asistencia.js) y se envían al volver la red.
+const ESTATICOS = 'taller-estaticos-v1';
+const PAGINAS = 'taller-asistencia-v1';
+
+self.addEventListener('install', evento => {
+    evento.waitUntil(
+        caches.open(ESTATICOS)
+            .then(cache => cache.addAll(['/static/css/style.css', '/static/js/asistencia.js']))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', evento => {
+    evento.waitUntil(
+        caches.keys()
+            .then(nombres => Promise.all(
+                nombres.filter(n => n !== ESTATICOS && n !== PAGINAS).map(n => caches.delete(n))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+// Primero la red; si no hay conexión, la copia guardada
+async function redPrimero(pedido, nombreCache) {
+    try {
+        const respuesta = await fetch(pedido);
+        if (respuesta.ok && !respuesta.redirected) {
+            const cache = await caches.open(nombreCache);
+            cache.put(pedido, respuesta.clone());
+        }
+        return respuesta;
+    } catch (error) {
+        const guardada = await caches.match(pedido);
+        if (guardada) {
+            return guardada;
+        }
+        throw error;
+    }
+}
+
+self.addEventListener('fetch', evento => {
+    const pedido = evento.request;
+    const url = new URL(pedido.url);
+    if (pedido.method !== 'GET' || url.origin !== self.location.origin) {
+        return;
+    }
+    // Al cerrar sesión no quedan grillas de ese docente en el dispositivo
+    if (url.pathname === '/logout') {
+        evento.waitUntil(caches.delete(PAGINAS));
+        return;
+    }
+    if (/^\/asistencia\/\d+$/.test(url.pathname)) {
+        evento.respondWith(redPrimero(pedido, PAGINAS));
+    } else if (url.pathname.startsWith('/static/')) {
+        evento.respondWith(redPrimero(pedido, ESTATICOS));
+    }
+});
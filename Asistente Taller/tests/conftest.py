@@ -0,0 +1,69 @@
+import os
+import sys
+
+import psycopg2
+import pytest
+
+# Los módulos de la app se importan desde su directorio, antes que los de la raíz
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migraciones import aplicar_migraciones  # noqa: E402
+
+# Las pruebas que usan la base necesitan un Postgres descartable: se borran todos sus datos
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+@pytest.fixture(scope="session")
+def base():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL no está configurada")
+    con = psycopg2.connect(TEST_DATABASE_URL)
+    aplicar_migraciones(con)
+    yield con
+    con.close()
+
+
+@pytest.fixture
+def con(base):
+    base.rollback()
+    cur = base.cursor()
+    cur.execute("TRUNCATE usuarios, cursos, versiones_curso RESTART IDENTITY CASCADE")
+    base.commit()
+    yield base
+    base.rollback()
+
+
+@pytest.fixture
+def escuela(con):
+    """Docente asignado al curso 1 (alumnos 1 y 2); el curso 2 (alumno 3) es de otro docente."""
+    cur = con.cursor()
+    cur.execute("""
+        INSERT INTO usuarios (usuario, nombre, apellido, rol, clave, perfil) VALUES
+            ('docente', 'Ana', 'Paz', 'docente', 'clave', ''),
+            ('otro', 'Beto', 'Ruiz', 'docente', 'clave', '')
+    """)
+    cur.execute("INSERT INTO cursos (nombre, año) VALUES ('1A', 1), ('2B', 2)")
+    cur.execute("INSERT INTO docente_cursos (docente_id, curso_id) VALUES (1, 1), (2, 2)")
+    cur.execute("""
+        INSERT INTO alumnos (nombre, apellido, curso_id) VALUES
+            ('Carla', 'Gómez', 1), ('Diego', 'López', 1), ('Eva', 'Sosa', 2)
+    """)
+    con.commit()
+    return {"docente": 1, "otro": 2, "curso": 1, "curso_ajeno": 2, "alumnos": [1, 2], "alumno_ajeno": 3}
+
+
+@pytest.fixture
+def cliente(escuela, monkeypatch):
+    """Cliente de prueba de la app con la sesión del docente de la escuela."""
+    monkeypatch.setenv("DATABASE_URL", TEST_DATABASE_URL)
+    import app
+    from comun import auth
+
+    # Cada prueba vacía la base: nada de lo que quedó en los caches del proceso vale
+    app.cache_cursos.invalidar()
+    cliente = app.app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion["usuario_id"] = escuela["docente"]
+        sesion["rol"] = "docente"
+        auth.marcar_sesion_validada(sesion)
+    return cliente
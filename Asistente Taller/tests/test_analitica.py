@@ -0,0 +1,103 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+import analitica
+from analitica import AUSENTE, PRESENTE, SIN_REGISTRO
+
+LUNES = date(2024, 3, 4)
+
+
+def test_rachas_de_ausencia():
+    ausente = np.array([
+        [1, 1, 0, 1, 1, 1],
+        [0, 0, 0, 0, 0, 0],
+        [1, 0, 0, 0, 0, 0],
+    ], dtype=bool)
+    maxima, actual = analitica.rachas_de_ausencia(ausente)
+    assert maxima.tolist() == [3, 0, 1]
+    assert actual.tolist() == [3, 0, 0]
+
+
+def test_pendiente_ignora_los_puntos_no_validos():
+    y = np.array([[100, 90, 80, 70], [100, np.nan, 80, np.nan], [50, np.nan, np.nan, np.nan]])
+    pendientes = analitica.pendiente(y, ~np.isnan(y))
+    assert pendientes[:2].tolist() == [-10.0, -10.0]
+    # Con un solo punto no hay tendencia
+    assert np.isnan(pendientes[2])
+
+
+def dos_semanas(*alumnos):
+    # Una fila por alumno con sus 10 días hábiles; el fin de semana sin registro
+    matriz = np.full((len(alumnos), 14), SIN_REGISTRO, dtype=np.int8)
+    for i, dias in enumerate(alumnos):
+        matriz[i, [0, 1, 2, 3, 4, 7, 8, 9, 10, 11]] = dias
+    return matriz
+
+
+def test_analizar_curso():
+    P, A, S = PRESENTE, AUSENTE, SIN_REGISTRO
+    matriz = dos_semanas([P] * 10, [P] * 5 + [A, A, A, P, S])
+    datos, lunes = analitica.analizar_curso(matriz, LUNES)
+
+    assert datos["presentes"].tolist() == [10, 6]
+    assert datos["registrados"].tolist() == [10, 9]
+    assert np.round(datos["porcentaje"], 1).tolist() == [100.0, 66.7]
+    assert datos["racha_maxima"].tolist() == [0, 3]
+    # El viernes sin registro no corta ni alarga la racha: el jueves estuvo presente
+    assert datos["racha_actual"].tolist() == [0, 0]
+    assert datos["semanal"].tolist() == [[100, 100], [100, 25]]
+    assert datos["tendencia"].tolist() == [0, -75]
+    assert lunes == [LUNES, LUNES + timedelta(days=7)]
+
+
+def test_curso_sin_registros():
+    datos, lunes = analitica.analizar_curso(np.full((2, 5), SIN_REGISTRO, dtype=np.int8), LUNES)
+    assert np.isnan(datos["porcentaje"]).all()
+    assert datos["racha_maxima"].tolist() == [0, 0]
+    assert datos["semanal"].shape == (2, 0)
+    assert lunes == []
+
+
+def asistencia(con, docente_id, alumno_id, curso_id, dias):
+    cur = con.cursor()
+    for i, presente in enumerate(dias):
+        if presente is not None:
+            cur.execute("""
+                INSERT INTO asistencia (alumno_id, docente_id, curso_id, fecha, presente)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (alumno_id, docente_id, curso_id, LUNES + timedelta(days=i + 2 * (i // 5)), presente))
+    con.commit()
+
+
+def test_reporte_ausentismo(con, escuela):
+    asistencia(con, 1, 1, 1, [1, 1, 1, 1, 1, 0, 0, 0, 1, 1])
+    asistencia(con, 1, 2, 1, [1, 1, 1, 1, 1, 1, 1, 1, 0, 0])
+    # Otro docente marcó presente el lunes que el primero marcó ausente: cuenta presente
+    cur = con.cursor()
+    cur.execute("INSERT INTO docente_cursos (docente_id, curso_id) VALUES (2, 1)")
+    asistencia(con, 2, 2, 1, [None] * 8 + [1])
+
+    [curso] = analitica.reporte_ausentismo(con.cursor(), LUNES, LUNES + timedelta(days=13), curso_id=1)
+    carla, diego = curso["alumnos"]
+    # 7 de 10 (< 75%), 3 ausencias seguidas y de 100% a 40% en una semana
+    assert (carla["alumno_id"], carla["porcentaje"], carla["racha_maxima"]) == (1, 70.0, 3)
+    assert carla["semanal"] == [100, 40] and carla["tendencia"] == -60.0
+    assert carla["motivos"] == ["asistencia menor al 75%", "3 ausencias seguidas", "asistencia en baja"]
+    # 9 de 10 y una sola ausencia, al final: solo la tendencia (de 100% a 80%) lo pone en riesgo
+    assert (diego["alumno_id"], diego["presentes"], diego["racha_actual"]) == (2, 9, 1)
+    assert diego["motivos"] == ["asistencia en baja"]
+    assert (curso["en_riesgo"], curso["porcentaje_medio"], curso["semanas"]) == (2, 80.0, [LUNES, LUNES + timedelta(7)])
+
+
+def test_reporte_de_cursos_sin_asistencia_o_sin_alumnos(con, escuela):
+    cur = con.cursor()
+    [curso] = analitica.reporte_ausentismo(cur, LUNES, LUNES + timedelta(days=4), curso_id=2)
+    [eva] = curso["alumnos"]
+    assert (eva["porcentaje"], eva["tendencia"], eva["motivos"]) == (None, None, [])
+    assert (curso["en_riesgo"], curso["porcentaje_medio"], curso["semanas"]) == (0, None, [])
+
+    cur.execute("INSERT INTO cursos (nombre, año) VALUES ('3C', 3) RETURNING id")
+    curso_vacio = cur.fetchone()[0]
+    con.commit()
+    assert analitica.reporte_ausentismo(cur, LUNES, LUNES + timedelta(days=4), curso_id=curso_vacio) == []
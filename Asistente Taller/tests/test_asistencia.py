@@ -0,0 +1,150 @@
+import re
+from datetime import date, datetime, timezone
+
+from consultas import cargar_asistencia, estadisticas_cursos
+
+LUNES = date(2024, 3, 4)
+URL = f"/asistencia/1?inicio={LUNES.isoformat()}"
+
+
+def version_de(cliente):
+    html = cliente.get(URL).get_data(as_text=True)
+    return re.search(r'name="version" value="(\w+)"', html).group(1)
+
+
+def presentes(con, curso_id=1):
+    # (alumno_id, fecha) marcados presentes en la semana
+    con.rollback()
+    grilla = cargar_asistencia(con.cursor(), curso_id, LUNES, date(2024, 3, 8))
+    return {(a, f) for a, fila in grilla.items() for f, p in fila.items() if p}
+
+
+def test_formulario_guarda_la_grilla_entera(con, cliente):
+    cliente.post(URL, data={"asistencia_1_2024-03-04": "on", "asistencia_2_2024-03-05": "on"})
+    respuesta = cliente.post(URL, data={"version": version_de(cliente), "asistencia_1_2024-03-04": "on"})
+    # Las casillas que no vienen quedan ausentes
+    assert respuesta.status_code == 302
+    assert respuesta.headers["Location"].endswith("cambios=1")
+    assert presentes(con) == {(1, LUNES)}
+
+
+def test_formulario_con_version_vieja_muestra_el_aviso(con, cliente):
+    version = version_de(cliente)
+    cliente.post(URL, data={"version": version, "asistencia_2_2024-03-04": "on"})
+    respuesta = cliente.post(URL, data={"version": version, "asistencia_1_2024-03-04": "on"})
+    assert respuesta.status_code == 409
+    assert "aviso-conflicto" in respuesta.get_data(as_text=True)
+    assert presentes(con) == {(2, LUNES)}
+
+
+def test_sincronizar_con_version_vieja_devuelve_el_conflicto(con, cliente):
+    version = version_de(cliente)
+    cliente.post(URL, data={"version": version, "asistencia_2_2024-03-04": "on"})
+
+    # Posterior al guardado del formulario, que escribió todas las celdas de la semana
+    marca = {"alumno_id": 1, "curso_id": 1, "fecha": "2024-03-04", "presente": True,
+             "marca": datetime.now(timezone.utc).isoformat()}
+    respuesta = cliente.post("/asistencia/sincronizar", json={
+        "marcas": [marca, {"alumno_id": 3, "fecha": "2024-03-04", "presente": True, "marca": "2024-03-04T10:00:00Z"}],
+        "versiones": {"1|2024-03-04": version},
+    })
+    assert respuesta.status_code == 200
+    assert respuesta.json["en_conflicto"] == [0]
+    assert respuesta.json["rechazadas"] == [1]
+    actual = respuesta.json["conflictos"]["1|2024-03-04"]
+    assert actual["version"] == version_de(cliente)
+    assert actual["celdas"]["2_2024-03-04"] == 1
+
+    # Con la versión actual se aplica y vuelve la siguiente
+    respuesta = cliente.post("/asistencia/sincronizar", json={
+        "marcas": [marca], "versiones": {"1|2024-03-04": actual["version"]}})
+    assert respuesta.json["cambios"] == 1
+    assert respuesta.json["versiones"] == {"1|2024-03-04": version_de(cliente)}
+    assert presentes(con) == {(1, LUNES), (2, LUNES)}
+
+
+def con_sesion(cliente, usuario_id, rol):
+    from comun import auth
+
+    with cliente.session_transaction() as sesion:
+        sesion["usuario_id"] = usuario_id
+        sesion["rol"] = rol
+        auth.marcar_sesion_validada(sesion)
+
+
+def como_admin(con, cliente):
+    cur = con.cursor()
+    cur.execute("""
+        INSERT INTO usuarios (usuario, nombre, apellido, rol, clave, perfil)
+        VALUES ('admin', 'Admin', '', 'admin', 'clave', '') RETURNING id
+    """)
+    admin_id = cur.fetchone()[0]
+    con.commit()
+    con_sesion(cliente, admin_id, "admin")
+
+
+def versiones(con):
+    con.rollback()
+    cur = con.cursor()
+    cur.execute("SELECT curso_id, version FROM versiones_curso")
+    return dict(cur.fetchall())
+
+
+def test_alta_de_alumno_cambia_la_version_de_la_grilla(con, cliente, escuela):
+    version = version_de(cliente)
+    como_admin(con, cliente)
+    cliente.post("/agregar_alumno", data={"nombre": "Flor", "apellido": "Vera", "curso": "1"})
+    assert versiones(con) == {1: 1}
+
+    # El docente guarda sobre la grilla que abrió antes del alta
+    con_sesion(cliente, escuela["docente"], "docente")
+    respuesta = cliente.post("/asistencia/sincronizar", json={
+        "marcas": [{"alumno_id": 1, "curso_id": 1, "fecha": "2024-03-04", "presente": True,
+                    "marca": "2024-03-04T10:00:00Z"}],
+        "versiones": {"1|2024-03-04": version},
+    })
+    assert respuesta.json["en_conflicto"] == [0]
+    assert "4_2024-03-04" in respuesta.json["conflictos"]["1|2024-03-04"]["celdas"]
+    assert presentes(con) == set()
+
+
+def test_bajas_de_docente_y_de_curso_suben_la_version(con, cliente):
+    cliente.post(URL, data={"asistencia_1_2024-03-04": "on"})
+    como_admin(con, cliente)
+    antes = versiones(con)
+
+    cliente.post("/eliminar_docente/1")
+    # Su asistencia se borró con él: cambia la libreta del curso 1, no la del 2
+    assert versiones(con) == {1: antes[1] + 1}
+    assert presentes(con) == set()
+
+    cliente.post("/eliminar_curso/1")
+    assert versiones(con) == {}
+    cur = con.cursor()
+    cur.execute("SELECT id FROM cursos")
+    assert cur.fetchall() == [(2,)]
+
+
+def test_baja_de_docente_actualiza_el_resumen_semanal(con, cliente, escuela):
+    cliente.post(URL, data={"asistencia_1_2024-03-04": "on"})   # alumno 1 presente, 2 ausente
+    # Otro docente del mismo curso carga el martes del alumno 1
+    cur = con.cursor()
+    cur.execute("INSERT INTO docente_cursos (docente_id, curso_id) VALUES (%s, 1)", (escuela["otro"],))
+    con.commit()
+    con_sesion(cliente, escuela["otro"], "docente")
+    cliente.post("/asistencia/sincronizar", json={"marcas": [
+        {"alumno_id": 1, "fecha": "2024-03-05", "presente": True, "marca": "2024-03-05T10:00:00Z"}]})
+
+    con.rollback()
+    antes = estadisticas_cursos(con.cursor(), LUNES, date(2024, 3, 8))[1]
+    assert (antes["registros"], antes["porcentaje_asistencia"], antes["ausentes"]) == (11, 18.2, 2)
+
+    como_admin(con, cliente)
+    cliente.post(f"/eliminar_docente/{escuela['docente']}")
+    con.rollback()
+    despues = estadisticas_cursos(con.cursor(), LUNES, date(2024, 3, 8))[1]
+    # Queda solo la celda del otro docente; la semana del alumno 2 se quedó sin registros
+    assert (despues["registros"], despues["porcentaje_asistencia"], despues["ausentes"]) == (1, 100.0, 0)
+    cur = con.cursor()
+    cur.execute("SELECT alumno_id, presentes, registrados FROM asistencia_semanal")
+    assert cur.fetchall() == [(1, 1, 1)]
@@ -0,0 +1,28 @@
+from consultas import incrementar_version_cursos
+
+
+def test_cache_de_cursos_sigue_la_version_de_la_base(con, cliente):
+    respuesta = cliente.get("/exportar_asistencia/1?formato=csv&inicio=2024-03-04")
+    assert "Asistencia_1A_" in respuesta.headers["Content-Disposition"]
+    respuesta.close()
+
+    # Otro worker renombra el curso: este no se entera por invalidar(), sí por la versión
+    cur = con.cursor()
+    cur.execute("UPDATE cursos SET nombre = '1C' WHERE id = 1")
+    incrementar_version_cursos(cur)
+    con.commit()
+    respuesta = cliente.get("/exportar_asistencia/1?formato=csv&inicio=2024-03-04")
+    assert "Asistencia_1C_" in respuesta.headers["Content-Disposition"]
+    respuesta.close()
+
+
+def test_permiso_de_la_libreta_no_sale_del_cache(con, cliente):
+    assert cliente.get("/libreta/1").status_code == 200
+    assert cliente.get("/reportes/ausentismo?curso=1").status_code == 200
+
+    # Se le quita el curso desde otro worker: su cache de asignaciones no cuenta para el permiso
+    cur = con.cursor()
+    cur.execute("DELETE FROM docente_cursos WHERE docente_id = 1")
+    con.commit()
+    assert cliente.get("/libreta/1").status_code == 404
+    assert cliente.get("/reportes/ausentismo?curso=1").status_code == 404
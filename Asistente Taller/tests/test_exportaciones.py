@@ -0,0 +1,17 @@
+from werkzeug.http import parse_options_header
+
+
+def test_csv_con_coma_y_acento_en_el_nombre_del_curso(con, cliente):
+    cur = con.cursor()
+    cur.execute("UPDATE cursos SET nombre = '1°A, tarde' WHERE id = 1")
+    con.commit()
+
+    respuesta = cliente.get("/exportar_asistencia/1?formato=csv&desde=2024-03-01&hasta=2024-03-31")
+    assert respuesta.status_code == 200
+    disposicion, opciones = parse_options_header(respuesta.headers["Content-Disposition"])
+    assert disposicion == "attachment"
+    assert opciones["filename"] == "Asistencia_1°A, tarde_01-03-2024_31-03-2024.csv"
+    # Se puede mandar por WSGI (latin-1) y trae una versión ASCII para quien no entiende filename*
+    assert respuesta.headers["Content-Disposition"].isascii()
+    assert 'filename="Asistencia_1A, tarde_01-03-2024_31-03-2024.csv"' in respuesta.headers["Content-Disposition"]
+    respuesta.close()
@@ -0,0 +1,85 @@
+from datetime import date
+
+import numpy as np
+
+import libreta
+
+NAN = np.nan
+
+
+def test_promedios_ponderado_y_condicion():
+    alumnos = [(1, "Gómez", "Carla"), (2, "López", "Diego"), (3, "Sosa", "Eva")]
+    notas = np.array([[8, 4], [NAN, NAN], [7, NAN]])
+    pesos = np.array([[1, 3], [0, 0], [2, 0]])
+    resultado = libreta.calcular(alumnos, ["P1", "P2"], notas, pesos)
+
+    carla, diego, eva = resultado["alumnos"]
+    # (8*1 + 4*3) / 4 = 5: el promedio simple aprueba, el ponderado no
+    assert (carla["promedio"], carla["ponderado"], carla["mediana"], carla["aprobado"]) == (6.0, 5.0, 6.0, False)
+    assert carla["notas"] == [8.0, 4.0]
+    assert (diego["cantidad"], diego["promedio"], diego["ponderado"], diego["aprobado"]) == (0, None, None, None)
+    assert diego["notas"] == [None, None]
+    assert (eva["ponderado"], eva["aprobado"]) == (7.0, True)
+
+    assert resultado["evaluaciones"] == [
+        {"nombre": "P1", "cantidad": 2, "promedio": 7.5, "aprobados": 2},
+        {"nombre": "P2", "cantidad": 1, "promedio": 4.0, "aprobados": 0},
+    ]
+    assert (resultado["aprobados"], resultado["desaprobados"], resultado["sin_notas"]) == (1, 1, 1)
+    # Promedio de los ponderados de quienes tienen notas
+    assert resultado["promedio_curso"] == 6.0
+
+
+def test_pesos_en_cero_usan_el_promedio_simple():
+    resultado = libreta.calcular([(1, "Gómez", "Carla")], ["P1", "P2"], np.array([[9, 3]]), np.zeros((1, 2)))
+    [carla] = resultado["alumnos"]
+    assert (carla["promedio"], carla["ponderado"], carla["aprobado"]) == (6.0, 6.0, True)
+
+
+def test_libreta_vacia():
+    resultado = libreta.vacia()
+    assert resultado["evaluaciones"] == [] and resultado["alumnos"] == []
+    assert (resultado["aprobados"], resultado["sin_notas"], resultado["promedio_curso"]) == (0, 0, None)
+
+
+def notas(con, *filas):
+    cur = con.cursor()
+    for alumno_id, evaluacion, fecha, nota, peso in filas:
+        cur.execute("""
+            INSERT INTO notas (alumno_id, docente_id, curso_id, nota, fecha, evaluacion, peso)
+            VALUES (%s, 1, 1, %s, %s, %s, %s)
+        """, (alumno_id, nota, fecha, evaluacion, peso))
+    con.commit()
+
+
+def test_cargar_pivotea_por_evaluacion(con, escuela):
+    notas(con,
+          (1, "TP", date(2024, 3, 10), 4, 1),
+          (1, "TP", date(2024, 3, 12), 9, 1),       # repetida: vale la última
+          (1, None, date(2024, 3, 5), 7, 2))        # sin nombre: la fecha
+    cur = con.cursor()
+    libretas = libreta.cargar(cur, curso_id=1)
+
+    assert list(libretas) == [1]
+    resultado = libretas[1]
+    assert [e["nombre"] for e in resultado["evaluaciones"]] == ["05/03/2024", "TP"]
+    carla, diego = resultado["alumnos"]
+    assert (carla["id"], carla["notas"], carla["cantidad"]) == (1, [7.0, 9.0], 2)
+    assert carla["ponderado"] == 7.67   # (7*2 + 9*1) / 3
+    assert (diego["id"], diego["cantidad"], diego["aprobado"]) == (2, 0, None)
+
+    # Con un período solo cuentan sus notas
+    resultado = libreta.cargar(cur, 1, date(2024, 3, 1), date(2024, 3, 6))[1]
+    assert [e["nombre"] for e in resultado["evaluaciones"]] == ["05/03/2024"]
+
+
+def test_curso_sin_alumnos_no_tiene_libreta(con, escuela):
+    cur = con.cursor()
+    cur.execute("INSERT INTO cursos (nombre, año) VALUES ('3C', 3) RETURNING id")
+    curso_id = cur.fetchone()[0]
+    con.commit()
+    assert libreta.cargar(cur, curso_id=curso_id) == {}
+    # El curso 2 tiene un alumno pero ninguna nota
+    resultado = libreta.cargar(cur, curso_id=2)[2]
+    assert resultado["evaluaciones"] == []
+    assert (resultado["sin_notas"], resultado["promedio_curso"]) == (1, None)
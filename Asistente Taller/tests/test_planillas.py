@@ -0,0 +1,134 @@
+import io
+from datetime import date
+
+import pytest
+from openpyxl import Workbook
+from werkzeug.datastructures import FileStorage
+
+from consultas import importar_alumnos, importar_notas
+from planillas import PlanillaInvalida, convertir_nota, convertir_peso, filas_de_alumnos, filas_de_notas, leer_planilla
+
+HOY = date(2024, 3, 15)
+ALUMNOS = [(1, "Carla", "Gómez"), (2, "Diego", "López")]   # (id, nombre, apellido), como en la app
+CURSOS = [(1, "1A", 1), (2, "1A", 2), (3, "2B", 2)]
+
+
+def archivo(contenido, nombre="planilla.csv"):
+    return FileStorage(io.BytesIO(contenido), filename=nombre)
+
+
+def test_csv_con_punto_y_coma_bom_y_filas_vacias():
+    contenido = "﻿Apellido ;Nombre;Nota\nGómez;Carla;7,5\n;;\nLópez;Diego;8\n".encode()
+    assert list(leer_planilla(archivo(contenido))) == [
+        (2, {"apellido": "Gómez", "nombre": "Carla", "nota": "7,5"}),
+        (4, {"apellido": "López", "nombre": "Diego", "nota": "8"}),
+    ]
+
+
+def test_csv_en_latin1():
+    contenido = "apellido,nombre,año\nNúñez,Iñaki,2\n".encode("latin-1")
+    assert list(leer_planilla(archivo(contenido))) == [(2, {"apellido": "Núñez", "nombre": "Iñaki", "ano": "2"})]
+
+
+def test_xlsx():
+    libro = Workbook()
+    hoja = libro.active
+    hoja.append(["alumno_id", "Nota", "Fecha"])
+    hoja.append([1, 9.5, None])
+    hoja.append([None, None, None])
+    hoja.append([2, 4, "2024-03-05"])
+    destino = io.BytesIO()
+    libro.save(destino)
+    assert list(leer_planilla(archivo(destino.getvalue(), "notas.XLSX"))) == [
+        (2, {"alumno_id": "1", "nota": "9.5", "fecha": ""}),
+        (4, {"alumno_id": "2", "nota": "4", "fecha": "2024-03-05"}),
+    ]
+
+
+def test_planillas_invalidas():
+    with pytest.raises(PlanillaInvalida, match="vacía"):
+        list(leer_planilla(archivo(b"")))
+    with pytest.raises(PlanillaInvalida, match="XLSX válido"):
+        list(leer_planilla(archivo(b"no es un zip", "notas.xlsx")))
+
+
+def test_convertir_nota_y_peso():
+    assert convertir_nota("0") == (0.0, None)
+    assert convertir_nota("10") == (10.0, None)
+    assert convertir_nota("6,25") == (6.25, None)
+    assert convertir_nota("10,5") == (None, "La nota 10.5 está fuera del rango 0-10")
+    assert convertir_nota("siete") == (None, "'siete' no es un número")
+    assert convertir_peso("") == (1.0, None)
+    assert convertir_peso("0,5") == (0.5, None)
+    assert convertir_peso("0") == (None, "El peso debe ser mayor que 0")
+
+
+def test_filas_de_notas_con_errores_por_fila():
+    planilla = [
+        (2, {"alumno_id": "1", "nota": "7,5", "peso": ""}),
+        (3, {"apellido": "GOMEZ", "nombre": " carla", "nota": "8", "evaluacion": "TP", "fecha": "2024-03-05",
+             "peso": "2"}),
+        (4, {"alumno_id": "9", "nota": "5"}),
+        (5, {"alumno_id": "2", "nota": "11"}),
+        (6, {"alumno_id": "2", "nota": "6", "peso": "0"}),
+        (7, {"alumno_id": "2", "nota": "6", "fecha": "05/03/2024"}),
+        (8, {"apellido": "Gómez", "nombre": "Carla", "nota": "8", "evaluacion": "TP", "fecha": "2024-03-05",
+             "peso": "2"}),
+        (9, {"alumno_id": "2", "nota": ""}),
+        (10, {"apellido": "Paz", "nombre": "Ana", "nota": "6"}),
+        (11, {"alumno_id": "dos", "nota": "6"}),
+    ]
+    validas, errores = filas_de_notas(planilla, ALUMNOS, HOY)
+    tp = (1, 8.0, date(2024, 3, 5), "TP", 2.0)
+    # Las filas repetidas pasan la validación: importar_notas las descarta al insertar
+    assert validas == [(1, 7.5, HOY, None, 1.0), tp, tp]
+    assert errores == [
+        (4, "El alumno 9 no pertenece al curso"),
+        (5, "La nota 11 está fuera del rango 0-10"),
+        (6, "El peso debe ser mayor que 0"),
+        (7, "Fecha inválida '05/03/2024' (usar AAAA-MM-DD)"),
+        (9, "Falta la nota"),
+        (10, "No se encontró al alumno 'Paz, Ana' en el curso"),
+        (11, "alumno_id 'dos' no es un número"),
+    ]
+
+
+def test_filas_de_alumnos_por_id_nombre_y_año():
+    planilla = [
+        (2, {"apellido": "Paz", "nombre": "Luz", "curso": "3"}),
+        (3, {"apellido": "Paz", "nombre": "Luz", "curso": "2b"}),
+        (4, {"apellido": "Ruiz", "nombre": "Beto", "curso": "1A - Año 2"}),
+        (5, {"apellido": "Ruiz", "nombre": "Beto", "curso": "1A"}),
+        (6, {"apellido": "Ruiz", "nombre": "", "curso": "3"}),
+        (7, {"apellido": "Ruiz", "nombre": "Beto", "curso": "9Z"}),
+    ]
+    validas, errores = filas_de_alumnos(planilla, CURSOS)
+    assert validas == [("Paz", "Luz", 3), ("Paz", "Luz", 3), ("Ruiz", "Beto", 2)]
+    assert errores == [
+        (5, "Hay varios cursos '1A': indicar 'Nombre - Año N'"),
+        (6, "Faltan el apellido o el nombre"),
+        (7, "No existe el curso '9Z'"),
+    ]
+
+
+def test_importar_alumnos_omite_repetidos(con, escuela):
+    cur = con.cursor()
+    filas = [("gómez", "CARLA", 1), ("Paz", "Luz", 1), ("PAZ", "luz", 1), ("Paz", "Luz", 2)]
+    # Carla Gómez ya está en el curso 1; Luz Paz va una vez a cada curso
+    assert importar_alumnos(cur, filas) == 2
+    con.commit()
+    assert importar_alumnos(cur, filas) == 0
+    cur.execute("SELECT apellido, nombre, curso_id FROM alumnos WHERE id > 3 ORDER BY curso_id")
+    assert cur.fetchall() == [("Paz", "Luz", 1), ("Paz", "Luz", 2)]
+
+
+def test_importar_notas_omite_repetidas_y_alumnos_de_otro_curso(con, escuela):
+    cur = con.cursor()
+    filas = [(1, 7.0, HOY, "TP", 1.0), (1, 7.0, HOY, "TP", 1.0), (2, 5.0, HOY, None, 1.0), (3, 9.0, HOY, None, 1.0)]
+    assert importar_notas(cur, 1, 1, filas) == 2
+    con.commit()
+    # Subir la misma planilla otra vez no duplica nada
+    assert importar_notas(cur, 1, 1, filas) == 0
+    con.commit()
+    cur.execute("SELECT alumno_id, nota, evaluacion FROM notas ORDER BY alumno_id")
+    assert cur.fetchall() == [(1, 7.0, "TP"), (2, 5.0, None)]
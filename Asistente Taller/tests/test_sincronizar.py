@@ -0,0 +1,115 @@
+from datetime import date, datetime, timedelta, timezone
+
+from consultas import cargar_asistencia, grilla_semana, sincronizar_asistencia, version_grilla
+
+LUNES = date(2024, 3, 4)
+HORA = datetime(2024, 3, 4, 9, 0, tzinfo=timezone.utc)
+
+
+def celda(con, curso_id, alumno_id, fecha=LUNES):
+    return cargar_asistencia(con.cursor(), curso_id, fecha, fecha).get(alumno_id, {}).get(fecha)
+
+
+def test_gana_la_marca_mas_reciente(con, escuela):
+    cur = con.cursor()
+    a = escuela["alumnos"][0]
+    celdas = sincronizar_asistencia(cur, escuela["docente"], [(a, None, LUNES, True, HORA)])["celdas"]
+    assert celdas == [(a, escuela["curso"], LUNES, 1, True)]
+
+    # Una marca anterior a la guardada pierde y devuelve el valor que quedó
+    celdas = sincronizar_asistencia(cur, escuela["docente"], [(a, None, LUNES, False, HORA - timedelta(minutes=5))])["celdas"]
+    assert celdas == [(a, escuela["curso"], LUNES, 1, False)]
+    assert celda(con, escuela["curso"], a) == 1
+
+    # Una posterior gana
+    celdas = sincronizar_asistencia(cur, escuela["docente"], [(a, None, LUNES, False, HORA + timedelta(minutes=5))])["celdas"]
+    assert celdas == [(a, escuela["curso"], LUNES, 0, True)]
+    assert celda(con, escuela["curso"], a) == 0
+
+
+def test_celda_repetida_vale_la_marca_mas_reciente(con, escuela):
+    a = escuela["alumnos"][0]
+    marcas = [(a, None, LUNES, True, HORA + timedelta(minutes=1)), (a, None, LUNES, False, HORA)]
+    sincronizar_asistencia(con.cursor(), escuela["docente"], marcas)
+    assert celda(con, escuela["curso"], a) == 1
+
+
+def test_marca_futura_cuenta_como_ahora(con, escuela):
+    cur = con.cursor()
+    a = escuela["alumnos"][0]
+    futuro = datetime.now(timezone.utc) + timedelta(days=365)
+    sincronizar_asistencia(cur, escuela["docente"], [(a, None, LUNES, True, futuro)])
+    con.commit()
+    # Un reloj adelantado no bloquea las correcciones hechas después
+    celdas = sincronizar_asistencia(cur, escuela["docente"], [(a, None, LUNES, False, datetime.now(timezone.utc))])["celdas"]
+    assert celdas == [(a, escuela["curso"], LUNES, 0, True)]
+
+
+def test_sin_cambios_no_devuelve_celdas(con, escuela):
+    cur = con.cursor()
+    a = escuela["alumnos"][0]
+    sincronizar_asistencia(cur, escuela["docente"], [(a, None, LUNES, True, HORA)])
+    resultado = sincronizar_asistencia(cur, escuela["docente"], [(a, None, LUNES, True, HORA + timedelta(1))])
+    assert (resultado["celdas"], resultado["rechazadas"]) == ([], [])
+
+
+def test_rechaza_alumnos_de_cursos_ajenos(con, escuela):
+    a, ajeno = escuela["alumnos"][0], escuela["alumno_ajeno"]
+    marcas = [
+        (ajeno, None, LUNES, True, HORA),                       # alumno de un curso no asignado
+        (ajeno, escuela["curso"], LUNES, True, HORA),           # curso propio, alumno de otro curso
+        (a, escuela["curso_ajeno"], LUNES, True, HORA),         # alumno propio, curso ajeno
+        (999, None, LUNES, True, HORA),                         # alumno inexistente
+        (a, escuela["curso"], LUNES, True, HORA),
+    ]
+    resultado = sincronizar_asistencia(con.cursor(), escuela["docente"], marcas)
+    assert resultado["rechazadas"] == [0, 1, 2, 3]
+    assert resultado["celdas"] == [(a, escuela["curso"], LUNES, 1, True)]
+    assert celda(con, escuela["curso_ajeno"], ajeno) is None
+
+
+def test_version_al_dia_aplica_y_devuelve_la_nueva(con, escuela):
+    cur = con.cursor()
+    a, b = escuela["alumnos"]
+    grilla = (escuela["curso"], LUNES)
+    antes = version_grilla(grilla_semana(cur, escuela["curso"], escuela["docente"], LUNES))
+    resultado = sincronizar_asistencia(cur, escuela["docente"], [(a, escuela["curso"], LUNES, True, HORA)],
+                                       {grilla: antes})
+    assert resultado["celdas"] == [(a, escuela["curso"], LUNES, 1, True)]
+    assert (resultado["en_conflicto"], resultado["conflictos"]) == ([], {})
+    despues = version_grilla(grilla_semana(cur, escuela["curso"], escuela["docente"], LUNES))
+    assert resultado["versiones"] == {grilla: despues} and despues != antes
+
+    # Con la versión nueva se sigue guardando sobre la misma grilla
+    resultado = sincronizar_asistencia(cur, escuela["docente"], [(b, escuela["curso"], LUNES, True, HORA)],
+                                       {grilla: despues})
+    assert resultado["celdas"] == [(b, escuela["curso"], LUNES, 1, True)]
+
+
+def test_version_vieja_no_aplica_y_devuelve_la_grilla_actual(con, escuela):
+    cur = con.cursor()
+    a, b = escuela["alumnos"]
+    grilla = (escuela["curso"], LUNES)
+    vieja = version_grilla(grilla_semana(cur, escuela["curso"], escuela["docente"], LUNES))
+    # Otra pestaña guarda la misma semana
+    sincronizar_asistencia(cur, escuela["docente"], [(b, escuela["curso"], LUNES, True, HORA)])
+
+    martes = LUNES + timedelta(days=1)
+    marcas = [(a, escuela["curso"], LUNES, True, HORA + timedelta(minutes=1)),
+              (a, escuela["curso"], martes, True, HORA + timedelta(minutes=1)),
+              (a, escuela["curso"], LUNES + timedelta(days=7), True, HORA)]   # otra semana, sin versión
+    resultado = sincronizar_asistencia(cur, escuela["docente"], marcas, {grilla: vieja})
+    assert resultado["en_conflicto"] == [0, 1]
+    assert resultado["conflictos"][grilla][b][LUNES] == 1
+    assert resultado["conflictos"][grilla][a] == {LUNES + timedelta(days=i): 0 for i in range(5)}
+    assert resultado["versiones"] == {}
+    assert resultado["celdas"] == [(a, escuela["curso"], LUNES + timedelta(days=7), 1, True)]
+    assert celda(con, escuela["curso"], a) is None
+
+
+def test_version_de_un_curso_ajeno_no_expone_su_grilla(con, escuela):
+    cur = con.cursor()
+    marcas = [(escuela["alumno_ajeno"], escuela["curso_ajeno"], LUNES, True, HORA)]
+    resultado = sincronizar_asistencia(cur, escuela["docente"], marcas, {(escuela["curso_ajeno"], LUNES): "x"})
+    assert resultado["rechazadas"] == [0]
+    assert resultado["conflictos"] == {}
@@ -0,0 +1,124 @@
+import os
+import time
+from concurrent.futures import Future
+
+import pytest
+
+import trabajos
+from consultas import incrementar_version
+
+PARAMETROS = {"formato": "docx"}
+
+
+class EnLinea:
+    """Pool de un solo "proceso" que corre cada tarea en el momento, dentro de la prueba."""
+
+    def __init__(self, correr=True):
+        self.correr = correr
+        self.tareas = []
+
+    def submit(self, funcion, *args):
+        self.tareas.append(args)
+        futuro = Future()
+        futuro.set_result(funcion(*args) if self.correr else None)
+        return futuro
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(trabajos, "DIRECTORIO_CACHE", str(tmp_path))
+    pool = EnLinea()
+    monkeypatch.setattr(trabajos, "_pool", lambda reiniciar=False: pool)
+    return pool
+
+
+def encolar(con, usuario_id=1):
+    return trabajos.encolar(con, os.environ["TEST_DATABASE_URL"], "alumnos", 1, ("1A", 1), PARAMETROS, usuario_id)
+
+
+def test_exportacion_y_cache(con, escuela, pool, tmp_path):
+    trabajo_id = encolar(con)
+    trabajo = trabajos.estado(con, trabajo_id)
+    assert (trabajo["estado"], trabajo["progreso"], trabajo["error"]) == ("listo", 100, None)
+    assert trabajo["nombre_archivo"] == "Alumnos_Curso_1A.docx"
+    assert os.listdir(tmp_path) == [os.path.basename(trabajo["archivo"])]
+    assert os.path.getsize(trabajo["archivo"]) > 0
+
+    # Sin cambios en el curso, el archivo sale del cache: el trabajo nace listo y no se genera nada
+    otro_id = encolar(con, usuario_id=2)
+    otro = trabajos.estado(con, otro_id)
+    assert otro_id != trabajo_id
+    assert (otro["estado"], otro["progreso"], otro["archivo"], otro["creado_por"]) == (
+        "listo", 100, trabajo["archivo"], 2)
+    assert len(pool.tareas) == 1
+
+    # Con otra versión de datos la clave cambia y se vuelve a generar
+    incrementar_version(con.cursor(), 1)
+    con.commit()
+    nuevo = trabajos.estado(con, encolar(con))
+    assert nuevo["estado"] == "listo" and nuevo["archivo"] != trabajo["archivo"]
+    assert len(pool.tareas) == 2 and len(os.listdir(tmp_path)) == 2
+
+
+def test_trabajo_que_falla_queda_en_error(con, escuela, pool, tmp_path, monkeypatch):
+    generar = trabajos.generar
+    fallas = [ValueError("No se pudo armar el documento")]
+
+    def falla_una_vez(cur, tipo, curso_id, curso, destino, *args, **kwargs):
+        if fallas:
+            destino.write(b"a medias")
+            raise fallas.pop()
+        return generar(cur, tipo, curso_id, curso, destino, *args, **kwargs)
+
+    monkeypatch.setattr(trabajos, "generar", falla_una_vez)
+    trabajo = trabajos.estado(con, encolar(con))
+    assert (trabajo["estado"], trabajo["error"], trabajo["archivo"]) == ("error", "No se pudo armar el documento", None)
+    # Ni el temporal ni un archivo a medio escribir quedan en el cache
+    assert os.listdir(tmp_path) == []
+
+    # Un trabajo con error no bloquea volver a pedirlo
+    assert trabajos.estado(con, encolar(con))["estado"] == "listo"
+
+
+def test_trabajo_en_curso_se_reutiliza_y_vence(con, escuela, pool):
+    pool.correr = False
+    trabajo_id = encolar(con)
+    assert encolar(con, usuario_id=2) == trabajo_id
+    assert len(pool.tareas) == 1
+    assert trabajos.estado(con, trabajo_id)["estado"] == "pendiente"
+
+    # Si no avanza en SEGUNDOS_SIN_AVANCE se da por perdido y el próximo pedido lo genera de nuevo
+    cur = con.cursor()
+    cur.execute("UPDATE trabajos_exportacion SET actualizado_en = now() - interval '1 day' WHERE id = %s",
+                (trabajo_id,))
+    con.commit()
+    trabajo = trabajos.estado(con, trabajo_id)
+    assert (trabajo["estado"], trabajo["error"]) == ("error", "La exportación no avanzó y se canceló")
+    assert encolar(con) != trabajo_id
+    assert trabajos.estado(con, 999) is None
+
+
+def test_limpiar_borra_archivos_y_trabajos_vencidos(con, escuela, pool, tmp_path):
+    viejo, reciente = tmp_path / "viejo.docx", tmp_path / "reciente.docx"
+    viejo.write_bytes(b"x")
+    reciente.write_bytes(b"x")
+    hace = time.time() - (trabajos.DIAS_CACHE + 1) * 86400
+    os.utime(viejo, (hace, hace))
+
+    pool.correr = False
+    vencido = encolar(con)
+    cur = con.cursor()
+    cur.execute("UPDATE trabajos_exportacion SET estado = 'listo', creado_en = now() - interval '30 days' "
+                "WHERE id = %s", (vencido,))
+    con.commit()
+    vigente = encolar(con)
+
+    trabajos.limpiar(con)
+    assert os.listdir(tmp_path) == ["reciente.docx"]
+    assert trabajos.estado(con, vencido) is None
+    assert trabajos.estado(con, vigente) is not None
+
+
+def test_limpiar_sin_directorio_de_cache(con, tmp_path, monkeypatch):
+    monkeypatch.setattr(trabajos, "DIRECTORIO_CACHE", str(tmp_path / "no_existe"))
+    trabajos.limpiar(con)
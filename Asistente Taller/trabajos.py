@@ -0,0 +1,243 @@
+"""Exportaciones en segundo plano.
+
+Los documentos se generan en un pool de procesos aparte, así un par de
+exportaciones grandes no dejan a los workers web sin hilos libres. Cada
+trabajo queda en la tabla trabajos_exportacion con su estado y progreso; el
+archivo terminado se guarda en un cache en disco cuya clave incluye la versión
+de datos del curso, de modo que volver a pedir la misma exportación sin
+cambios en los datos no genera nada.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+
+import psycopg2
+
+from consultas import version_curso
+from exportaciones import generar, nombre_descarga
+
+DIRECTORIO_CACHE = os.environ.get("EXPORT_CACHE_DIR") or os.path.join(
+    tempfile.gettempdir(), "asistente_exportaciones")
+PROCESOS = int(os.environ.get("EXPORT_PROCESOS", 2))
+# Archivos del cache y trabajos terminados más viejos que esto se borran
+DIAS_CACHE = float(os.environ.get("EXPORT_CACHE_DIAS", 7))
+# Un trabajo que no avanza en este tiempo se da por perdido (p. ej. murió el proceso)
+SEGUNDOS_SIN_AVANCE = int(os.environ.get("EXPORT_TIMEOUT", 600))
+
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+
+
+def _pool(reiniciar=False):
+    global _executor, _executor_pid
+    with _lock:
+        if reiniciar or _executor is None or _executor_pid != os.getpid():
+            # spawn: los procesos hijos no heredan las conexiones ni los locks del worker web
+            _executor = ProcessPoolExecutor(max_workers=PROCESOS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def clave_cache(tipo, curso_id, parametros, version):
+    return ":".join([tipo, str(curso_id), parametros.get("desde", ""), parametros.get("hasta", ""),
+                     parametros.get("formato", "docx"), f"v{version}"])
+
+
+def ruta_cache(clave, formato):
+    return os.path.join(DIRECTORIO_CACHE, hashlib.sha1(clave.encode()).hexdigest() + "." + formato)
+
+
+def _desempaquetar(parametros):
+    desde = date.fromisoformat(parametros["desde"]) if parametros.get("desde") else None
+    hasta = date.fromisoformat(parametros["hasta"]) if parametros.get("hasta") else None
+    return desde, hasta, parametros.get("formato", "docx")
+
+
+# ================== Web ==================
+
+def encolar(con, dsn, tipo, curso_id, curso, parametros, usuario_id):
+    """Crea el trabajo de exportación y devuelve su id.
+
+    Si el archivo ya está en el cache el trabajo nace terminado, y si hay otro
+    trabajo en curso para los mismos datos se devuelve ese en lugar de
+    generar el documento dos veces.
+    """
+    cur = con.cursor()
+    clave = clave_cache(tipo, curso_id, parametros, version_curso(cur, curso_id))
+    ruta = ruta_cache(clave, parametros["formato"])
+    desde, hasta, formato = _desempaquetar(parametros)
+    nombre = nombre_descarga(tipo, curso, desde, hasta, formato)
+
+    if os.path.exists(ruta):
+        # Marca de uso para la limpieza por antigüedad
+        os.utime(ruta)
+        cur.execute("""
+            INSERT INTO trabajos_exportacion
+                (tipo, curso_id, parametros, clave_cache, estado, progreso, archivo, nombre_archivo,
+                 creado_por, terminado_en)
+            VALUES (%s, %s, %s, %s, 'listo', 100, %s, %s, %s, now())
+            RETURNING id
+        """, (tipo, curso_id, json.dumps(parametros), clave, ruta, nombre, usuario_id))
+        trabajo_id = cur.fetchone()[0]
+        con.commit()
+        return trabajo_id
+
+    cur.execute("""
+        SELECT id FROM trabajos_exportacion
+        WHERE clave_cache=%s AND estado IN ('pendiente', 'en_proceso')
+          AND actualizado_en > now() - %s * interval '1 second'
+        ORDER BY id DESC LIMIT 1
+    """, (clave, SEGUNDOS_SIN_AVANCE))
+    fila = cur.fetchone()
+    if fila:
+        con.commit()
+        return fila[0]
+
+    cur.execute("""
+        INSERT INTO trabajos_exportacion (tipo, curso_id, parametros, clave_cache, nombre_archivo, creado_por)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        RETURNING id
+    """, (tipo, curso_id, json.dumps(parametros), clave, nombre, usuario_id))
+    trabajo_id = cur.fetchone()[0]
+    con.commit()
+
+    try:
+        _pool().submit(ejecutar, dsn, trabajo_id)
+    except BrokenProcessPool:
+        # Un hijo murió (p. ej. por memoria): se arma un pool nuevo
+        _pool(reiniciar=True).submit(ejecutar, dsn, trabajo_id)
+    return trabajo_id
+
+
+def estado(con, trabajo_id):
+    """Devuelve el trabajo como dict, o None si no existe."""
+    cur = con.cursor()
+    cur.execute("""
+        UPDATE trabajos_exportacion
+        SET estado='error', error='La exportación no avanzó y se canceló', actualizado_en=now()
+        WHERE id=%s AND estado IN ('pendiente', 'en_proceso')
+          AND actualizado_en < now() - %s * interval '1 second'
+    """, (trabajo_id, SEGUNDOS_SIN_AVANCE))
+    cur.execute("""
+        SELECT id, tipo, curso_id, estado, progreso, error, archivo, nombre_archivo, creado_por
+        FROM trabajos_exportacion WHERE id=%s
+    """, (trabajo_id,))
+    fila = cur.fetchone()
+    con.commit()
+    if fila is None:
+        return None
+    columnas = ("id", "tipo", "curso_id", "estado", "progreso", "error", "archivo", "nombre_archivo",
+                "creado_por")
+    return dict(zip(columnas, fila))
+
+
+def en_paralelo(funcion, argumentos):
+    """Aplica funcion(*args) a cada tupla de argumentos en el pool de procesos.
+
+    Genera los resultados en el orden de entrada. Se mantienen como mucho dos
+    tareas por proceso en vuelo, así la memoria no crece con la cantidad de
+    tareas y el que consume los resultados marca el ritmo.
+    """
+    pool = _pool()
+    en_vuelo = deque()
+    for args in argumentos:
+        en_vuelo.append(pool.submit(funcion, *args))
+        if len(en_vuelo) >= 2 * PROCESOS:
+            yield en_vuelo.popleft().result()
+    while en_vuelo:
+        yield en_vuelo.popleft().result()
+
+
+# ================== Proceso de exportación ==================
+
+def ejecutar(dsn, trabajo_id):
+    """Genera el archivo de un trabajo. Corre en un proceso del pool, con su propia conexión."""
+    con = psycopg2.connect(dsn)
+    try:
+        cur = con.cursor()
+        cur.execute("""
+            UPDATE trabajos_exportacion SET estado='en_proceso', progreso=5, actualizado_en=now()
+            WHERE id=%s AND estado='pendiente'
+            RETURNING tipo, curso_id, parametros, clave_cache
+        """, (trabajo_id,))
+        fila = cur.fetchone()
+        con.commit()
+        if fila is None:
+            return
+        tipo, curso_id, parametros, clave = fila
+        desde, hasta, formato = _desempaquetar(json.loads(parametros))
+
+        cur.execute("SELECT nombre, año FROM cursos WHERE id=%s", (curso_id,))
+        curso = cur.fetchone()
+        ultimo = [5]
+
+        def avanzar(fraccion):
+            # Se escribe cada 5 puntos para no hacer un commit por tabla del documento
+            progreso = 5 + int(fraccion * 90)
+            if progreso - ultimo[0] >= 5:
+                ultimo[0] = progreso
+                con.cursor().execute(
+                    "UPDATE trabajos_exportacion SET progreso=%s, actualizado_en=now() WHERE id=%s",
+                    (progreso, trabajo_id)
+                )
+                con.commit()
+
+        ruta = ruta_cache(clave, formato)
+        os.makedirs(DIRECTORIO_CACHE, exist_ok=True)
+        # Se escribe aparte y se renombra: nunca se sirve un archivo a medio escribir
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        try:
+            with open(temporal, "wb") as destino:
+                generar(cur, tipo, curso_id, curso, destino, desde, hasta, formato, al_avanzar=avanzar)
+            os.replace(temporal, ruta)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+        cur.execute("""
+            UPDATE trabajos_exportacion
+            SET estado='listo', progreso=100, archivo=%s, terminado_en=now(), actualizado_en=now()
+            WHERE id=%s
+        """, (ruta, trabajo_id))
+        con.commit()
+    except Exception as e:
+        con.rollback()
+        con.cursor().execute(
+            "UPDATE trabajos_exportacion SET estado='error', error=%s, actualizado_en=now() WHERE id=%s",
+            (str(e)[:500], trabajo_id)
+        )
+        con.commit()
+    finally:
+        limpiar(con)
+        con.close()
+
+
+def limpiar(con):
+    """Borra del disco los archivos sin uso hace más de DIAS_CACHE días y los trabajos viejos."""
+    limite = time.time() - DIAS_CACHE * 86400
+    try:
+        nombres = os.listdir(DIRECTORIO_CACHE)
+    except FileNotFoundError:
+        nombres = []
+    for nombre in nombres:
+        ruta = os.path.join(DIRECTORIO_CACHE, nombre)
+        try:
+            if os.path.getmtime(ruta) < limite:
+                os.remove(ruta)
+        except FileNotFoundError:
+            pass
+    con.cursor().execute(
+        "DELETE FROM trabajos_exportacion WHERE creado_en < now() - %s * interval '1 day'",
+        (DIAS_CACHE,)
+    )
+    con.commit()
@@ -1,12 +1,24 @@
+import hmac
 import os
-from flask import Flask, render_template, request, redirect, session, Response
-from supabase import create_client, Client
-from werkzeug.security import generate_password_hash, check_password_hash
-import psycopg2
-import urllib.parse as urlparse
+from datetime import date
+from flask import Flask, render_template, request, redirect, session, Response, jsonify
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+import arranque
+from comun import auth
+from sesiones import crear_almacen
+
+from datos import ClienteDatos, valor_filtro
+from comun.instrumentacion import Instrumentacion
+from exportaciones import lineas_csv, comprimir_gzip, filas_postgres
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", "clave_secreta")
+# Detrás del proxy de Render la IP real del cliente llega en X-Forwarded-For
+app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(os.environ.get("PROXY_SALTOS", 1)))
+
+# Tiempos por ruta, llamadas a Supabase y log de peticiones lentas (/metrics)
+instrumentacion = Instrumentacion(app)
 
 # 🔗 Configuración de la conexión a Supabase
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
@@ -15,112 +27,126 @@ SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 if not SUPABASE_URL or not SUPABASE_KEY:
     raise ValueError("Faltan las variables de entorno SUPABASE_URL y SUPABASE_KEY")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-# 🔧 Crear tablas y usuario si no existen
-def inicializar_db():
-    conn = None
-    try:
-        # Extraer las partes de la URL de Supabase para conectar con psycopg2
-        url = urlparse.urlparse(SUPABASE_URL)
-        dbname = os.path.basename(url.path)
-        user = url.username
-        password = url.password
-        host = url.hostname
-        port = url.port
-        conn = psycopg2.connect(dbname=dbname, user=user, password=password, host=host, port=port)
-        cur = conn.cursor()
-
-        # Tabla de usuarios
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS usuarios (
-                id SERIAL PRIMARY KEY,
-                usuario TEXT UNIQUE NOT NULL,
-                clave TEXT NOT NULL,
-                email TEXT,
-                rol TEXT CHECK(rol IN ('docente', 'admin')) DEFAULT 'docente'
-            )
-        """)
-
-        # Tabla de docentes
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS docentes (
-                id SERIAL PRIMARY KEY,
-                usuario_id INTEGER NOT NULL,
-                nombre TEXT NOT NULL,
-                apellido TEXT NOT NULL,
-                area TEXT,
-                FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
-            )
-        """)
-
-        # Tabla de asistencia
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS asistencia (
-                id SERIAL PRIMARY KEY,
-                nombre TEXT NOT NULL,
-                presente TEXT NOT NULL,
-                usuario_id INTEGER
-            )
-        """)
-
-        # Tabla de notas
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS notas (
-                id SERIAL PRIMARY KEY,
-                alumno TEXT NOT NULL,
-                nota TEXT NOT NULL,
-                usuario_id INTEGER
-            )
-        """)
-        conn.commit()
-
-        # Verificar si ya existe el usuario 'admin'
-        cur.execute("SELECT COUNT(*) FROM usuarios WHERE usuario = 'admin'")
-        if cur.fetchone()[0] == 0:
-            # Crear usuario 'admin' con la contraseña hasheada
-            clave_hasheada = generate_password_hash("1234")
-            cur.execute("""
-                INSERT INTO usuarios (usuario, clave, email, rol)
-                VALUES (%s, %s, %s, %s)
-            """, ("admin", clave_hasheada, "admin@escuela.edu", "admin"))
-            conn.commit()
-
-    except Exception as e:
-        print(f"Error al inicializar la base de datos: {e}")
-    finally:
-        if conn:
-            conn.close()
-
-# Inicializar la base de datos al inicio
-inicializar_db()
+# Un solo cliente HTTP por proceso: el pool de conexiones acompaña a los hilos del worker
+datos = ClienteDatos(
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    conexiones=int(os.environ.get("HTTP_POOL_CONEXIONES", os.environ.get("GUNICORN_THREADS", 8))),
+    timeout=float(os.environ.get("SUPABASE_TIMEOUT", 10)),
+    reintentos=int(os.environ.get("SUPABASE_REINTENTOS", 2)),
+    observador=instrumentacion.registrar_consulta
+)
+
 
 def conectar():
-    # Conecta a la base de datos de Supabase usando la biblioteca supabase-py
-    return supabase
+    # Capa de acceso a datos compartida (PostgREST de Supabase)
+    return datos
+
+# Perfil de cada usuario (nombre, apellido, área, rol) guardado del lado del servidor
+almacen_perfiles = crear_almacen()
+
+def perfil_usuario(usuario_id):
+    perfil = almacen_perfiles.obtener(usuario_id)
+    if perfil is None:
+        db = conectar()
+        response = db.ejecutar(
+            db.from_("usuarios").select("rol, docentes(nombre, apellido, area)").eq("id", usuario_id)
+        )
+        if not response.data:
+            return None
+        fila = response.data[0]
+        docente = fila["docentes"][0] if fila.get("docentes") else None
+        perfil = {
+            "rol": fila["rol"],
+            "docente": docente is not None,
+            "nombre": docente["nombre"] if docente else "",
+            "apellido": docente["apellido"] if docente else "",
+            "area": docente["area"] if docente else "",
+        }
+        almacen_perfiles.guardar(usuario_id, perfil)
+    return perfil
+
+# Parámetros comunes de los listados paginados: ?cursor=&por_pagina=&nombre=&desde=&hasta=
+POR_PAGINA = 50
+POR_PAGINA_MAX = 200
+
+def parametros_listado():
+    filtros = {}
+    nombre = request.args.get("nombre", "").strip()
+    if nombre:
+        filtros["nombre"] = nombre
+    for campo in ("desde", "hasta"):
+        valor = request.args.get(campo, "")
+        try:
+            filtros[campo] = date.fromisoformat(valor).isoformat()
+        except ValueError:
+            pass
+    por_pagina = request.args.get("por_pagina", POR_PAGINA, type=int)
+    por_pagina = max(1, min(por_pagina, POR_PAGINA_MAX))
+    return request.args.get("cursor", type=int), por_pagina, filtros
+
+def listado_usuario(db, tabla, columna_nombre):
+    # Registros del usuario actual, filtrados y paginados
+    cursor, por_pagina, filtros = parametros_listado()
+    consulta = db.from_(tabla).select("*").eq("usuario_id", session["usuario_id"])
+    if "nombre" in filtros:
+        consulta = consulta.ilike(columna_nombre, f"%{filtros['nombre']}%")
+    if "desde" in filtros:
+        consulta = consulta.gte("fecha", filtros["desde"])
+    if "hasta" in filtros:
+        consulta = consulta.lte("fecha", filtros["hasta"])
+    filas, siguiente = db.paginar(consulta, cursor, por_pagina)
+    return filas, siguiente, dict(filtros, por_pagina=por_pagina)
+
+# El esquema se verifica (y, si hace falta, se migra) con la primera petición
+# del proceso, no al importar: ver arranque.py
+@app.before_request
+def esquema_listo():
+    arranque.asegurar(datos)
 
 @app.before_request
 def verificar_login():
-    rutas_libres = ["/login", "/logout"]
+    # Los archivos estáticos no necesitan sesión
+    if request.endpoint == "static":
+        return
+    rutas_libres = ["/login", "/logout", "/metrics"]
     if not session.get("usuario_id") and request.path not in rutas_libres:
         return redirect("/login")
+    if session.get("usuario_id") and auth.sesion_vencida(session):
+        # Revalidación periódica: entre medio las rutas confían en la sesión firmada
+        db = conectar()
+        response = db.ejecutar(db.from_("usuarios").select("rol").eq("id", session["usuario_id"]))
+        if not response.data:
+            session.clear()
+            return redirect("/login")
+        session["rol"] = response.data[0]["rol"]
+        auth.marcar_sesion_validada(session)
 
 @app.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
         usuario = request.form["usuario"]
         clave = request.form["clave"]
-        db = conectar()
 
-        # Usar la biblioteca de Supabase para buscar el usuario
-        response = db.from_("usuarios").select("id, clave, rol").eq("usuario", usuario).execute()
+        # El límite se controla antes de consultar la base o calcular el hash
+        if not auth.intento_permitido(usuario, request.remote_addr or "-"):
+            return render_template("login.html", error="Demasiados intentos. Esperá unos minutos."), 429
+
+        db = conectar()
+        response = db.ejecutar(db.from_("usuarios").select("id, clave, rol").eq("usuario", usuario))
         
         if response.data:
             user_data = response.data[0]
-            if check_password_hash(user_data["clave"], clave):
+            valida, nuevo_hash = auth.verificar_clave(user_data["clave"], clave)
+            if valida:
+                if nuevo_hash:
+                    # Clave en texto plano o con un hash más débil que el configurado
+                    db.ejecutar(db.from_("usuarios").update({"clave": nuevo_hash}).eq("id", user_data["id"]))
+                auth.login_exitoso(usuario)
                 session["usuario_id"] = user_data["id"]
                 session["usuario"] = usuario
                 session["rol"] = user_data["rol"]
+                auth.marcar_sesion_validada(session)
                 return redirect("/")
             else:
                 return render_template("login.html", error="Credenciales incorrectas")
@@ -136,17 +162,8 @@ def logout():
 
 @app.route("/")
 def index():
-    db = conectar()
-    response = db.from_("docentes").select("nombre, apellido").eq("usuario_id", session["usuario_id"]).execute()
-    
-    if response.data:
-        datos = response.data[0]
-        nombre = datos["nombre"]
-        apellido = datos["apellido"]
-    else:
-        nombre, apellido = "", ""
-
-    return render_template("index.html", nombre=nombre, apellido=apellido)
+    perfil = perfil_usuario(session["usuario_id"]) or {}
+    return render_template("index.html", nombre=perfil.get("nombre", ""), apellido=perfil.get("apellido", ""))
 
 @app.route("/asistencia", methods=["GET", "POST"])
 def asistencia():
@@ -159,11 +176,10 @@ def asistencia():
             "presente": presente,
             "usuario_id": session["usuario_id"]
         }
-        db.from_("asistencia").insert(data).execute()
+        db.ejecutar(db.from_("asistencia").insert(data))
 
-    response = db.from_("asistencia").select("*").eq("usuario_id", session["usuario_id"]).execute()
-    datos = response.data
-    return render_template("asistencia.html", datos=datos)
+    datos, siguiente, filtros = listado_usuario(db, "asistencia", "nombre")
+    return render_template("asistencia.html", datos=datos, siguiente=siguiente, filtros=filtros)
 
 @app.route("/notas", methods=["GET", "POST"])
 def notas():
@@ -176,46 +192,53 @@ def notas():
             "nota": nota,
             "usuario_id": session["usuario_id"]
         }
-        db.from_("notas").insert(data).execute()
+        db.ejecutar(db.from_("notas").insert(data))
+
+    datos, siguiente, filtros = listado_usuario(db, "notas", "alumno")
+    return render_template("notas.html", datos=datos, siguiente=siguiente, filtros=filtros)
 
-    response = db.from_("notas").select("*").eq("usuario_id", session["usuario_id"]).execute()
-    datos = response.data
-    return render_template("notas.html", datos=datos)
+# Exportaciones CSV en streaming: las filas se leen por páginas (o con un
+# cursor del servidor si hay DATABASE_URL) y se envían a medida que llegan,
+# comprimidas con gzip si el navegador lo acepta.
+def respuesta_csv(nombre_archivo, encabezados, filas):
+    cuerpo = lineas_csv(encabezados, filas)
+    headers = {"Content-Disposition": f"attachment;filename={nombre_archivo}", "Vary": "Accept-Encoding"}
+    if request.accept_encodings["gzip"]:
+        cuerpo = comprimir_gzip(cuerpo)
+        headers["Content-Encoding"] = "gzip"
+    return Response(cuerpo, mimetype="text/csv", headers=headers)
+
+def filas_exportacion(tabla, columnas):
+    # Columnas fijas (no vienen del usuario): se pueden armar en el SQL
+    usuario_id = session["usuario_id"]
+    database_url = os.environ.get("DATABASE_URL")
+    if database_url:
+        return filas_postgres(
+            database_url,
+            f"SELECT {', '.join(columnas)} FROM {tabla} WHERE usuario_id=%s ORDER BY id",
+            (usuario_id,)
+        )
+    db = conectar()
+    filas = db.recorrer(lambda: db.from_(tabla).select(",".join(columnas)).eq("usuario_id", usuario_id))
+    return ([fila[c] for c in columnas] for fila in filas)
 
 @app.route("/exportar_asistencia")
 def exportar_asistencia():
-    db = conectar()
-    response = db.from_("asistencia").select("*").eq("usuario_id", session["usuario_id"]).execute()
-    datos = response.data
-    
-    def generar():
-        yield "id,nombre,presente\n"
-        for fila in datos:
-            yield f"{fila['id']},{fila['nombre']},{fila['presente']}\n"
-    return Response(generar(), mimetype="text/csv", headers={"Content-Disposition": "attachment;filename=asistencia.csv"})
+    columnas = ["id", "nombre", "presente", "fecha"]
+    return respuesta_csv("asistencia.csv", columnas, filas_exportacion("asistencia", columnas))
 
 @app.route("/exportar_notas")
 def exportar_notas():
-    db = conectar()
-    response = db.from_("notas").select("*").eq("usuario_id", session["usuario_id"]).execute()
-    datos = response.data
-    
-    def generar():
-        yield "id,alumno,nota\n"
-        for fila in datos:
-            yield f"{fila['id']},{fila['alumno']},{fila['nota']}\n"
-    return Response(generar(), mimetype="text/csv", headers={"Content-Disposition": "attachment;filename=notas.csv"})
-    
+    columnas = ["id", "alumno", "nota", "fecha"]
+    return respuesta_csv("notas.csv", columnas, filas_exportacion("notas", columnas))
+
 @app.route('/perfil')
 def perfil():
     if 'usuario_id' not in session:
         return redirect("/login")
     
-    db = conectar()
-    response = db.from_("docentes").select("nombre, apellido, area").eq("usuario_id", session["usuario_id"]).execute()
-    
-    if response.data:
-        datos = response.data[0]
+    datos = perfil_usuario(session["usuario_id"])
+    if datos and datos["docente"]:
         return render_template('perfil.html', nombre=datos['nombre'], apellido=datos['apellido'], area=datos['area'])
     else:
         return "Docente no encontrado", 404
@@ -233,26 +256,26 @@ def registrar():
         db = conectar()
         try:
             # Hash de la contraseña antes de insertar
-            clave_hasheada = generate_password_hash(clave)
+            clave_hasheada = auth.hashear(clave)
             
             # Insertar en la tabla usuarios
-            response = db.from_("usuarios").insert({
+            response = db.ejecutar(db.from_("usuarios").insert({
                 "usuario": usuario, 
                 "clave": clave_hasheada, 
                 "email": email, 
                 "rol": "docente"
-            }).execute()
+            }))
             
             # Obtener el ID del usuario insertado
             usuario_id = response.data[0]["id"]
             
             # Insertar en la tabla docentes
-            db.from_("docentes").insert({
+            db.ejecutar(db.from_("docentes").insert({
                 "usuario_id": usuario_id,
                 "nombre": nombre,
                 "apellido": apellido,
                 "area": area
-            }).execute()
+            }))
             
             mensaje = "Docente registrado correctamente."
         except Exception as e:
@@ -268,10 +291,31 @@ def admin_panel():
         return "Acceso restringido", 403
 
     db = conectar()
-    response = db.from_("docentes").select("id, nombre, apellido, area, usuarios(usuario, email)").join("usuarios").execute()
-    docentes = response.data
+    cursor, por_pagina, filtros = parametros_listado()
+    consulta = db.from_("docentes").select("id, nombre, apellido, area, usuarios(usuario, email)")
+    if "nombre" in filtros:
+        patron = valor_filtro(f"*{filtros['nombre']}*")
+        consulta = consulta.or_(f"nombre.ilike.{patron},apellido.ilike.{patron}")
+    docentes, siguiente = db.paginar(consulta, cursor, por_pagina)
     
-    return render_template("admin_panel.html", docentes=docentes)
+    return render_template("admin_panel.html", docentes=docentes, siguiente=siguiente,
+                           filtros={"nombre": filtros.get("nombre", ""), "por_pagina": por_pagina})
+
+# Formato de texto de Prometheus. Con METRICAS_TOKEN se exige ?token= o "Authorization: Bearer".
+@app.route("/metrics")
+def metricas():
+    token = os.environ.get("METRICAS_TOKEN")
+    if token:
+        recibido = request.args.get("token") or request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(recibido.encode(), token.encode()):
+            return "No autorizado", 401
+    return Response(instrumentacion.texto_metricas(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/admin/metricas_datos")
+def metricas_datos():
+    if session.get("rol") != "admin":
+        return "Acceso restringido", 403
+    return jsonify(conectar().metricas())
 
 @app.route("/editar/<int:id>", methods=["GET", "POST"])
 def editar_docente(id):
@@ -289,22 +333,28 @@ def editar_docente(id):
         area = request.form["area"]
         
         # Obtener el usuario_id del docente
-        response = db.from_("docentes").select("usuario_id").eq("id", id).execute()
+        response = db.ejecutar(db.from_("docentes").select("usuario_id").eq("id", id))
         usuario_id = response.data[0]["usuario_id"]
         
         # Actualizar la tabla de usuarios (clave hasheada si se cambia)
         updates_usuarios = {"usuario": usuario, "email": email}
         if clave: # Solo actualizar la clave si se proporciona una nueva
-            updates_usuarios["clave"] = generate_password_hash(clave)
-        db.from_("usuarios").update(updates_usuarios).eq("id", usuario_id).execute()
+            updates_usuarios["clave"] = auth.hashear(clave)
+        db.ejecutar(db.from_("usuarios").update(updates_usuarios).eq("id", usuario_id))
         
         # Actualizar la tabla de docentes
         updates_docentes = {"nombre": nombre, "apellido": apellido, "area": area}
-        db.from_("docentes").update(updates_docentes).eq("id", id).execute()
+        db.ejecutar(db.from_("docentes").update(updates_docentes).eq("id", id))
+
+        # Único lugar donde cambia el perfil: se actualiza el almacén en vez de esperar al TTL
+        perfil = almacen_perfiles.obtener(usuario_id)
+        if perfil is not None:
+            perfil.update(updates_docentes)
+            almacen_perfiles.guardar(usuario_id, perfil)
         
         return redirect("/admin")
         
-    response = db.from_("docentes").select("id, nombre, apellido, area, usuarios(id, usuario, clave, email)").join("usuarios").eq("id", id).execute()
+    response = db.ejecutar(db.from_("docentes").select("id, nombre, apellido, area, usuarios(id, usuario, clave, email)").eq("id", id))
     datos = response.data[0]
     
     return render_template("editar_docente.html", datos=datos)
@@ -317,14 +367,27 @@ def eliminar_docente(id):
     db = conectar()
     
     # Obtener el usuario_id del docente
-    response = db.from_("docentes").select("usuario_id").eq("id", id).execute()
+    response = db.ejecutar(db.from_("docentes").select("usuario_id").eq("id", id))
     usuario_id = response.data[0]["usuario_id"]
     
     # Eliminar el registro en la tabla de usuarios
     # La eliminación en la tabla 'docentes' se hará en cascada
-    db.from_("usuarios").delete().eq("id", usuario_id).execute()
+    db.ejecutar(db.from_("usuarios").delete().eq("id", usuario_id))
+    almacen_perfiles.borrar(usuario_id)
 
     return redirect("/admin")
     
+@app.cli.command("provisionar")
+def provisionar_comando():
+    """Aplica las migraciones pendientes y crea el usuario admin (usa DATABASE_URL)."""
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        raise SystemExit("Falta DATABASE_URL: el DDL necesita la conexión de Postgres, no la URL de Supabase.")
+    aplicadas = arranque.provisionar(database_url)
+    for version in aplicadas:
+        print(f"Migración {version} aplicada")
+    print("Esquema al día" if not aplicadas else f"{len(aplicadas)} migraciones aplicadas")
+
+# Servidor de desarrollo; en producción: gunicorn Asistente:app
 if __name__ == "__main__":
-    app.run(debug=True)
+    app.run(debug=os.environ.get("FLASK_DEBUG") == "1")
@@ -0,0 +1,96 @@
+"""Inicialización del esquema de Supabase: una sola vez y nunca al importar la app.
+
+El DDL necesita la cadena de conexión de Postgres (DATABASE_URL); SUPABASE_URL
+es la URL HTTPS de PostgREST y solo sirve para consultar. Importar Asistente.py
+no toca la base: la primera petición de cada proceso llama a asegurar(), que
+consulta la versión del esquema por HTTP y no hace nada más si está al día.
+Con gunicorn lo hace el master en on_starting y los workers heredan el
+resultado, así que arrancan sin ninguna consulta.
+
+Para aprovisionar a mano (p. ej. antes de un despliegue):
+    python arranque.py          o   flask --app Asistente provisionar
+"""
+import os
+import threading
+import time
+
+import psycopg2
+
+from comun import auth
+from migraciones import VERSION_ACTUAL, aplicar_migraciones
+
+# Si el esquema quedó desactualizado (p. ej. sin DATABASE_URL), cada cuánto se vuelve a mirar
+REINTENTO_SEGUNDOS = 60
+
+_listo = False
+_proximo_intento = 0.0
+_lock = threading.Lock()
+
+
+def esquema_al_dia(datos):
+    # Consulta mínima por HTTP: si el esquema ya está en la última versión
+    # no hace falta abrir una conexión DDL
+    try:
+        respuesta = datos.ejecutar(
+            datos.from_("schema_version").select("version").order("version", desc=True).limit(1)
+        )
+        return bool(respuesta.data) and respuesta.data[0]["version"] >= VERSION_ACTUAL
+    except Exception:
+        return False
+
+
+def provisionar(database_url):
+    """Aplica las migraciones pendientes y crea el usuario admin si falta; devuelve las versiones aplicadas."""
+    conn = psycopg2.connect(database_url, connect_timeout=5)
+    try:
+        aplicadas = aplicar_migraciones(conn)
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM usuarios WHERE usuario = 'admin'")
+        if cur.fetchone()[0] == 0:
+            cur.execute("""
+                INSERT INTO usuarios (usuario, clave, email, rol)
+                VALUES (%s, %s, %s, %s)
+            """, ("admin", auth.hashear("1234"), "admin@escuela.edu", "admin"))
+            print("Usuario admin creado: usuario=admin, clave=1234")
+        conn.commit()
+        return aplicadas
+    finally:
+        conn.close()
+
+
+def asegurar(datos):
+    """Deja el esquema al día la primera vez que se llama en el proceso; devuelve si lo está.
+
+    Las siguientes llamadas no consultan nada. Si el esquema está desactualizado
+    y no se puede migrar, se avisa y se vuelve a intentar recién pasados
+    REINTENTO_SEGUNDOS, para no sumar una consulta a cada petición.
+    """
+    global _listo, _proximo_intento
+    if _listo or time.monotonic() < _proximo_intento:
+        return _listo
+    with _lock:
+        if _listo or time.monotonic() < _proximo_intento:
+            return _listo
+        if esquema_al_dia(datos):
+            _listo = True
+            return True
+
+        database_url = os.environ.get("DATABASE_URL")
+        if not database_url:
+            print("El esquema no está actualizado y DATABASE_URL no está configurada: no se aplican migraciones.")
+        else:
+            try:
+                for version in provisionar(database_url):
+                    print(f"Migración {version} aplicada")
+                _listo = True
+            except Exception as e:
+                print(f"Error al inicializar la base de datos: {e}")
+        if not _listo:
+            _proximo_intento = time.monotonic() + REINTENTO_SEGUNDOS
+        return _listo
+
+
+if __name__ == "__main__":
+    for v in provisionar(os.environ["DATABASE_URL"]):
+        print(f"Migración {v} aplicada")
+    print(f"Esquema en la versión {VERSION_ACTUAL}")
@@ -0,0 +1,568 @@
+"""Prueba de carga: docentes simulados usando una de las apps al mismo tiempo.
+
+    python benchmark/carga.py taller --url http://127.0.0.1:8000 --docentes 30 --duracion 60 --salida antes.json
+    python benchmark/carga.py asistente --url http://127.0.0.1:8000 --salida antes.json
+    python benchmark/carga.py --comparar antes.json despues.json
+
+La base se prepara con sembrar.py (y, para Asistente.py, postgrest_local.py en
+lugar de Supabase). Cada docente simulado inicia sesión como docente1,
+docente2... y repite acciones elegidas al azar según su peso: ver y guardar la
+grilla de asistencia, cargar notas y exportar; los admins simulados recorren el
+panel y las exportaciones generales. Al terminar se informa p50/p95/p99 por
+ruta, las consultas a la base por petición (cabecera X-Consultas-DB; en las
+respuestas en streaming solo cuenta lo consultado antes de empezar a enviar) y
+la memoria (RSS) de los procesos de la app, leída de /proc durante la prueba.
+
+--comparar muestra la diferencia entre dos corridas y termina con código 1 si
+alguna ruta empeoró más que --tolerancia, para usarlo antes de un despliegue.
+"""
+import argparse
+import http.cookiejar
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+from sembrar import APELLIDOS, CLAVE_ADMIN, CLAVE_DOCENTES, NOMBRES
+
+# Una ruta empeoró si su p95 creció más que esto, con al menos este margen absoluto
+MARGEN_MS = 5
+
+
+class Sesion:
+    """Un usuario simulado: cookies propias, sin seguir redirecciones."""
+
+    def __init__(self, url, resultados, timeout):
+        self.url = url.rstrip("/")
+        self.resultados = resultados
+        self.timeout = timeout
+        self.abridor = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _SinRedirecciones())
+
+    def pedir(self, nombre, ruta, datos=None, registrar=True, datos_json=None):
+        """Hace la petición, lee la respuesta entera y devuelve (estado, cuerpo)."""
+        cuerpo = urllib.parse.urlencode(datos, doseq=True).encode() if datos is not None else None
+        encabezados = {}
+        if datos_json is not None:
+            cuerpo, encabezados = json.dumps(datos_json).encode(), {"Content-Type": "application/json"}
+        peticion = urllib.request.Request(self.url + ruta, data=cuerpo, headers=encabezados)
+        inicio = time.perf_counter()
+        try:
+            try:
+                respuesta = self.abridor.open(peticion, timeout=self.timeout)
+            except urllib.error.HTTPError as e:
+                # 3xx y 4xx/5xx llegan como excepción: igual tienen estado y cuerpo
+                respuesta = e
+            with respuesta:
+                contenido = respuesta.read()
+                estado = respuesta.status
+                consultas = respuesta.headers.get("X-Consultas-DB")
+            error = None if estado < 400 else f"HTTP {estado}"
+        except Exception as e:
+            contenido, estado, consultas, error = b"", 0, None, f"{type(e).__name__}: {e}"
+        segundos = time.perf_counter() - inicio
+        if registrar:
+            self.resultados.append((nombre, segundos, estado, consultas, len(contenido), error))
+        return estado, contenido
+
+
+class _SinRedirecciones(urllib.request.HTTPRedirectHandler):
+    # Se mide cada petición por separado: el 302 tras un POST no arrastra el GET siguiente
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def _lunes(azar, semanas=12):
+    hoy = date.today()
+    return hoy - timedelta(days=hoy.weekday(), weeks=azar.randrange(semanas))
+
+
+# ================== Asistente Taller ==================
+
+def _grilla(sesion, curso_id, lunes):
+    estado, html = sesion.pedir("GET /asistencia/<id>", f"/asistencia/{curso_id}?inicio={lunes.isoformat()}")
+    html = html.decode()
+    celdas = re.findall(r'<input type="checkbox" name="(asistencia_\d+_[\d-]+)"([^>]*)>', html)
+    version = re.search(r'name="version" value="(\w*)"', html)
+    return {nombre: "checked" in atributos for nombre, atributos in celdas}, version and version.group(1)
+
+
+def taller_ver_asistencia(sesion, docente, azar):
+    _grilla(sesion, azar.choice(docente["cursos"]), _lunes(azar))
+
+
+def taller_guardar_asistencia(sesion, docente, azar):
+    # Se abre la grilla, se cambian algunas celdas y se guarda como el formulario sin
+    # JavaScript: la grilla entera (solo las casillas marcadas) con la versión de la semana
+    curso_id, lunes = azar.choice(docente["cursos"]), _lunes(azar, 2)
+    celdas, version = _grilla(sesion, curso_id, lunes)
+    datos = {"version": version or ""}
+    for nombre, marcada in celdas.items():
+        if marcada != (azar.random() < 0.05):
+            datos[nombre] = "on"
+    sesion.pedir("POST /asistencia/<id>", f"/asistencia/{curso_id}?inicio={lunes.isoformat()}", datos)
+
+
+def taller_sincronizar_asistencia(sesion, docente, azar):
+    # Lo que manda static/js/asistencia.js: solo las celdas tocadas, en un lote JSON
+    # con la versión de la grilla en la que se hicieron
+    curso_id, lunes = azar.choice(docente["cursos"]), _lunes(azar, 2)
+    marca = datetime.now(timezone.utc).isoformat()
+    celdas, version = _grilla(sesion, curso_id, lunes)
+    marcas = []
+    for nombre, marcada in celdas.items():
+        if azar.random() < 0.05:
+            _, alumno_id, fecha = nombre.split("_")
+            marcas.append({"alumno_id": int(alumno_id), "curso_id": curso_id, "semana": lunes.isoformat(),
+                           "fecha": fecha, "presente": not marcada, "marca": marca})
+    sesion.pedir("POST /asistencia/sincronizar", "/asistencia/sincronizar",
+                 datos_json={"marcas": marcas, "versiones": {f"{curso_id}|{lunes.isoformat()}": version} if version else {}})
+
+
+def taller_ver_notas(sesion, docente, azar):
+    sesion.pedir("GET /notas/<id>", f"/notas/{azar.choice(docente['cursos'])}")
+
+
+def taller_cargar_notas(sesion, docente, azar):
+    curso_id = azar.choice(docente["cursos"])
+    _, html = sesion.pedir("GET /notas/<id>", f"/notas/{curso_id}")
+    campos = re.findall(r'name="(nota_\d+)"', html.decode())
+    datos = {campo: f"{azar.randint(2, 20) / 2:g}" for campo in campos}
+    datos.update(evaluacion=f"Prueba de carga {azar.randrange(1000)}", peso="1")
+    sesion.pedir("POST /notas/<id>", f"/notas/{curso_id}", datos)
+
+
+def taller_exportar_notas(sesion, docente, azar):
+    sesion.pedir("GET /exportar_notas/<id>", f"/exportar_notas/{azar.choice(docente['cursos'])}")
+
+
+def taller_exportar_alumnos(sesion, docente, azar):
+    sesion.pedir("GET /exportar_alumnos/<id>", f"/exportar_alumnos/{azar.choice(docente['cursos'])}")
+
+
+def taller_exportar_semana(sesion, docente, azar):
+    sesion.pedir("GET /exportar_asistencia/<id> semana docx",
+                 f"/exportar_asistencia/{azar.choice(docente['cursos'])}?inicio={_lunes(azar).isoformat()}")
+
+
+def taller_exportar_trimestre(sesion, docente, azar):
+    formato = azar.choice(("csv", "xlsx"))
+    hasta = date.today()
+    desde = hasta - timedelta(days=90)
+    sesion.pedir(f"GET /exportar_asistencia/<id> trimestre {formato}",
+                 f"/exportar_asistencia/{azar.choice(docente['cursos'])}"
+                 f"?desde={desde.isoformat()}&hasta={hasta.isoformat()}&formato={formato}")
+
+
+def taller_admin(sesion, docente, azar):
+    sesion.pedir("GET /admin", "/admin")
+
+
+def taller_exportar_todo(sesion, docente, azar):
+    sesion.pedir("GET /exportar_todo", f"/exportar_todo?inicio={_lunes(azar).isoformat()}")
+
+
+def taller_ingresar(sesion, usuario, clave):
+    estado, _ = sesion.pedir("login", "/", {"usuario": usuario, "clave": clave}, registrar=False)
+    if estado != 302:
+        raise RuntimeError(f"{usuario} no pudo iniciar sesión (HTTP {estado})")
+    if usuario == "admin":
+        return {}
+    _, html = sesion.pedir("GET /docente", "/docente", registrar=False)
+    cursos = sorted({int(c) for c in re.findall(r'href="/asistencia/(\d+)"', html.decode())})
+    if not cursos:
+        raise RuntimeError(f"{usuario} no tiene cursos asignados")
+    return {"cursos": cursos}
+
+
+# ================== Asistente (Supabase) ==================
+
+def _alumno(azar):
+    return f"{azar.choice(APELLIDOS)}, {azar.choice(NOMBRES)}"
+
+
+def asistente_ver_asistencia(sesion, docente, azar):
+    if azar.random() < 0.3:
+        sesion.pedir("GET /asistencia?nombre=", "/asistencia?" + urllib.parse.urlencode(
+            {"nombre": azar.choice(APELLIDOS)[:4]}))
+    else:
+        sesion.pedir("GET /asistencia", "/asistencia")
+
+
+def asistente_guardar_asistencia(sesion, docente, azar):
+    datos = {"nombre": _alumno(azar)}
+    if azar.random() < 0.9:
+        datos["presente"] = "sí"
+    sesion.pedir("POST /asistencia", "/asistencia", datos)
+
+
+def asistente_ver_notas(sesion, docente, azar):
+    sesion.pedir("GET /notas", "/notas")
+
+
+def asistente_cargar_notas(sesion, docente, azar):
+    sesion.pedir("POST /notas", "/notas", {"alumno": _alumno(azar), "nota": f"{azar.randint(2, 20) / 2:g}"})
+
+
+def asistente_exportar_asistencia(sesion, docente, azar):
+    sesion.pedir("GET /exportar_asistencia", "/exportar_asistencia")
+
+
+def asistente_exportar_notas(sesion, docente, azar):
+    sesion.pedir("GET /exportar_notas", "/exportar_notas")
+
+
+def asistente_admin(sesion, docente, azar):
+    if azar.random() < 0.3:
+        sesion.pedir("GET /admin?nombre=", "/admin?" + urllib.parse.urlencode({"nombre": azar.choice(NOMBRES)[:3]}))
+    else:
+        sesion.pedir("GET /admin", "/admin")
+
+
+def asistente_ingresar(sesion, usuario, clave):
+    estado, _ = sesion.pedir("login", "/login", {"usuario": usuario, "clave": clave}, registrar=False)
+    if estado != 302:
+        raise RuntimeError(f"{usuario} no pudo iniciar sesión (HTTP {estado})")
+    return {}
+
+
+# (peso, acción): lo que hace cada usuario simulado entre pausa y pausa
+ESCENARIOS = {
+    "taller": {
+        "ingresar": taller_ingresar,
+        "docente": [
+            (30, taller_ver_asistencia),
+            (20, taller_guardar_asistencia),
+            (10, taller_sincronizar_asistencia),
+            (12, taller_ver_notas),
+            (8, taller_cargar_notas),
+            (8, taller_exportar_notas),
+            (4, taller_exportar_alumnos),
+            (6, taller_exportar_semana),
+            (4, taller_exportar_trimestre),
+        ],
+        "admin": [
+            (9, taller_admin),
+            (1, taller_exportar_todo),
+        ],
+    },
+    "asistente": {
+        "ingresar": asistente_ingresar,
+        "docente": [
+            (30, asistente_ver_asistencia),
+            (20, asistente_guardar_asistencia),
+            (15, asistente_ver_notas),
+            (10, asistente_cargar_notas),
+            (8, asistente_exportar_asistencia),
+            (7, asistente_exportar_notas),
+        ],
+        "admin": [
+            (1, asistente_admin),
+        ],
+    },
+}
+
+
+# ================== Memoria ==================
+
+def inodos_escuchando(puerto):
+    """Inodos de los sockets TCP en LISTEN en ese puerto, según /proc/net/tcp y tcp6."""
+    inodos = set()
+    for archivo in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(archivo) as f:
+                next(f)
+                for linea in f:
+                    campos = linea.split()
+                    # local_address es IP:PUERTO en hexadecimal; el estado 0A es LISTEN
+                    if int(campos[1].rsplit(":", 1)[1], 16) == puerto and campos[3] == "0A":
+                        inodos.add(campos[9])
+        except OSError:
+            pass
+    return inodos
+
+
+class MedidorMemoria(threading.Thread):
+    """Muestrea el RSS de los procesos de la app (y sus hijos) mientras dura la prueba.
+
+    Los procesos de la app son los que tienen abierto el socket que escucha en
+    el puerto de la URL (el master de gunicorn y sus workers) o, con patron, los
+    que lo tienen en la línea de comando.
+    """
+
+    def __init__(self, puerto, patron=None, intervalo=0.5):
+        super().__init__(daemon=True)
+        self.puerto = puerto
+        self.patron = re.compile(patron) if patron else None
+        self.intervalo = intervalo
+        self.procesos = {}
+        self.disponible = os.path.isdir("/proc")
+        self._fin = threading.Event()
+
+    def run(self):
+        while self.disponible and not self._fin.is_set():
+            self.muestrear()
+            self._fin.wait(self.intervalo)
+
+    def detener(self):
+        self._fin.set()
+        self.join()
+        if self.disponible:
+            self.muestrear()
+
+    def muestrear(self):
+        propios = {os.getpid(), os.getppid()}
+        vistos = {}
+        for pid in filter(str.isdigit, os.listdir("/proc")):
+            try:
+                with open(f"/proc/{pid}/cmdline", "rb") as f:
+                    comando = f.read().replace(b"\0", b" ").decode(errors="replace").strip()
+                with open(f"/proc/{pid}/stat") as f:
+                    padre = int(f.read().rsplit(")", 1)[1].split()[1])
+                with open(f"/proc/{pid}/status") as f:
+                    rss = next((int(l.split()[1]) for l in f if l.startswith("VmRSS:")), 0) / 1024
+            except (OSError, ValueError, IndexError):
+                continue
+            vistos[int(pid)] = (comando, padre, rss)
+
+        if self.patron:
+            elegidos = {pid for pid, (comando, _, _) in vistos.items()
+                        if pid not in propios and self.patron.search(comando)}
+        else:
+            elegidos = self._escuchando(vistos)
+        # También los descendientes (p. ej. el pool de procesos de las exportaciones)
+        nuevos = elegidos
+        while nuevos:
+            nuevos = {pid for pid, (_, padre, _) in vistos.items() if padre in nuevos} - elegidos
+            elegidos |= nuevos
+        for pid in elegidos:
+            comando, _, rss = vistos[pid]
+            p = self.procesos.setdefault(pid, {"pid": pid, "proceso": comando[:100],
+                                                "rss_inicial_mb": round(rss, 1), "rss_max_mb": 0.0})
+            p["rss_max_mb"] = round(max(p["rss_max_mb"], rss), 1)
+            p["rss_final_mb"] = round(rss, 1)
+
+    def _escuchando(self, vistos):
+        sockets = {f"socket:[{inodo}]" for inodo in inodos_escuchando(self.puerto)}
+        pids = set()
+        for pid in vistos:
+            try:
+                descriptores = os.listdir(f"/proc/{pid}/fd")
+            except OSError:
+                continue
+            for fd in descriptores:
+                try:
+                    if os.readlink(f"/proc/{pid}/fd/{fd}") in sockets:
+                        pids.add(pid)
+                        break
+                except OSError:
+                    pass
+        return pids
+
+    def resumen(self):
+        return sorted(self.procesos.values(), key=lambda p: p["pid"])
+
+
+# ================== Corrida ==================
+
+def percentil(ordenados, p):
+    if not ordenados:
+        return None
+    return ordenados[max(math.ceil(p / 100 * len(ordenados)) - 1, 0)]
+
+
+def usuario_simulado(args, escenario, indice, es_admin, resultados, listos, fin, fallas):
+    azar = random.Random(args.semilla * 1000 + indice)
+    sesion = Sesion(args.url, resultados, args.timeout)
+    usuario, clave = ("admin", args.clave_admin) if es_admin else (f"docente{indice}", args.clave)
+    try:
+        docente = escenario["ingresar"](sesion, usuario, clave)
+    except Exception as e:
+        fallas.append(str(e))
+        docente = None
+    listos.wait()
+    if docente is None:
+        return
+
+    acciones = escenario["admin" if es_admin else "docente"]
+    pesos = [peso for peso, _ in acciones]
+    while time.monotonic() < fin[0]:
+        accion = azar.choices(acciones, weights=pesos)[0][1]
+        accion(sesion, docente, azar)
+        if args.pausa > 0:
+            time.sleep(min(azar.expovariate(1 / args.pausa), max(fin[0] - time.monotonic(), 0)))
+
+
+def correr(args):
+    escenario = ESCENARIOS[args.app]
+    resultados = []
+    fallas = []
+    usuarios = [(i, False) for i in range(1, args.docentes + 1)] + [(0, True)] * args.admins
+    # Todos inician sesión antes de empezar a medir: el login no entra en los tiempos
+    listos = threading.Barrier(len(usuarios) + 1)
+    fin = [0.0]
+    hilos = [threading.Thread(target=usuario_simulado, daemon=True,
+                              args=(args, escenario, i, es_admin, resultados, listos, fin, fallas))
+             for i, es_admin in usuarios]
+    for hilo in hilos:
+        hilo.start()
+
+    memoria = MedidorMemoria(urllib.parse.urlsplit(args.url).port or 80, args.procesos)
+    fin[0] = time.monotonic() + 3600
+    listos.wait()
+    inicio = time.monotonic()
+    fin[0] = inicio + args.duracion
+    memoria.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.monotonic() - inicio
+    memoria.detener()
+
+    for falla in fallas[:5]:
+        print("Usuario sin iniciar sesión:", falla, file=sys.stderr)
+    if not memoria.disponible:
+        print("Sin /proc: no se mide la memoria", file=sys.stderr)
+    return resumir(args, resultados, segundos, memoria.resumen(), len(fallas))
+
+
+def resumir(args, resultados, segundos, memoria, fallas):
+    por_ruta = defaultdict(list)
+    for fila in resultados:
+        por_ruta[fila[0]].append(fila)
+
+    rutas = {}
+    for nombre, filas in sorted(por_ruta.items()):
+        ms = sorted(f[1] * 1000 for f in filas)
+        consultas = [int(f[3]) for f in filas if f[3] is not None]
+        errores = [f for f in filas if f[5]]
+        rutas[nombre] = {
+            "peticiones": len(filas),
+            "errores": len(errores),
+            "ejemplos_error": sorted({f[5] for f in errores})[:3],
+            "p50_ms": round(percentil(ms, 50), 1),
+            "p95_ms": round(percentil(ms, 95), 1),
+            "p99_ms": round(percentil(ms, 99), 1),
+            "max_ms": round(ms[-1], 1),
+            "media_ms": round(sum(ms) / len(ms), 1),
+            "consultas_media": round(sum(consultas) / len(consultas), 2) if consultas else None,
+            "consultas_max": max(consultas) if consultas else None,
+            "kb_media": round(sum(f[4] for f in filas) / len(filas) / 1024, 1),
+        }
+
+    return {
+        "app": args.app,
+        "url": args.url,
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "parametros": {"docentes": args.docentes, "admins": args.admins, "duracion": args.duracion,
+                       "pausa": args.pausa, "semilla": args.semilla},
+        "segundos": round(segundos, 1),
+        "peticiones": len(resultados),
+        "errores": sum(r["errores"] for r in rutas.values()),
+        "usuarios_sin_sesion": fallas,
+        "por_segundo": round(len(resultados) / segundos, 1) if segundos else None,
+        "rutas": rutas,
+        "memoria": memoria,
+        "memoria_total_max_mb": round(sum(p["rss_max_mb"] for p in memoria), 1),
+    }
+
+
+# ================== Informes ==================
+
+def _valor(v, formato="{:.1f}"):
+    return "-" if v is None else formato.format(v)
+
+
+def imprimir(resultado):
+    print(f"{resultado['app']} en {resultado['url']}: {resultado['peticiones']} peticiones en "
+          f"{resultado['segundos']} s ({resultado['por_segundo']}/s), {resultado['errores']} errores")
+    print(f"{'ruta':<44} {'n':>6} {'err':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'consultas':>10}")
+    for nombre, r in resultado["rutas"].items():
+        print(f"{nombre:<44} {r['peticiones']:>6} {r['errores']:>5} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {_valor(r['consultas_media'], '{:.2f}'):>10}")
+        for ejemplo in r["ejemplos_error"]:
+            print(f"    {ejemplo}")
+    if resultado["memoria"]:
+        print(f"\nMemoria (RSS MB, total máximo {resultado['memoria_total_max_mb']}):")
+        for p in resultado["memoria"]:
+            print(f"  {p['pid']:>7} inicial {p['rss_inicial_mb']:>7.1f}  máx {p['rss_max_mb']:>7.1f}  "
+                  f"final {p['rss_final_mb']:>7.1f}  {p['proceso']}")
+
+
+def comparar(antes, despues, tolerancia):
+    """Imprime la comparación y devuelve la lista de rutas que empeoraron."""
+    peores = []
+    if antes["app"] != despues["app"] or antes["parametros"] != despues["parametros"]:
+        print(f"Atención: las corridas usaron otra app o parámetros "
+              f"({antes['app']} {antes['parametros']} / {despues['app']} {despues['parametros']})\n")
+    print(f"{'ruta':<44} {'p50':>17} {'p95':>17} {'p99':>17} {'Δp95':>7} {'consultas':>13}")
+    for nombre in sorted(set(antes["rutas"]) | set(despues["rutas"])):
+        a, d = antes["rutas"].get(nombre), despues["rutas"].get(nombre)
+        if a is None or d is None:
+            print(f"{nombre:<44} solo en {'la segunda' if a is None else 'la primera'} corrida")
+            continue
+        cambio = 100 * (d["p95_ms"] - a["p95_ms"]) / a["p95_ms"] if a["p95_ms"] else 0.0
+        marca = ""
+        if cambio > tolerancia and d["p95_ms"] - a["p95_ms"] > MARGEN_MS:
+            marca = "  EMPEORÓ"
+        if (d["consultas_media"] or 0) > (a["consultas_media"] or 0) + 0.5:
+            marca += "  MÁS CONSULTAS"
+        if d["errores"] > a["errores"]:
+            marca += "  MÁS ERRORES"
+        if marca:
+            peores.append(nombre)
+        print(f"{nombre:<44} {a['p50_ms']:>7.1f} → {d['p50_ms']:>7.1f} {a['p95_ms']:>7.1f} → {d['p95_ms']:>7.1f} "
+              f"{a['p99_ms']:>7.1f} → {d['p99_ms']:>7.1f} {cambio:>+6.0f}% "
+              f"{_valor(a['consultas_media'])} → {_valor(d['consultas_media'])}{marca}")
+    print(f"\nPeticiones por segundo: {antes['por_segundo']} → {despues['por_segundo']}; "
+          f"memoria máxima total: {antes['memoria_total_max_mb']} → {despues['memoria_total_max_mb']} MB")
+    return peores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("app", nargs="?", choices=sorted(ESCENARIOS))
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--docentes", type=int, default=30, help="Docentes simulados a la vez")
+    parser.add_argument("--admins", type=int, default=1)
+    parser.add_argument("--duracion", type=float, default=60, help="Segundos de medición")
+    parser.add_argument("--pausa", type=float, default=1.0,
+                        help="Pausa media entre acciones de un usuario (0: sin pausa)")
+    parser.add_argument("--semilla", type=int, default=2024)
+    parser.add_argument("--clave", default=CLAVE_DOCENTES)
+    parser.add_argument("--clave-admin", default=CLAVE_ADMIN)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--procesos", help="Regex de la línea de comando de los procesos cuya memoria se mide "
+                                           "(por defecto, los que escuchan en el puerto de --url)")
+    parser.add_argument("--salida", help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DESPUES"))
+    parser.add_argument("--tolerancia", type=float, default=10, help="%% de aumento de p95 tolerado")
+    args = parser.parse_args()
+
+    if args.comparar:
+        with open(args.comparar[0]) as a, open(args.comparar[1]) as d:
+            peores = comparar(json.load(a), json.load(d), args.tolerancia)
+        if peores:
+            print(f"\nEmpeoraron: {', '.join(peores)}")
+            sys.exit(1)
+        return
+    if not args.app:
+        parser.error("Indicá la app (taller o asistente) o usá --comparar")
+
+    resultado = correr(args)
+    imprimir(resultado)
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""Servidor compatible con PostgREST sobre un Postgres local, para medir Asistente.py sin Supabase.
+
+    DATABASE_URL=postgresql://localhost/asistente_bench python benchmark/postgrest_local.py --puerto 54321
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_KEY=local DATABASE_URL=... gunicorn Asistente:app
+
+Implementa solo lo que usa la app: /rest/v1/<tabla> con GET, POST, PATCH y
+DELETE; select con columnas y recursos embebidos de un nivel (según las
+claves foráneas), filtros eq, neq, gt, gte, lt, lte, like, ilike, is e in (con
+not.), or=(...), order, limit y offset. Siempre devuelve las filas afectadas,
+como con Prefer: return=representation. No hay autenticación: la apikey se
+ignora. Cada petición es una sola sentencia SQL, así la latencia se parece a la
+de PostgREST salvo por la red.
+"""
+import argparse
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+from flask import Flask, Response, request
+from psycopg2 import errorcodes, sql
+from psycopg2.pool import ThreadedConnectionPool
+
+app = Flask(__name__)
+
+_pool = None
+_esquema = None
+_lock = threading.Lock()
+
+OPERADORES = {"eq": "=", "neq": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<=",
+              "like": "LIKE", "ilike": "ILIKE"}
+# Parámetros de la URL que no son filtros
+RESERVADOS = {"select", "order", "limit", "offset", "or", "and", "on_conflict", "columns"}
+
+
+class ErrorConsulta(Exception):
+    def __init__(self, mensaje, estado=400, codigo="PGRST100"):
+        super().__init__(mensaje)
+        self.estado = estado
+        self.codigo = codigo
+
+
+@contextmanager
+def conexion():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadedConnectionPool(1, int(os.environ.get("STUB_CONEXIONES", 20)),
+                                           os.environ["DATABASE_URL"])
+    con = _pool.getconn()
+    try:
+        yield con
+    finally:
+        con.rollback()
+        _pool.putconn(con)
+
+
+def esquema():
+    """({tabla: {columnas}}, [(tabla, columna, tabla_referida, columna_referida)]) del esquema public."""
+    global _esquema
+    if _esquema is None:
+        with conexion() as con:
+            cur = con.cursor()
+            cur.execute("""
+                SELECT table_name, column_name FROM information_schema.columns
+                WHERE table_schema = 'public'
+            """)
+            tablas = {}
+            for tabla, columna in cur.fetchall():
+                tablas.setdefault(tabla, set()).add(columna)
+            cur.execute("""
+                SELECT kcu.table_name, kcu.column_name, ccu.table_name, ccu.column_name
+                FROM information_schema.table_constraints tc
+                JOIN information_schema.key_column_usage kcu
+                  ON kcu.constraint_name = tc.constraint_name AND kcu.table_schema = tc.table_schema
+                JOIN information_schema.constraint_column_usage ccu
+                  ON ccu.constraint_name = tc.constraint_name AND ccu.table_schema = tc.table_schema
+                WHERE tc.constraint_type = 'FOREIGN KEY' AND tc.table_schema = 'public'
+            """)
+            _esquema = (tablas, cur.fetchall())
+    return _esquema
+
+
+def _columna(tabla, nombre):
+    tablas, _ = esquema()
+    if nombre not in tablas.get(tabla, ()):
+        raise ErrorConsulta(f"Column {tabla}.{nombre} does not exist", codigo="42703")
+    return sql.Identifier(nombre)
+
+
+# ================== select ==================
+
+def _partir(texto, separador=","):
+    # Separa por comas de primer nivel: "a,b(c,d)" -> ["a", "b(c,d)"]. Como en
+    # PostgREST, lo que va entre comillas dobles (con \" y \\) no cuenta.
+    partes, nivel, actual, comillas, escape = [], 0, "", False, False
+    for caracter in texto:
+        if escape:
+            escape = False
+        elif comillas:
+            escape = caracter == "\\"
+            comillas = caracter != '"'
+        elif caracter == '"':
+            comillas = True
+        elif caracter == "(":
+            nivel += 1
+        elif caracter == ")":
+            nivel -= 1
+            if nivel < 0:
+                raise ErrorConsulta(f"Unbalanced parentheses: {texto}")
+        if caracter == separador and nivel == 0 and not comillas:
+            partes.append(actual)
+            actual = ""
+        else:
+            actual += caracter
+    if nivel or comillas:
+        raise ErrorConsulta(f"Unbalanced parentheses or quotes: {texto}")
+    partes.append(actual)
+    return [p.strip() for p in partes if p.strip()]
+
+
+def _sin_comillas(valor):
+    # "a\"b" -> a"b; un valor sin comillas queda igual
+    if len(valor) >= 2 and valor[0] == valor[-1] == '"':
+        return re.sub(r'\\(.)', r"\1", valor[1:-1])
+    return valor
+
+
+def _relacion(tabla, embebida):
+    """(columna_local, columna_remota, muchos) para embeber `embebida` en `tabla`."""
+    _, foraneas = esquema()
+    for origen, columna, destino, referida in foraneas:
+        if origen == tabla and destino == embebida:
+            return columna, referida, False
+        if origen == embebida and destino == tabla:
+            return referida, columna, True
+    raise ErrorConsulta(f"Could not find a relationship between '{tabla}' and '{embebida}'",
+                        codigo="PGRST200")
+
+
+def _select(tabla, alias, texto):
+    """Lista SQL de columnas de `tabla` (con alias) para el parámetro select."""
+    columnas = []
+    for parte in _partir(texto or "*"):
+        embebida = re.fullmatch(r"(\w+)\((.*)\)", parte, re.S)
+        if embebida:
+            otra, interior = embebida.groups()
+            if otra not in esquema()[0]:
+                raise ErrorConsulta(f"Relation {otra} does not exist", codigo="42P01")
+            local, remota, muchos = _relacion(tabla, otra)
+            sub = sql.Identifier(f"{alias}_{otra}")
+            fuente = sql.SQL("SELECT {columnas} FROM {otra} {sub} WHERE {sub}.{remota} = {alias}.{local}").format(
+                columnas=_select(otra, f"{alias}_{otra}", interior), otra=sql.Identifier(otra), sub=sub,
+                remota=_columna(otra, remota), alias=sql.Identifier(alias), local=_columna(tabla, local))
+            if muchos:
+                plantilla = "(SELECT COALESCE(json_agg(x), '[]') FROM ({fuente}) x) AS {nombre}"
+            else:
+                plantilla = "(SELECT row_to_json(x) FROM ({fuente}) x) AS {nombre}"
+            columnas.append(sql.SQL(plantilla).format(fuente=fuente, nombre=sql.Identifier(otra)))
+        elif parte == "*":
+            columnas.append(sql.SQL("{}.*").format(sql.Identifier(alias)))
+        else:
+            # "alias:columna" se acepta pero el alias se ignora
+            nombre = parte.split(":")[-1]
+            columnas.append(sql.SQL("{}.{}").format(sql.Identifier(alias), _columna(tabla, nombre)))
+    return sql.SQL(", ").join(columnas)
+
+
+# ================== Filtros ==================
+
+def _condicion(tabla, columna, expresion, params):
+    negada = expresion.startswith("not.")
+    if negada:
+        expresion = expresion[4:]
+    operador, _, valor = expresion.partition(".")
+    valor = _sin_comillas(valor)
+    campo = _columna(tabla, columna)
+    if operador in OPERADORES:
+        if operador in ("like", "ilike"):
+            valor = valor.replace("*", "%")
+        params.append(valor)
+        condicion = sql.SQL("{} " + OPERADORES[operador] + " %s").format(campo)
+    elif operador == "is":
+        literales = {"null": "NULL", "true": "TRUE", "false": "FALSE", "unknown": "UNKNOWN"}
+        if valor.lower() not in literales:
+            raise ErrorConsulta(f"Invalid value for is: {valor}")
+        condicion = sql.SQL("{} IS " + literales[valor.lower()]).format(campo)
+    elif operador == "in":
+        valores = [v.strip().strip('"') for v in valor.strip("()").split(",") if v.strip()]
+        if not valores:
+            return sql.SQL("FALSE") if not negada else sql.SQL("TRUE")
+        params.extend(valores)
+        condicion = sql.SQL("{} IN ({})").format(campo, sql.SQL(", ").join([sql.Placeholder()] * len(valores)))
+    else:
+        raise ErrorConsulta(f"Unknown operator: {operador}")
+    return sql.SQL("NOT ({})").format(condicion) if negada else condicion
+
+
+def _where(tabla, argumentos, params):
+    condiciones = []
+    for clave, valores in argumentos.lists():
+        if clave in RESERVADOS:
+            continue
+        for valor in valores:
+            condiciones.append(_condicion(tabla, clave, valor, params))
+    for valor in argumentos.getlist("or"):
+        alternativas = []
+        for parte in _partir(valor.strip()[1:-1]):
+            columna, _, expresion = parte.partition(".")
+            alternativas.append(_condicion(tabla, columna, expresion, params))
+        condiciones.append(sql.SQL("({})").format(sql.SQL(" OR ").join(alternativas)))
+    if not condiciones:
+        return sql.SQL("")
+    return sql.SQL(" WHERE ") + sql.SQL(" AND ").join(condiciones)
+
+
+def _order(tabla, texto):
+    if not texto:
+        return sql.SQL("")
+    partes = []
+    for parte in _partir(texto):
+        columna, *modificadores = parte.split(".")
+        sentido = "DESC" if "desc" in modificadores else "ASC"
+        nulos = " NULLS FIRST" if "nullsfirst" in modificadores else (
+            " NULLS LAST" if "nullslast" in modificadores else "")
+        partes.append(sql.SQL("{} " + sentido + nulos).format(_columna(tabla, columna)))
+    return sql.SQL(" ORDER BY ") + sql.SQL(", ").join(partes)
+
+
+def _entero(nombre):
+    valor = request.args.get(nombre)
+    if valor is None:
+        return None
+    if not valor.isdigit():
+        raise ErrorConsulta(f"Invalid {nombre}: {valor}")
+    return int(valor)
+
+
+# ================== Rutas ==================
+
+@app.route("/rest/v1/<tabla>", methods=["GET", "HEAD", "POST", "PATCH", "DELETE"])
+def recurso(tabla):
+    try:
+        if tabla not in esquema()[0]:
+            raise ErrorConsulta(f"Relation {tabla} does not exist", 404, "42P01")
+        params = []
+        nombre = sql.Identifier(tabla)
+
+        if request.method in ("GET", "HEAD"):
+            consulta = sql.SQL("SELECT {columnas} FROM {tabla} t0{where}{order}").format(
+                columnas=_select(tabla, "t0", request.args.get("select")), tabla=nombre,
+                where=_where(tabla, request.args, params), order=_order(tabla, request.args.get("order")))
+            limite, desplazamiento = _entero("limit"), _entero("offset")
+            if limite is not None:
+                consulta += sql.SQL(" LIMIT {}").format(sql.Literal(limite))
+            if desplazamiento is not None:
+                consulta += sql.SQL(" OFFSET {}").format(sql.Literal(desplazamiento))
+            return _responder(consulta, params, 200)
+
+        if request.method == "DELETE":
+            consulta = sql.SQL("DELETE FROM {tabla}{where} RETURNING *").format(
+                tabla=nombre, where=_where(tabla, request.args, params))
+            return _responder(consulta, params, 200)
+
+        cuerpo = request.get_json(silent=True)
+        filas = cuerpo if isinstance(cuerpo, list) else [cuerpo]
+        if not filas or not all(isinstance(f, dict) and f for f in filas):
+            raise ErrorConsulta("Empty or invalid JSON body", codigo="PGRST102")
+        columnas = sorted(filas[0])
+        campos = sql.SQL(", ").join(_columna(tabla, c) for c in columnas)
+
+        if request.method == "POST":
+            # json_populate_recordset convierte cada valor al tipo de su columna
+            params.append(json.dumps(filas))
+            consulta = sql.SQL("""
+                INSERT INTO {tabla} ({campos})
+                SELECT {campos} FROM json_populate_recordset(NULL::{tabla}, %s::json)
+                RETURNING *
+            """).format(tabla=nombre, campos=campos)
+            return _responder(consulta, params, 201)
+
+        params.append(json.dumps(filas[0]))
+        consulta = sql.SQL("""
+            UPDATE {tabla} SET ({campos}) = (SELECT {campos} FROM json_populate_record(NULL::{tabla}, %s::json))
+        """).format(tabla=nombre, campos=campos)
+        consulta += _where(tabla, request.args, params) + sql.SQL(" RETURNING *")
+        return _responder(consulta, params, 200)
+    except ErrorConsulta as e:
+        return _error(e.estado, e.codigo, str(e))
+
+
+def _responder(consulta, params, estado):
+    # La base arma el JSON: se envía tal cual, sin pasar las filas por Python
+    envuelta = sql.SQL("WITH r AS ({}) SELECT COALESCE(json_agg(r), '[]')::text, COUNT(*) FROM r").format(consulta)
+    with conexion() as con:
+        try:
+            cur = con.cursor()
+            cur.execute(envuelta, params)
+            cuerpo, cantidad = cur.fetchone()
+            con.commit()
+        except psycopg2.Error as e:
+            conflicto = e.pgcode in (errorcodes.UNIQUE_VIOLATION, errorcodes.FOREIGN_KEY_VIOLATION)
+            return _error(409 if conflicto else 400, e.pgcode, e.pgerror or str(e))
+    rango = f"0-{cantidad - 1}/*" if cantidad else "*/*"
+    return Response("" if request.method == "HEAD" else cuerpo, status=estado,
+                    mimetype="application/json", headers={"Content-Range": rango})
+
+
+def _error(estado, codigo, mensaje):
+    cuerpo = {"code": codigo, "message": mensaje.strip(), "details": None, "hint": None}
+    return Response(json.dumps(cuerpo), status=estado, mimetype="application/json")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=54321)
+    args = parser.parse_args()
+    app.run(host=args.host, port=args.puerto, threaded=True)
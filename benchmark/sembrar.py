@@ -0,0 +1,213 @@
+"""Carga una escuela de prueba en un Postgres local para las pruebas de carga.
+
+    DATABASE_URL=postgresql://localhost/taller_bench python benchmark/sembrar.py taller
+    DATABASE_URL=postgresql://localhost/asistente_bench python benchmark/sembrar.py asistente
+
+Aplica las migraciones de la app elegida, BORRA todos sus datos y genera
+cursos, docentes, alumnos, un ciclo lectivo de asistencia (días hábiles hasta
+--hasta) y notas. Los docentes quedan como docente1, docente2... con la clave
+CLAVE_DOCENTES y el admin como admin/1234. Con la misma --semilla los datos
+son siempre los mismos, así dos corridas de carga.py miden lo mismo.
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import psycopg2
+from werkzeug.security import generate_password_hash
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRECTORIOS = {"taller": os.path.join(RAIZ, "Asistente Taller"), "asistente": RAIZ}
+
+CLAVE_DOCENTES = "docente"
+CLAVE_ADMIN = "1234"
+# Docentes asignados a cada curso; el primero es el que toma asistencia
+DOCENTES_POR_CURSO = 3
+
+NOMBRES = ["Sofía", "Mateo", "Valentina", "Benjamín", "Martina", "Thiago", "Catalina", "Joaquín",
+           "Emilia", "Santiago", "Lucía", "Bautista", "Julieta", "Lautaro", "Camila", "Felipe",
+           "Isabella", "Tomás", "Renata", "Agustín", "Delfina", "Facundo", "Abril", "Nicolás"]
+APELLIDOS = ["González", "Rodríguez", "Gómez", "Fernández", "López", "Díaz", "Martínez", "Pérez",
+             "García", "Sánchez", "Romero", "Sosa", "Torres", "Álvarez", "Ruiz", "Ramírez",
+             "Flores", "Benítez", "Acosta", "Medina", "Herrera", "Suárez", "Aguirre", "Giménez"]
+AREAS = ["Matemática", "Lengua", "Historia", "Geografía", "Biología", "Física", "Química", "Inglés",
+         "Educación Física", "Tecnología"]
+
+
+# ================== Escuela ==================
+
+def escuela(args):
+    """Estructura común a las dos apps, sin tocar la base."""
+    azar = random.Random(args.semilla)
+    docentes = [(f"docente{i}", azar.choice(NOMBRES), azar.choice(APELLIDOS), azar.choice(AREAS))
+                for i in range(1, args.docentes + 1)]
+    cursos = [(f"{1 + i % 6}° {chr(ord('A') + i // 6 % 26)}", 1 + i % 6) for i in range(args.cursos)]
+
+    # Cada alumno tiene su propia probabilidad de asistir; unos pocos faltan mucho
+    alumnos = []
+    for i in range(args.alumnos):
+        probabilidad = azar.uniform(0.45, 0.7) if azar.random() < 0.08 else azar.uniform(0.82, 0.99)
+        alumnos.append((azar.choice(NOMBRES), azar.choice(APELLIDOS), i % args.cursos, probabilidad))
+
+    # Los docentes se reparten en ronda; si uno ya está en el curso se elige otro al azar
+    asignaciones = [[] for _ in cursos]
+    for i in range(len(cursos) * DOCENTES_POR_CURSO):
+        curso = i % len(cursos)
+        docente = i % len(docentes)
+        if docente in asignaciones[curso]:
+            docente = azar.choice([d for d in range(len(docentes)) if d not in asignaciones[curso]])
+        asignaciones[curso].append(docente)
+
+    dias = [args.hasta - timedelta(days=d) for d in range(args.dias)]
+    dias = sorted(d for d in dias if d.weekday() < 5)
+    return azar, docentes, cursos, alumnos, asignaciones, dias
+
+
+def notas_del_curso(azar, dias, evaluaciones):
+    """[(fecha, evaluación, peso)] repartidas a lo largo del ciclo."""
+    paso = max(len(dias) // evaluaciones, 1)
+    return [(dias[min(k * paso + paso // 2, len(dias) - 1)], f"Evaluación {k + 1}", azar.choice((1, 1, 2)))
+            for k in range(evaluaciones)]
+
+
+def nota_al_azar(azar):
+    return min(10.0, max(1.0, round(azar.gauss(7, 1.6) * 2) / 2))
+
+
+def copiar(cur, tabla, columnas, filas):
+    # COPY desde un buffer en memoria: mucho más rápido que INSERT para cientos de miles de filas
+    buffer = io.StringIO()
+    for fila in filas:
+        buffer.write("\t".join(r"\N" if v is None else str(v) for v in fila))
+        buffer.write("\n")
+    buffer.seek(0)
+    cur.copy_expert(f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN", buffer)
+
+
+# ================== Asistente Taller ==================
+
+def sembrar_taller(con, args):
+    from consultas import reconstruir_resumen_semanal
+
+    azar, docentes, cursos, alumnos, asignaciones, dias = escuela(args)
+    metodo = os.environ.get("AUTH_HASH_METODO", "scrypt:32768:8:1")
+    clave_docentes = generate_password_hash(CLAVE_DOCENTES, method=metodo)
+    cur = con.cursor()
+
+    cur.execute("TRUNCATE usuarios, cursos RESTART IDENTITY CASCADE")
+    cur.execute("""
+        INSERT INTO usuarios (usuario, nombre, apellido, rol, clave, perfil)
+        VALUES ('admin', 'Admin', 'Taller', 'admin', %s, '')
+    """, (generate_password_hash(CLAVE_ADMIN, method=metodo),))
+    copiar(cur, "usuarios", ("usuario", "nombre", "apellido", "rol", "clave", "perfil"),
+           ((u, n, a, "docente", clave_docentes, area) for u, n, a, area in docentes))
+    # Los ids son consecutivos: el admin es el 1 y docente<i> es el i + 1
+    copiar(cur, "cursos", ("nombre", "año"), cursos)
+    copiar(cur, "alumnos", ("nombre", "apellido", "curso_id"), ((n, a, c + 1) for n, a, c, _ in alumnos))
+    copiar(cur, "docente_cursos", ("docente_id", "curso_id"),
+           ((d + 2, c + 1) for c, ids in enumerate(asignaciones) for d in ids))
+
+    por_curso = [[] for _ in cursos]
+    for alumno_id, (_, _, curso, probabilidad) in enumerate(alumnos, start=1):
+        por_curso[curso].append((alumno_id, probabilidad))
+
+    filas = 0
+    for curso, inscriptos in enumerate(por_curso):
+        tomador = asignaciones[curso][0] + 2
+        copiar(cur, "asistencia", ("alumno_id", "docente_id", "curso_id", "fecha", "presente"), (
+            (alumno_id, tomador, curso + 1, dia.isoformat(), int(azar.random() < probabilidad))
+            for dia in dias for alumno_id, probabilidad in inscriptos
+        ))
+        filas += len(dias) * len(inscriptos)
+        copiar(cur, "notas", ("alumno_id", "docente_id", "curso_id", "nota", "fecha", "evaluacion", "peso"), (
+            (alumno_id, tomador, curso + 1, nota_al_azar(azar), fecha.isoformat(), evaluacion, peso)
+            for fecha, evaluacion, peso in notas_del_curso(azar, dias, args.evaluaciones)
+            for alumno_id, _ in inscriptos
+        ))
+    cur.execute("INSERT INTO versiones_curso (curso_id, version) SELECT id, 1 FROM cursos")
+    semanal = reconstruir_resumen_semanal(cur)
+    con.commit()
+    print(f"{len(cursos)} cursos, {len(docentes)} docentes, {len(alumnos)} alumnos, "
+          f"{filas} registros de asistencia, {semanal} filas de resumen semanal")
+
+
+# ================== Asistente (Supabase) ==================
+
+def sembrar_asistente(con, args):
+    azar, docentes, cursos, alumnos, asignaciones, dias = escuela(args)
+    metodo = os.environ.get("AUTH_HASH_METODO", "scrypt:32768:8:1")
+    clave_docentes = generate_password_hash(CLAVE_DOCENTES, method=metodo)
+    cur = con.cursor()
+
+    cur.execute("TRUNCATE usuarios, docentes, asistencia, notas RESTART IDENTITY CASCADE")
+    cur.execute("""
+        INSERT INTO usuarios (usuario, clave, email, rol) VALUES ('admin', %s, 'admin@escuela.edu', 'admin')
+    """, (generate_password_hash(CLAVE_ADMIN, method=metodo),))
+    copiar(cur, "usuarios", ("usuario", "clave", "email", "rol"),
+           ((u, clave_docentes, f"{u}@escuela.edu", "docente") for u, _, _, _ in docentes))
+    copiar(cur, "docentes", ("usuario_id", "nombre", "apellido", "area"),
+           ((i + 2, n, a, area) for i, (_, n, a, area) in enumerate(docentes)))
+
+    # Esta app no tiene cursos: cada docente registra por nombre a los alumnos de los cursos que toma
+    por_curso = [[] for _ in cursos]
+    for nombre, apellido, curso, probabilidad in alumnos:
+        por_curso[curso].append((f"{apellido}, {nombre}", probabilidad))
+
+    filas = 0
+    for curso, inscriptos in enumerate(por_curso):
+        usuario_id = asignaciones[curso][0] + 2
+        copiar(cur, "asistencia", ("nombre", "presente", "usuario_id", "fecha"), (
+            (nombre, "sí" if azar.random() < probabilidad else "no", usuario_id, dia.isoformat())
+            for dia in dias for nombre, probabilidad in inscriptos
+        ))
+        filas += len(dias) * len(inscriptos)
+        copiar(cur, "notas", ("alumno", "nota", "usuario_id", "fecha"), (
+            (nombre, f"{nota_al_azar(azar):g}", usuario_id, fecha.isoformat())
+            for fecha, _, _ in notas_del_curso(azar, dias, args.evaluaciones)
+            for nombre, _ in inscriptos
+        ))
+    con.commit()
+    print(f"{len(docentes)} docentes, {len(alumnos)} alumnos, {filas} registros de asistencia")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("app", choices=sorted(DIRECTORIOS))
+    parser.add_argument("--cursos", type=int, default=100)
+    parser.add_argument("--alumnos", type=int, default=3000)
+    parser.add_argument("--docentes", type=int, default=150)
+    parser.add_argument("--dias", type=int, default=365, help="Días corridos hacia atrás desde --hasta")
+    parser.add_argument("--hasta", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--evaluaciones", type=int, default=8, help="Notas por alumno")
+    parser.add_argument("--semilla", type=int, default=2024)
+    args = parser.parse_args()
+    if args.docentes < DOCENTES_POR_CURSO:
+        parser.error(f"Se necesitan al menos {DOCENTES_POR_CURSO} docentes")
+
+    # Las migraciones (y consultas) son las de la app elegida
+    sys.path.insert(0, DIRECTORIOS[args.app])
+    from migraciones import aplicar_migraciones
+
+    inicio = time.perf_counter()
+    con = psycopg2.connect(os.environ["DATABASE_URL"])
+    try:
+        for version in aplicar_migraciones(con):
+            print(f"Migración {version} aplicada")
+        if args.app == "taller":
+            sembrar_taller(con, args)
+        else:
+            sembrar_asistente(con, args)
+        con.autocommit = True
+        con.cursor().execute("VACUUM ANALYZE")
+    finally:
+        con.close()
+    print(f"Listo en {time.perf_counter() - inicio:.1f} s. "
+          f"Docentes: docente1..docente{args.docentes} / {CLAVE_DOCENTES}; admin: admin / {CLAVE_ADMIN}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Módulos compartidos por Asistente.py y Asistente Taller/app.py."""
@@ -0,0 +1,126 @@
+import hmac
+import os
+import threading
+import time
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Algoritmo y costo del hash, p. ej. "scrypt:32768:8:1" o "pbkdf2:sha256:600000".
+# Al cambiarlo, las claves se rehashean solas en el próximo login de cada usuario.
+METODO_HASH = os.environ.get("AUTH_HASH_METODO", "scrypt:32768:8:1")
+
+# Cada cuánto se vuelve a verificar en la base que el usuario de la sesión sigue existiendo
+REVALIDAR_SESION_SEGUNDOS = int(os.environ.get("AUTH_REVALIDAR_SEGUNDOS", 300))
+
+
+# ================== Hash de claves ==================
+
+def hashear(clave):
+    return generate_password_hash(clave, method=METODO_HASH)
+
+
+def es_hash(guardada):
+    # Formato de werkzeug: "metodo:parametros$sal$hash"
+    return guardada.startswith(("pbkdf2:", "scrypt:")) and guardada.count("$") == 2
+
+
+def verificar_clave(guardada, clave):
+    """Devuelve (valida, nuevo_hash).
+
+    nuevo_hash no es None cuando la clave es válida pero estaba guardada en
+    texto plano o con otro algoritmo/costo: el llamador debe persistirlo.
+    """
+    if not guardada:
+        return False, None
+
+    if not es_hash(guardada):
+        # Clave heredada en texto plano (puede contener "$")
+        if hmac.compare_digest(guardada.encode(), clave.encode()):
+            return True, hashear(clave)
+        return False, None
+
+    try:
+        if not check_password_hash(guardada, clave):
+            return False, None
+    except ValueError:
+        # Parámetros de hash inválidos: se compara como texto plano
+        if hmac.compare_digest(guardada.encode(), clave.encode()):
+            return True, hashear(clave)
+        return False, None
+    metodo = guardada.split("$", 1)[0]
+    return True, (hashear(clave) if metodo != METODO_HASH else None)
+
+
+# ================== Límite de intentos ==================
+
+class LimitadorIntentos:
+    """Token bucket en memoria por clave (usuario o IP).
+
+    Cada intento consume un token; se recuperan `recarga` tokens por segundo
+    hasta `capacidad`. Los buckets llenos se descartan cuando hay demasiados,
+    así la memoria queda acotada aunque lleguen miles de IPs distintas.
+    """
+
+    def __init__(self, capacidad, recarga, max_claves=10000):
+        self.capacidad = capacidad
+        self.recarga = recarga
+        self.max_claves = max_claves
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _tokens(self, clave, ahora):
+        tokens, ultimo = self._buckets.get(clave, (self.capacidad, ahora))
+        return min(self.capacidad, tokens + (ahora - ultimo) * self.recarga)
+
+    def permitir(self, clave):
+        ahora = time.monotonic()
+        with self._lock:
+            tokens = self._tokens(clave, ahora)
+            if tokens < 1:
+                self._buckets[clave] = (tokens, ahora)
+                return False
+            self._buckets[clave] = (tokens - 1, ahora)
+            if len(self._buckets) > self.max_claves:
+                self._purgar(ahora)
+            return True
+
+    def reiniciar(self, clave):
+        with self._lock:
+            self._buckets.pop(clave, None)
+
+    def _purgar(self, ahora):
+        llenos = [c for c in self._buckets if self._tokens(c, ahora) >= self.capacidad]
+        for c in llenos:
+            del self._buckets[c]
+
+
+# Por usuario: pocos intentos seguidos. Por IP: generoso, porque una escuela
+# entera puede salir a Internet por la misma IP.
+limite_usuario = LimitadorIntentos(
+    capacidad=int(os.environ.get("AUTH_INTENTOS_USUARIO", 5)),
+    recarga=1 / float(os.environ.get("AUTH_SEGUNDOS_POR_INTENTO_USUARIO", 30)),
+)
+limite_ip = LimitadorIntentos(
+    capacidad=int(os.environ.get("AUTH_INTENTOS_IP", 100)),
+    recarga=float(os.environ.get("AUTH_INTENTOS_POR_SEGUNDO_IP", 2)),
+)
+
+
+def intento_permitido(usuario, ip):
+    # Se consulta antes de tocar la base o calcular un hash
+    return limite_ip.permitir(ip) and limite_usuario.permitir(usuario.lower())
+
+
+def login_exitoso(usuario):
+    limite_usuario.reiniciar(usuario.lower())
+
+
+# ================== Sesión ==================
+
+def marcar_sesion_validada(sesion):
+    sesion["validado_en"] = time.time()
+
+
+def sesion_vencida(sesion):
+    """True si hay que volver a consultar la tabla usuarios para esta sesión."""
+    return time.time() - sesion.get("validado_en", 0) > REVALIDAR_SESION_SEGUNDOS
@@ -0,0 +1,160 @@
+"""Medición por petición: tiempo total, llamadas a la base y sentencias repetidas.
+
+La capa de datos avisa cada sentencia con registrar_consulta(); al terminar
+la petición se acumulan los totales por ruta (expuestos en formato de texto de
+Prometheus por texto_metricas()) y, si la petición fue lenta o repitió la
+misma sentencia muchas veces (patrón N+1), se escribe una línea JSON en un
+log rotativo. Los contadores son por proceso: cada worker expone los suyos.
+"""
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+from logging.handlers import RotatingFileHandler
+
+from flask import g, has_request_context, request
+
+# Peticiones más lentas que esto van al log
+LENTA_MS = float(os.environ.get("METRICAS_LENTA_MS", 500))
+# La misma sentencia repetida esta cantidad de veces en una petición se marca como N+1
+REPETICIONES_N1 = int(os.environ.get("METRICAS_REPETICIONES_N1", 10))
+# Fuera del directorio de trabajo, que suele ser el del repositorio
+LOG_RUTA = os.environ.get("METRICAS_LOG") or os.path.join(tempfile.gettempdir(), "solicitudes_lentas.log")
+LOG_BYTES = int(os.environ.get("METRICAS_LOG_BYTES", 5 * 1024 * 1024))
+LOG_COPIAS = int(os.environ.get("METRICAS_LOG_COPIAS", 3))
+
+# Límites superiores (segundos) del histograma de duración
+CUBETAS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def normalizar(sentencia):
+    """Misma forma para la misma sentencia con otros valores: "id=3" y "id=7" cuentan juntas."""
+    if isinstance(sentencia, bytes):
+        sentencia = sentencia.decode("utf-8", "replace")
+    return " ".join(_LITERALES.sub("?", str(sentencia)).split())
+
+
+class Instrumentacion:
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._rutas = {}
+        self._log = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self._iniciar)
+        app.after_request(self._terminar)
+
+    # ---------- Durante la petición ----------
+
+    def _iniciar(self):
+        g._medicion = {"inicio": time.perf_counter(), "llamadas": 0, "segundos": 0.0,
+                       "mas_lenta": (0.0, None), "sentencias": Counter()}
+
+    def registrar_consulta(self, sentencia, segundos):
+        """Lo llama la capa de datos por cada sentencia (o petición HTTP) ejecutada."""
+        if not has_request_context():
+            return
+        m = g.get("_medicion")
+        if m is None:
+            return
+        m["llamadas"] += 1
+        m["segundos"] += segundos
+        forma = normalizar(sentencia)
+        m["sentencias"][forma] += 1
+        if segundos > m["mas_lenta"][0]:
+            m["mas_lenta"] = (segundos, forma)
+
+    def _terminar(self, response):
+        m = g.pop("_medicion", None)
+        if m is None:
+            return response
+        total = time.perf_counter() - m["inicio"]
+        ruta = request.endpoint or "-"
+        repetidas = [(forma, veces) for forma, veces in m["sentencias"].most_common(3)
+                     if veces >= REPETICIONES_N1]
+        lenta = total * 1000 >= LENTA_MS
+
+        with self._lock:
+            r = self._rutas.get(ruta)
+            if r is None:
+                r = self._rutas[ruta] = {"peticiones": 0, "segundos": 0.0, "cubetas": [0] * len(CUBETAS),
+                                         "db_llamadas": 0, "db_segundos": 0.0, "lentas": 0, "n_mas_1": 0}
+            r["peticiones"] += 1
+            r["segundos"] += total
+            for i, limite in enumerate(CUBETAS):
+                if total <= limite:
+                    r["cubetas"][i] += 1
+            r["db_llamadas"] += m["llamadas"]
+            r["db_segundos"] += m["segundos"]
+            r["lentas"] += int(lenta)
+            r["n_mas_1"] += int(bool(repetidas))
+
+        # Para las pruebas de carga: llamadas a la base de esta petición
+        response.headers.setdefault("X-Consultas-DB", str(m["llamadas"]))
+
+        if lenta or repetidas:
+            self._escribir_log({
+                "ts": round(time.time(), 3),
+                "ruta": ruta,
+                "metodo": request.method,
+                "path": request.path,
+                "estado": response.status_code,
+                "ms": round(total * 1000, 1),
+                "db_llamadas": m["llamadas"],
+                "db_ms": round(m["segundos"] * 1000, 1),
+                "mas_lenta_ms": round(m["mas_lenta"][0] * 1000, 1),
+                "mas_lenta": (m["mas_lenta"][1] or "")[:500],
+                "n_mas_1": [{"sentencia": forma[:300], "veces": veces} for forma, veces in repetidas],
+            })
+        return response
+
+    def _escribir_log(self, registro):
+        if self._log is None:
+            self._log = logging.getLogger("solicitudes_lentas")
+            self._log.propagate = False
+            if not self._log.handlers:
+                os.makedirs(os.path.dirname(os.path.abspath(LOG_RUTA)), exist_ok=True)
+                self._log.addHandler(RotatingFileHandler(LOG_RUTA, maxBytes=LOG_BYTES, backupCount=LOG_COPIAS))
+            self._log.setLevel(logging.INFO)
+        self._log.info(json.dumps(registro, ensure_ascii=False))
+
+    # ---------- Exposición ----------
+
+    def texto_metricas(self):
+        """Totales por ruta en formato de texto de Prometheus."""
+        with self._lock:
+            rutas = {ruta: dict(r, cubetas=list(r["cubetas"])) for ruta, r in self._rutas.items()}
+
+        lineas = [
+            "# HELP solicitud_segundos Duración de las peticiones por ruta.",
+            "# TYPE solicitud_segundos histogram",
+        ]
+        for ruta, r in sorted(rutas.items()):
+            for limite, cantidad in zip(CUBETAS, r["cubetas"]):
+                lineas.append(f'solicitud_segundos_bucket{{ruta="{ruta}",le="{limite}"}} {cantidad}')
+            lineas.append(f'solicitud_segundos_bucket{{ruta="{ruta}",le="+Inf"}} {r["peticiones"]}')
+            lineas.append(f'solicitud_segundos_sum{{ruta="{ruta}"}} {r["segundos"]:.6f}')
+            lineas.append(f'solicitud_segundos_count{{ruta="{ruta}"}} {r["peticiones"]}')
+
+        for nombre, clave, tipo, ayuda in (
+            ("db_llamadas_total", "db_llamadas", "counter", "Sentencias o llamadas a la base por ruta."),
+            ("db_segundos_total", "db_segundos", "counter", "Tiempo en la base por ruta."),
+            ("solicitudes_lentas_total", "lentas", "counter", f"Peticiones de más de {LENTA_MS:g} ms."),
+            ("solicitudes_n_mas_1_total", "n_mas_1", "counter",
+             f"Peticiones que repitieron una sentencia {REPETICIONES_N1} o más veces."),
+        ):
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            for ruta, r in sorted(rutas.items()):
+                valor = r[clave]
+                lineas.append(f'{nombre}{{ruta="{ruta}"}} {valor:.6f}' if isinstance(valor, float)
+                              else f'{nombre}{{ruta="{ruta}"}} {valor}')
+        return "\n".join(lineas) + "\n"
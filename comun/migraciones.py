@@ -0,0 +1,59 @@
+"""Aplicación de migraciones versionadas, compartida por las dos apps.
+
+Cada app define su lista MIGRACIONES, de tuplas (versión, descripción,
+[sentencias]), y la clave de su advisory lock. Cada migración se aplica en su
+propia transacción y la versión aplicada queda en schema_version, así que en
+cada arranque basta una consulta para saber que no hay nada pendiente.
+"""
+import os
+
+import psycopg2
+
+
+def version_aplicada(cur):
+    cur.execute("SELECT to_regclass('schema_version')")
+    if cur.fetchone()[0] is None:
+        return 0
+    cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cur.fetchone()[0]
+
+
+def aplicar_migraciones(con, migraciones, lock):
+    """Aplica en orden las migraciones que falten; devuelve las versiones aplicadas."""
+    cur = con.cursor()
+    if version_aplicada(cur) >= migraciones[-1][0]:
+        con.rollback()
+        return []
+
+    aplicadas = []
+    for version, descripcion, sentencias in migraciones:
+        # Otro proceso puede estar migrando: se espera el lock y se vuelve a leer la versión
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (lock,))
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                descripcion TEXT,
+                aplicada_en TIMESTAMPTZ DEFAULT now()
+            )
+        """)
+        if version_aplicada(cur) >= version:
+            con.commit()
+            continue
+        for sentencia in sentencias:
+            cur.execute(sentencia)
+        cur.execute("INSERT INTO schema_version (version, descripcion) VALUES (%s, %s)",
+                    (version, descripcion))
+        con.commit()
+        aplicadas.append(version)
+    return aplicadas
+
+
+def ejecutar(migraciones, lock):
+    """Punto de entrada de `python migraciones.py` en cada app (con DATABASE_URL en el entorno)."""
+    conexion = psycopg2.connect(os.environ["DATABASE_URL"])
+    try:
+        for v in aplicar_migraciones(conexion, migraciones, lock):
+            print(f"Migración {v} aplicada")
+        print(f"Esquema en la versión {migraciones[-1][0]}")
+    finally:
+        conexion.close()
@@ -0,0 +1,16 @@
+"""Cálculos compartidos por los gunicorn.conf.py de ambas apps."""
+import math
+import os
+
+
+def cpus_disponibles():
+    """CPUs que el proceso puede usar, respetando la afinidad y el límite del cgroup (contenedores)."""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            cuota, periodo = f.read().split()
+        if cuota != "max":
+            cpus = min(cpus, max(math.ceil(int(cuota) / int(periodo)), 1))
+    except (OSError, ValueError):
+        pass
+    return cpus
@@ -0,0 +1,178 @@
+import os
+import random
+import threading
+import time
+
+import httpx
+from flask import has_request_context, request
+from postgrest import SyncPostgrestClient
+
+
+class ClienteDatos:
+    """Acceso a las tablas de Supabase a través de PostgREST.
+
+    Todas las consultas comparten un único cliente httpx con keep-alive, cuyo
+    pool de conexiones se dimensiona según la concurrencia del worker. ejecutar()
+    aplica el timeout, reintenta con backoff exponencial los errores de red y
+    registra la latencia de cada llamada por ruta de Flask.
+    """
+
+    def __init__(self, url, key, conexiones=8, timeout=10, reintentos=2, espera_base=0.2, observador=None):
+        self.reintentos = reintentos
+        # observador(sentencia, segundos) recibe cada llamada (p. ej. la instrumentación por petición)
+        self.observador = observador
+        self.espera_base = espera_base
+        self.conexiones = conexiones
+        self.timeout = timeout
+        self.postgrest = SyncPostgrestClient(
+            f"{url.rstrip('/')}/rest/v1",
+            headers={"apikey": key, "Authorization": f"Bearer {key}"},
+            timeout=timeout,
+        )
+        # Reemplaza la sesión por una con el pool dimensionado y keep-alive explícito
+        sesion = self.postgrest.session
+        self.postgrest.session = self._crear_sesion(sesion)
+        sesion.close()
+
+        self._lock = threading.Lock()
+        self._metricas = {}
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._tras_fork)
+
+    def _crear_sesion(self, base):
+        return httpx.Client(
+            base_url=base.base_url,
+            headers=base.headers,
+            timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 5)),
+            limits=httpx.Limits(
+                max_connections=self.conexiones,
+                max_keepalive_connections=self.conexiones,
+                keepalive_expiry=60,
+            ),
+        )
+
+    def _tras_fork(self):
+        # Con preload de gunicorn el cliente se crea en el master: cada worker
+        # abre sus propias conexiones y no cierra las heredadas, que son del padre
+        self.postgrest.session = self._crear_sesion(self.postgrest.session)
+        self._lock = threading.Lock()
+        self._metricas = {}
+
+    def from_(self, tabla):
+        return self.postgrest.from_(tabla)
+
+    table = from_
+
+    def ejecutar(self, consulta):
+        """Ejecuta un request builder de postgrest y devuelve su respuesta.
+
+        Las lecturas se reintentan ante cualquier error de transporte; las
+        escrituras solo si la petición no llegó al servidor (conexión fallida).
+        Si no se puede saber el método, la llamada se trata como escritura.
+        """
+        metodo, tabla, params = _operacion(consulta)
+        idempotente = metodo in ("GET", "HEAD")
+        reintentables = httpx.TransportError if idempotente else (httpx.ConnectError,
+                                                                    httpx.ConnectTimeout,
+                                                                    httpx.PoolTimeout)
+        inicio = time.perf_counter()
+        intento = 0
+        try:
+            while True:
+                try:
+                    respuesta = consulta.execute()
+                    self._registrar(metodo, tabla, inicio, intento, params=params)
+                    return respuesta
+                except reintentables:
+                    if intento >= self.reintentos:
+                        raise
+                    time.sleep(self.espera_base * (2 ** intento) * (1 + random.random()))
+                    intento += 1
+        except Exception:
+            self._registrar(metodo, tabla, inicio, intento, error=True, params=params)
+            raise
+
+    def paginar(self, consulta, cursor=None, por_pagina=50):
+        """Página por keyset sobre id descendente (lo más reciente primero).
+
+        cursor es el último id de la página anterior. Devuelve (filas,
+        siguiente_cursor); siguiente_cursor es None en la última página.
+        """
+        if cursor is not None:
+            consulta = consulta.lt("id", cursor)
+        filas = self.ejecutar(consulta.order("id", desc=True).limit(por_pagina + 1)).data
+        if len(filas) > por_pagina:
+            return filas[:por_pagina], filas[por_pagina - 1]["id"]
+        return filas, None
+
+    def recorrer(self, crear_consulta, por_pagina=1000):
+        """Genera todas las filas de una consulta, de a una página por petición.
+
+        crear_consulta() debe devolver un request builder nuevo en cada llamada
+        (los builders acumulan filtros). Se pagina por keyset sobre id
+        ascendente, así cada página cuesta lo mismo sin importar cuántas se
+        leyeron antes y en memoria queda una sola.
+        """
+        ultimo = None
+        while True:
+            consulta = crear_consulta()
+            if ultimo is not None:
+                consulta = consulta.gt("id", ultimo)
+            filas = self.ejecutar(consulta.order("id").limit(por_pagina)).data
+            yield from filas
+            if len(filas) < por_pagina:
+                return
+            ultimo = filas[-1]["id"]
+
+    def _registrar(self, metodo, tabla, inicio, reintentos, error=False, params=None):
+        ms = (time.perf_counter() - inicio) * 1000
+        if self.observador is not None:
+            self.observador(_describir(metodo, tabla, params), ms / 1000)
+        ruta = request.endpoint if has_request_context() else None
+        clave = (ruta or "-", metodo, tabla)
+        with self._lock:
+            m = self._metricas.get(clave)
+            if m is None:
+                m = self._metricas[clave] = {"llamadas": 0, "errores": 0, "reintentos": 0,
+                                             "ms_total": 0.0, "ms_max": 0.0}
+            m["llamadas"] += 1
+            m["errores"] += int(error)
+            m["reintentos"] += reintentos
+            m["ms_total"] += ms
+            m["ms_max"] = max(m["ms_max"], ms)
+
+    def metricas(self):
+        """Latencia acumulada por (ruta, método, tabla)."""
+        with self._lock:
+            return [
+                {"ruta": ruta, "metodo": metodo, "tabla": tabla, **m,
+                 "ms_promedio": m["ms_total"] / m["llamadas"] if m["llamadas"] else 0.0}
+                for (ruta, metodo, tabla), m in sorted(self._metricas.items())
+            ]
+
+
+def valor_filtro(texto):
+    """Valor para una condición de or=(...) / and=(...) de PostgREST, entre comillas dobles.
+
+    Ahí las comas, los puntos, los paréntesis y las comillas son reservados; entre
+    comillas valen literalmente si se escapan \\ y ".
+    """
+    return '"' + texto.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _operacion(consulta):
+    # postgrest 2.x guarda método, URL y parámetros en consulta.request
+    pedido = getattr(consulta, "request", None)
+    metodo = getattr(pedido, "http_method", None)
+    metodo = str(getattr(metodo, "value", metodo)).upper() if metodo is not None else "?"
+    ruta = getattr(pedido, "path", None)
+    ruta = str(getattr(ruta, "path", ruta) or "").rstrip("/")
+    tabla = ruta.rsplit("/", 1)[-1] or "?"
+    return metodo, tabla, getattr(pedido, "params", None)
+
+
+def _describir(metodo, tabla, params):
+    # "GET asistencia?order=id,usuario_id=eq": columnas y operadores, sin los valores
+    pares = params.multi_items() if hasattr(params, "multi_items") else (params or {}).items()
+    filtros = sorted(f"{clave}={str(valor).split('.', 1)[0]}" for clave, valor in pares)
+    return f"{metodo} {tabla}?{','.join(filtros)}"
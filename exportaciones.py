@@ -0,0 +1,54 @@
+import zlib
+
+import psycopg2
+
+from comun.csv_streaming import escritor_csv
+
+# Se envía un trozo cuando se juntan al menos estos bytes de CSV
+TAMANO_TROZO = 64 * 1024
+
+
+def lineas_csv(encabezados, filas):
+    """Genera el CSV en trozos de ~64 KB; cada fila es una secuencia de valores.
+
+    csv.writer se encarga de las comillas, así un nombre con comas o comillas
+    no corre las columnas.
+    """
+    writer = escritor_csv()
+    trozo = [writer.writerow(encabezados)]
+    tamano = len(trozo[0])
+    for fila in filas:
+        linea = writer.writerow(fila)
+        trozo.append(linea)
+        tamano += len(linea)
+        if tamano >= TAMANO_TROZO:
+            yield "".join(trozo)
+            trozo, tamano = [], 0
+    if trozo:
+        yield "".join(trozo)
+
+
+def comprimir_gzip(trozos, nivel=6):
+    """Comprime en gzip a medida que llegan los trozos de texto."""
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, 31)  # 31: encabezado gzip
+    for trozo in trozos:
+        datos = compresor.compress(trozo.encode("utf-8"))
+        if datos:
+            yield datos
+    yield compresor.flush()
+
+
+def filas_postgres(database_url, sql, params, lote=2000):
+    """Genera las filas de una consulta con un cursor del lado del servidor.
+
+    La conexión es propia de la exportación y se cierra al terminar (o si el
+    cliente corta la descarga y el generador se cierra).
+    """
+    con = psycopg2.connect(database_url, connect_timeout=5)
+    try:
+        with con.cursor(name="exportar_csv") as cur:
+            cur.itersize = lote
+            cur.execute(sql, params)
+            yield from cur
+    finally:
+        con.close()
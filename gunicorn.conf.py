@@ -0,0 +1,57 @@
+"""Configuración de gunicorn para Asistente.py.
+
+    gunicorn Asistente:app        (desde este directorio toma este archivo solo)
+
+Workers e hilos salen de los CPUs disponibles y del pool HTTP hacia Supabase:
+
+- hilos por worker = HTTP_POOL_CONEXIONES (8 si no está), porque cada hilo usa
+  a lo sumo una conexión del cliente compartido del worker;
+- workers = 2 x CPUs + 1, sin pasar de GUNICORN_MAX_WORKERS (cada worker es un
+  proceso con su propia memoria).
+
+WEB_CONCURRENCY y GUNICORN_THREADS los fijan a mano. La app se importa una vez
+en el master (preload) y los workers la heredan con el fork; la inicialización
+del esquema (arranque.py) corre en on_starting, una sola vez.
+
+Recarga sin cortar peticiones: kill -HUP <master> reemplaza los workers de a
+uno. Con preload el código no se vuelve a importar: para desplegar código nuevo
+kill -USR2 <master> arranca un master nuevo y, cuando atiende, kill -TERM al
+viejo.
+"""
+import os
+import sys
+
+# comun/ está junto a este archivo (también si se usa -c desde otro directorio)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from comun.servidor import cpus_disponibles
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS") or os.environ.get("HTTP_POOL_CONEXIONES") or 8)
+workers = int(os.environ.get("WEB_CONCURRENCY", 0)) or max(
+    min(2 * cpus_disponibles() + 1, int(os.environ.get("GUNICORN_MAX_WORKERS", 8))), 1)
+
+# Asistente.py dimensiona su pool HTTP con esto al importarse, y con varios
+# workers comparte el cache de perfiles en SQLite (sesiones.crear_almacen)
+os.environ["GUNICORN_THREADS"] = str(threads)
+os.environ["GUNICORN_WORKERS"] = str(workers)
+
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
+errorlog = "-"
+
+
+def on_starting(server):
+    # Una sola vez, en el master, antes de crear los workers: los workers heredan
+    # el esquema ya verificado y no consultan nada al arrancar
+    import arranque
+    from Asistente import datos
+
+    arranque.asegurar(datos)
+    server.log.info("Workers: %s, hilos por worker: %s", workers, threads)
@@ -0,0 +1,76 @@
+"""Migraciones del esquema de Supabase, registradas en la tabla schema_version.
+
+Se aplican con comun/migraciones.py, igual que las de Asistente Taller.
+
+Uso: python migraciones.py  (con DATABASE_URL apuntando al Postgres de Supabase)
+"""
+from comun import migraciones
+
+# Clave del advisory lock que serializa las migraciones entre procesos (727001 es la del Taller)
+_LOCK_MIGRACIONES = 727002
+
+MIGRACIONES = [
+    (1, "Esquema inicial", [
+        """
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id SERIAL PRIMARY KEY,
+            usuario TEXT UNIQUE NOT NULL,
+            clave TEXT NOT NULL,
+            email TEXT,
+            rol TEXT CHECK(rol IN ('docente', 'admin')) DEFAULT 'docente'
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS docentes (
+            id SERIAL PRIMARY KEY,
+            usuario_id INTEGER NOT NULL,
+            nombre TEXT NOT NULL,
+            apellido TEXT NOT NULL,
+            area TEXT,
+            FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS asistencia (
+            id SERIAL PRIMARY KEY,
+            nombre TEXT NOT NULL,
+            presente TEXT NOT NULL,
+            usuario_id INTEGER
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS notas (
+            id SERIAL PRIMARY KEY,
+            alumno TEXT NOT NULL,
+            nota TEXT NOT NULL,
+            usuario_id INTEGER
+        )
+        """,
+    ]),
+    (2, "Fechas e índices de los listados paginados", [
+        "ALTER TABLE asistencia ADD COLUMN IF NOT EXISTS fecha DATE NOT NULL DEFAULT CURRENT_DATE",
+        "ALTER TABLE notas ADD COLUMN IF NOT EXISTS fecha DATE NOT NULL DEFAULT CURRENT_DATE",
+        "CREATE INDEX IF NOT EXISTS docentes_usuario_id ON docentes (usuario_id)",
+        "CREATE INDEX IF NOT EXISTS asistencia_usuario_id ON asistencia (usuario_id, id)",
+        "CREATE INDEX IF NOT EXISTS asistencia_usuario_fecha ON asistencia (usuario_id, fecha)",
+        "CREATE INDEX IF NOT EXISTS notas_usuario_id ON notas (usuario_id, id)",
+        "CREATE INDEX IF NOT EXISTS notas_usuario_fecha ON notas (usuario_id, fecha)",
+        # Búsqueda por nombre con ILIKE '%texto%'
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS asistencia_nombre_trgm ON asistencia USING gin (nombre gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS notas_alumno_trgm ON notas USING gin (alumno gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS docentes_nombre_trgm ON docentes USING gin (nombre gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS docentes_apellido_trgm ON docentes USING gin (apellido gin_trgm_ops)",
+    ]),
+]
+
+VERSION_ACTUAL = MIGRACIONES[-1][0]
+
+
+def aplicar_migraciones(conn):
+    """Aplica las migraciones pendientes y devuelve la lista de versiones aplicadas."""
+    return migraciones.aplicar_migraciones(conn, MIGRACIONES, _LOCK_MIGRACIONES)
+
+
+if __name__ == "__main__":
+    migraciones.ejecutar(MIGRACIONES, _LOCK_MIGRACIONES)
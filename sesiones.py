@@ -0,0 +1,105 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class AlmacenMemoria:
+    """LRU con vencimiento en la memoria del proceso (por defecto con un solo worker).
+
+    Cada worker tiene su propia copia: un cambio hecho en un worker llega a los
+    demás recién cuando vence el TTL. Por eso con varios workers el backend por
+    defecto es AlmacenSQLite.
+    """
+
+    def __init__(self, capacidad=1000, ttl=600):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            if entrada[0] < time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return entrada[1]
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + self.ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+
+    def borrar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+
+class AlmacenSQLite:
+    """Almacén en un archivo SQLite local, compartido por los workers del servidor."""
+
+    def __init__(self, ruta=None, ttl=600):
+        self.ruta = ruta or os.path.join(tempfile.gettempdir(), "asistente_sesiones.db")
+        self.ttl = ttl
+        self._local = threading.local()
+        con = self._conexion()
+        con.execute("""
+            CREATE TABLE IF NOT EXISTS sesiones (
+                clave TEXT PRIMARY KEY,
+                valor TEXT NOT NULL,
+                vence REAL NOT NULL
+            )
+        """)
+        con.commit()
+
+    def _conexion(self):
+        # Una conexión por hilo (y por proceso, tras el fork de gunicorn)
+        con = getattr(self._local, "con", None)
+        if con is None or self._local.pid != os.getpid():
+            con = sqlite3.connect(self.ruta, timeout=5)
+            con.execute("PRAGMA journal_mode=WAL")
+            self._local.con, self._local.pid = con, os.getpid()
+        return con
+
+    def obtener(self, clave):
+        fila = self._conexion().execute(
+            "SELECT valor FROM sesiones WHERE clave=? AND vence > ?", (str(clave), time.time())
+        ).fetchone()
+        return json.loads(fila[0]) if fila else None
+
+    def guardar(self, clave, valor):
+        con = self._conexion()
+        con.execute(
+            "INSERT OR REPLACE INTO sesiones (clave, valor, vence) VALUES (?, ?, ?)",
+            (str(clave), json.dumps(valor), time.time() + self.ttl)
+        )
+        # Limpieza ocasional de entradas vencidas
+        con.execute("DELETE FROM sesiones WHERE vence < ?", (time.time() - self.ttl,))
+        con.commit()
+
+    def borrar(self, clave):
+        con = self._conexion()
+        con.execute("DELETE FROM sesiones WHERE clave=?", (str(clave),))
+        con.commit()
+
+
+def crear_almacen():
+    """Backend elegido con SESION_BACKEND: "memoria" o "sqlite".
+
+    Si no está, "sqlite" cuando el servidor corre varios workers (gunicorn.conf.py
+    exporta GUNICORN_WORKERS) y "memoria" con uno solo.
+    """
+    ttl = int(os.environ.get("SESION_TTL", 600))
+    workers = int(os.environ.get("GUNICORN_WORKERS") or os.environ.get("WEB_CONCURRENCY") or 1)
+    if os.environ.get("SESION_BACKEND", "sqlite" if workers > 1 else "memoria") == "sqlite":
+        return AlmacenSQLite(os.environ.get("SESION_SQLITE_RUTA"), ttl=ttl)
+    return AlmacenMemoria(capacidad=int(os.environ.get("SESION_CAPACIDAD", 1000)), ttl=ttl)
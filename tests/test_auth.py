@@ -0,0 +1,36 @@
+from comun import auth
+
+
+def test_clave_en_texto_plano_se_rehashea():
+    valida, nuevo_hash = auth.verificar_clave("1234", "1234")
+    assert valida
+    assert auth.es_hash(nuevo_hash)
+    assert auth.verificar_clave(nuevo_hash, "1234") == (True, None)
+
+
+def test_clave_en_texto_plano_con_signos_pesos():
+    assert auth.verificar_clave("a$b$c", "otra") == (False, None)
+    valida, nuevo_hash = auth.verificar_clave("a$b$c", "a$b$c")
+    assert valida and nuevo_hash
+
+
+def test_clave_en_texto_plano_con_prefijo_de_hash():
+    assert auth.verificar_clave("pbkdf2:x$y$z", "otra") == (False, None)
+    assert auth.verificar_clave("pbkdf2:x$y$z", "pbkdf2:x$y$z")[0]
+
+
+def test_hash_con_otro_metodo_se_actualiza():
+    guardada = auth.generate_password_hash("1234", method="pbkdf2:sha256:1000")
+    assert auth.verificar_clave(guardada, "mala") == (False, None)
+    valida, nuevo_hash = auth.verificar_clave(guardada, "1234")
+    assert valida
+    assert nuevo_hash.startswith(auth.METODO_HASH + "$")
+
+
+def test_limitador_agota_y_recupera():
+    limitador = auth.LimitadorIntentos(capacidad=2, recarga=0)
+    assert limitador.permitir("ana") and limitador.permitir("ana")
+    assert not limitador.permitir("ana")
+    assert limitador.permitir("beto")
+    limitador.reiniciar("ana")
+    assert limitador.permitir("ana")
@@ -0,0 +1,88 @@
+import httpx
+import pytest
+
+from datos import ClienteDatos, valor_filtro
+
+
+def cliente_con(respuestas, observador=None):
+    """ClienteDatos cuyas peticiones responde la lista respuestas (excepción o httpx.Response), en orden."""
+    llamadas = []
+
+    def responder(pedido):
+        llamadas.append(pedido)
+        respuesta = respuestas.pop(0)
+        if isinstance(respuesta, Exception):
+            raise respuesta
+        return respuesta
+
+    datos = ClienteDatos("http://postgrest.local", "clave", espera_base=0, observador=observador)
+    sesion = datos.postgrest.session
+    datos.postgrest.session = httpx.Client(base_url=sesion.base_url, headers=sesion.headers,
+                                           transport=httpx.MockTransport(responder))
+    sesion.close()
+    return datos, llamadas
+
+
+def test_insert_con_read_timeout_no_se_reintenta():
+    datos, llamadas = cliente_con([httpx.ReadTimeout("sin respuesta"), httpx.Response(201, json=[])])
+    with pytest.raises(httpx.ReadTimeout):
+        datos.ejecutar(datos.from_("asistencia").insert({"usuario_id": 1}))
+    assert len(llamadas) == 1
+    [m] = datos.metricas()
+    assert (m["metodo"], m["tabla"], m["errores"], m["reintentos"]) == ("POST", "asistencia", 1, 0)
+
+
+def test_insert_sin_conexion_se_reintenta():
+    datos, llamadas = cliente_con([httpx.ConnectError("rechazada"), httpx.Response(201, json=[{"id": 1}])])
+    respuesta = datos.ejecutar(datos.from_("asistencia").insert({"usuario_id": 1}))
+    assert respuesta.data == [{"id": 1}]
+    assert len(llamadas) == 2
+
+
+def test_lectura_se_reintenta_ante_read_timeout():
+    datos, llamadas = cliente_con([httpx.ReadTimeout("sin respuesta"), httpx.Response(200, json=[{"id": 7}])])
+    respuesta = datos.ejecutar(datos.from_("usuarios").select("id").eq("id", 7))
+    assert respuesta.data == [{"id": 7}]
+    assert len(llamadas) == 2
+    [m] = datos.metricas()
+    assert (m["metodo"], m["tabla"], m["reintentos"]) == ("GET", "usuarios", 1)
+
+
+def test_lectura_agota_los_reintentos():
+    datos, llamadas = cliente_con([httpx.ReadTimeout("sin respuesta")] * 3)
+    with pytest.raises(httpx.ReadTimeout):
+        datos.ejecutar(datos.from_("usuarios").select("id"))
+    assert len(llamadas) == 3
+
+
+def test_consulta_sin_metodo_conocido_se_trata_como_escritura():
+    class Consulta:
+        intentos = 0
+
+        def execute(self):
+            self.intentos += 1
+            raise httpx.ReadTimeout("sin respuesta")
+
+    datos, _ = cliente_con([])
+    consulta = Consulta()
+    with pytest.raises(httpx.ReadTimeout):
+        datos.ejecutar(consulta)
+    assert consulta.intentos == 1
+
+
+def test_observador_recibe_la_forma_de_la_consulta_sin_valores():
+    vistas = []
+    datos, _ = cliente_con([httpx.Response(200, json=[])] * 2,
+                           observador=lambda sentencia, segundos: vistas.append(sentencia))
+    for usuario_id in (3, 7):
+        datos.ejecutar(datos.from_("asistencia").select("id").eq("usuario_id", usuario_id).order("id", desc=True))
+    assert vistas == ["GET asistencia?order=id,select=id,usuario_id=eq"] * 2
+
+
+def test_valor_filtro_entre_comillas_en_or():
+    datos, llamadas = cliente_con([httpx.Response(200, json=[])])
+    patron = valor_filtro('*a(b), "c".d\\*')
+    datos.ejecutar(datos.from_("docentes").select("id").or_(f"nombre.ilike.{patron},apellido.ilike.{patron}"))
+    assert llamadas[0].url.params["or"] == (
+        '(nombre.ilike."*a(b), \\"c\\".d\\\\*",apellido.ilike."*a(b), \\"c\\".d\\\\*")'
+    )
@@ -0,0 +1,26 @@
+import sesiones
+
+
+def test_un_worker_usa_memoria(monkeypatch):
+    monkeypatch.delenv("SESION_BACKEND", raising=False)
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.setenv("GUNICORN_WORKERS", "1")
+    assert isinstance(sesiones.crear_almacen(), sesiones.AlmacenMemoria)
+
+
+def test_varios_workers_comparten_sqlite(monkeypatch, tmp_path):
+    monkeypatch.delenv("SESION_BACKEND", raising=False)
+    monkeypatch.setenv("GUNICORN_WORKERS", "3")
+    monkeypatch.setenv("SESION_SQLITE_RUTA", str(tmp_path / "sesiones.db"))
+    uno, otro = sesiones.crear_almacen(), sesiones.crear_almacen()
+    assert isinstance(uno, sesiones.AlmacenSQLite)
+    uno.guardar(7, {"nombre": "Ana"})
+    assert otro.obtener(7) == {"nombre": "Ana"}
+    otro.borrar(7)
+    assert uno.obtener(7) is None
+
+
+def test_backend_explicito(monkeypatch):
+    monkeypatch.setenv("GUNICORN_WORKERS", "4")
+    monkeypatch.setenv("SESION_BACKEND", "memoria")
+    assert isinstance(sesiones.crear_almacen(), sesiones.AlmacenMemoria)